@@ -0,0 +1,59 @@
+"""
+Order totals batching shared by the restaurant and hotel apps
+
+Both apps' OrderItem.save() call mark_order_dirty(); neither app imports
+the other.
+"""
+from contextlib import contextmanager
+import threading
+
+_local = threading.local()
+
+
+def _dirty_orders():
+    """Return the dirty-order map of the innermost active batch, or None"""
+    return getattr(_local, 'dirty_orders', None)
+
+
+def mark_order_dirty(order):
+    """
+    Flag an order for a deferred totals recalculation.
+
+    Returns True when an order_batch() is active and the recalculation was
+    deferred, False when the caller should recalculate immediately.
+    """
+    dirty = _dirty_orders()
+    if dirty is None or order.pk is None:
+        return False
+    dirty.setdefault((order._meta.label, order.pk), order)
+    return True
+
+
+@contextmanager
+def order_batch():
+    """
+    Coalesce order total recalculation for bulk line edits.
+
+    Inside the block, saving an order line only marks its order as dirty;
+    every dirty order gets a single recalc_totals() when the outermost
+    block exits. Nested blocks join the outer one. If the block raises,
+    pending recalculations are dropped along with the failed work.
+
+    Usage:
+        with transaction.atomic(), order_batch():
+            for line in lines:
+                line.save()
+    """
+    if _dirty_orders() is not None:
+        yield
+        return
+
+    _local.dirty_orders = {}
+    try:
+        yield
+        dirty = _local.dirty_orders
+    finally:
+        _local.dirty_orders = None
+
+    for order in dirty.values():
+        order.recalc_totals(commit=True)
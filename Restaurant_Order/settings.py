@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -71,9 +72,12 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'restaurant.db_router.ReplicaStickinessMiddleware',
+    'restaurant.sharding.BranchMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'restaurant.middleware.CustomerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -116,6 +120,47 @@ DATABASES = {
     }
 }
 
+# Read replicas: DB_REPLICAS=/path/replica1.sqlite3,/path/replica2.sqlite3
+# Only reads wrapped in restaurant.db_router.read_replica() use them.
+READ_REPLICAS = []
+for index, replica_name in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': replica_name.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    READ_REPLICAS.append(alias)
+
+# Branch databases: BRANCH_DATABASES=westlands=/path/westlands.sqlite3,karen=/path/karen.sqlite3
+# Orders, tables and payments of a listed branch live in its own database.
+BRANCH_DATABASES = {}
+for branch_spec in filter(None, os.environ.get('BRANCH_DATABASES', '').split(',')):
+    branch_name, _, branch_path = branch_spec.partition('=')
+    alias = f'branch_{branch_name.strip()}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': branch_path.strip(),
+    }
+    BRANCH_DATABASES[branch_name.strip()] = alias
+
+# `manage.py test` also gets a mirrored replica and a branch database, so
+# replica and shard routing run end to end. Test classes switch routing to
+# them on with override_settings(READ_REPLICAS=..., BRANCH_DATABASES=...).
+if sys.argv[1:2] == ['test']:
+    DATABASES.setdefault('test_replica', {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'test_replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    })
+    DATABASES.setdefault('test_branch', {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'test_branch.sqlite3'),
+    })
+
+DATABASE_ROUTERS = ['restaurant.sharding.BranchRouter', 'restaurant.db_router.ReadReplicaRouter']
+REPLICA_STICKINESS_SECONDS = 5
+
 # For better security, use environment variables in production:
 # DATABASES = {
 #     'default': {
@@ -0,0 +1,138 @@
+"""
+Production settings for Restaurant_Order.
+
+Select with DJANGO_SETTINGS_MODULE=Restaurant_Order.settings_production.
+Required: DJANGO_SECRET_KEY. Optional: DJANGO_ALLOWED_HOSTS (comma
+separated), DJANGO_DEBUG, DB_CONN_MAX_AGE, DJANGO_CACHE_BACKEND,
+DJANGO_CACHE_LOCATION, DJANGO_LOG_LEVEL.
+"""
+from .settings import *  # noqa: F401,F403
+from django.core.exceptions import ImproperlyConfigured
+
+from restaurant.utils.sqlite import PRODUCTION_PRAGMAS
+
+
+# Database
+# SQLite tuned for concurrent writers on a single box: WAL journal, relaxed
+# fsync, a 20 s lock wait (OPTIONS timeout, which sets SQLite's busy
+# timeout) instead of immediate "database is locked" errors, and write
+# transactions that take the lock up front (no deadlocking upgrades).
+
+SQLITE_PRAGMAS = dict(PRODUCTION_PRAGMAS)
+
+for alias, database in DATABASES.items():
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        continue
+    options = database.setdefault('OPTIONS', {})
+    options['timeout'] = 20
+    # Replicas only serve reads; taking the write lock up front would
+    # serialise them for nothing
+    if alias not in READ_REPLICAS:
+        options['transaction_mode'] = 'IMMEDIATE'
+
+
+def env_bool(name, default=False):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_list(name, default=''):
+    return [value.strip() for value in os.environ.get(name, default).split(',') if value.strip()]
+
+
+# Core
+
+DEBUG = env_bool('DJANGO_DEBUG', False)
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', '')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('DJANGO_SECRET_KEY must be set in production')
+
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', 'localhost')
+CSRF_TRUSTED_ORIGINS = env_list('DJANGO_CSRF_TRUSTED_ORIGINS')
+
+SESSION_COOKIE_SECURE = env_bool('DJANGO_SECURE_COOKIES', True)
+CSRF_COOKIE_SECURE = SESSION_COOKIE_SECURE
+
+
+# Persistent database connections, checked before reuse, on every alias
+# (primary, read replicas and branch databases alike)
+
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+    database['CONN_HEALTH_CHECKS'] = True
+
+
+# Templates are compiled once per process
+
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+
+# Static files with content-hashed names (run collectstatic on deploy).
+# Non-strict so templates referencing a missing asset fall back to the
+# unhashed URL instead of raising.
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage',
+        'OPTIONS': {'manifest_strict': False},
+    },
+}
+
+
+# Cache
+# Shared by every worker process: cached pages and dashboards are
+# invalidated on writes, which a per-process LocMemCache would only see in
+# the process that made the write. Defaults to the database cache (run
+# `python manage.py createcachetable` on deploy); point it at Redis or
+# Memcached with e.g.
+#      DJANGO_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#      DJANGO_CACHE_LOCATION=redis://127.0.0.1:6379/1
+
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION', 'restaurant_cache'),
+        'TIMEOUT': int(os.environ.get('DJANGO_CACHE_TIMEOUT', 300)),
+    }
+}
+if CACHES['default']['BACKEND'] in PROCESS_LOCAL_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f"{CACHES['default']['BACKEND']} is not shared between processes; "
+        'set DJANGO_CACHE_BACKEND to the database, Redis or Memcached cache'
+    )
+
+
+# Logging: no per-query SQL logging
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO'),
+    },
+    'loggers': {
+        'django.db.backends': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
@@ -1,5 +1,6 @@
 
 from django.contrib import admin
+from Restaurant_Order.batching import order_batch, mark_order_dirty
 from .models import MenuCategory, MenuItem, Room, Order, OrderItem, Payment
 
 class OrderItemInline(admin.TabularInline):
@@ -13,6 +14,12 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ("customer_name", "room__number")
     inlines = [OrderItemInline]
 
+    def save_related(self, request, form, formsets, change):
+        # Recalculate totals once after all inline lines are saved/deleted
+        with order_batch():
+            super().save_related(request, form, formsets, change)
+            mark_order_dirty(form.instance)
+
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
     list_display = ("name", "sku", "category", "price", "is_active")
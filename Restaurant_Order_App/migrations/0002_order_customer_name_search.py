@@ -0,0 +1,84 @@
+from django.db import migrations
+
+# Names are spelled out rather than imported from Restaurant_Order_App.search,
+# so later edits to that module cannot change what this migration runs.
+ORDER_TABLE = "Restaurant_Order_App_order"
+FTS_TABLE = "Restaurant_Order_App_order_name_fts"
+PG_TRGM_INDEX = "hotel_order_customer_name_trgm"
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE "{FTS_TABLE}" USING fts5(
+        customer_name, content='{ORDER_TABLE}', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER "{FTS_TABLE}_ai" AFTER INSERT ON "{ORDER_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"(rowid, customer_name) VALUES (new.id, new.customer_name);
+    END""",
+    f"""CREATE TRIGGER "{FTS_TABLE}_ad" AFTER DELETE ON "{ORDER_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, customer_name)
+        VALUES ('delete', old.id, old.customer_name);
+    END""",
+    f"""CREATE TRIGGER "{FTS_TABLE}_au" AFTER UPDATE OF customer_name ON "{ORDER_TABLE}" BEGIN
+        INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, customer_name)
+        VALUES ('delete', old.id, old.customer_name);
+        INSERT INTO "{FTS_TABLE}"(rowid, customer_name) VALUES (new.id, new.customer_name);
+    END""",
+    f"""INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}") VALUES ('rebuild')""",
+]
+
+SQLITE_BACKWARD = [
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_ai"',
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_ad"',
+    f'DROP TRIGGER IF EXISTS "{FTS_TABLE}_au"',
+    f'DROP TABLE IF EXISTS "{FTS_TABLE}"',
+]
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"""CREATE INDEX IF NOT EXISTS "{PG_TRGM_INDEX}" ON "{ORDER_TABLE}"
+        USING gin (UPPER("customer_name"::text) gin_trgm_ops)""",
+]
+
+POSTGRES_BACKWARD = [
+    f'DROP INDEX IF EXISTS "{PG_TRGM_INDEX}"',
+]
+
+
+def sqlite_supports_trigram(connection):
+    """FTS5 with the trigram tokenizer needs SQLite 3.34+."""
+    if connection.Database.sqlite_version_info < (3, 34, 0):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "sqlite":
+        if not sqlite_supports_trigram(connection):
+            return
+        statements = SQLITE_FORWARD
+    elif connection.vendor == "postgresql":
+        statements = POSTGRES_FORWARD
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("Restaurant_Order_App", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
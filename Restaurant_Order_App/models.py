@@ -2,9 +2,11 @@ from decimal import Decimal
 from django.conf import settings
 from django.db import models
 from django import forms
-from django.db.models import Q, Sum
+from django.db.models import F, Q, Sum
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from Restaurant_Order.batching import mark_order_dirty
+
 
 
 class TimeStampedModel(models.Model):
@@ -127,10 +129,14 @@ class Order(TimeStampedModel):
         Recalculate subtotal (sum of line totals), apply discount and tax.
         Adjust logic if you want percentage tax/discount.
         """
-        lines = self.items.all().values("qty", "unit_price")
-        subtotal = sum((Decimal(l["qty"]) * Decimal(l["unit_price"])) for l in lines) or Decimal("0.00")
+        if self.pk is None:
+            # Unsaved orders have no lines yet; skip the query
+            subtotal = Decimal("0.00")
+        else:
+            subtotal = self.items.aggregate(
+                s=Sum(F("unit_price") * F("qty"), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+            )["s"] or Decimal("0.00")
 
-        
         total = subtotal - self.discount + self.tax
         if total < Decimal("0.00"):
             total = Decimal("0.00")
@@ -143,6 +149,12 @@ class Order(TimeStampedModel):
 
     @property
     def amount_paid(self) -> Decimal:
+        prefetched = getattr(self, "_prefetched_objects_cache", {})
+        if "payments" in prefetched:
+            return sum(
+                (p.amount for p in prefetched["payments"] if p.status == Payment.Status.SUCCESS),
+                Decimal("0.00"),
+            )
         paid = self.payments.filter(status=Payment.Status.SUCCESS).aggregate(
             s=Sum("amount")
         )["s"] or Decimal("0.00")
@@ -208,8 +220,9 @@ class OrderItem(TimeStampedModel):
         if self.item and (self.unit_price is None or self.unit_price == ""):
             self.unit_price = self.item.price
         super().save(*args, **kwargs)
-        
-        self.order.recalc_totals(commit=True)
+
+        if not mark_order_dirty(self.order):
+            self.order.recalc_totals(commit=True)
 
 
 
@@ -0,0 +1,45 @@
+"""
+Customer-name search for room-service orders.
+
+Free text is matched through a trigram index created by migration 0002:
+an FTS5 table with the trigram tokenizer on SQLite, and a pg_trgm GIN
+index on UPPER(customer_name) on PostgreSQL (which is what Django's
+icontains compiles to there). Other backends fall back to a plain scan.
+"""
+from django.db import connections
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "Restaurant_Order_App_order_name_fts"
+
+# Trigram indexes cannot answer terms shorter than one trigram
+MIN_TRIGRAM_LENGTH = 3
+
+_fts_available = {}
+
+
+def fts_available(alias):
+    """Whether the customer-name FTS table exists on the given database."""
+    if alias not in _fts_available:
+        connection = connections[alias]
+        _fts_available[alias] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available[alias]
+
+
+def search_customer_name(queryset, term):
+    """Filter an Order queryset to customer names containing `term`."""
+    term = (term or "").strip()
+    if not term:
+        return queryset
+
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        return queryset.filter(customer_name__istartswith=term)
+
+    alias = queryset.db
+    if connections[alias].vendor == "sqlite" and fts_available(alias):
+        phrase = '"%s"' % term.replace('"', '""')
+        matches = RawSQL(
+            f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s', [phrase]
+        )
+        return queryset.filter(pk__in=matches)
+
+    return queryset.filter(customer_name__icontains=term)
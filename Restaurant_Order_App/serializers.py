@@ -2,7 +2,9 @@
 from decimal import Decimal
 from typing import List, Dict
 
+from django.db import transaction
 from rest_framework import serializers
+from Restaurant_Order.batching import order_batch, mark_order_dirty
 from .models import (
     MenuCategory, MenuItem,
     Room, Order, OrderItem, Payment
@@ -107,32 +109,26 @@ class OrderSerializer(serializers.ModelSerializer):
         existing = {oi.id: oi for oi in order.items.all()}
         seen_ids = set()
 
-        for item in items_data:
-            oi_id = item.get("id")
-
-           
-            menu_item = item.get("item", None)
-            if menu_item and not item.get("item_name"):
-               
-                pass
-
-            if oi_id and oi_id in existing:
-                oi = existing[oi_id]
-                for attr in ("item", "item_name", "unit_price", "qty"):
-                    if attr in item:
-                        setattr(oi, attr, item[attr])
-                oi.save()
-                seen_ids.add(oi_id)
-            else:
-                OrderItem.objects.create(order=order, **item)
+        # Line saves only mark the order dirty; totals are recalculated once
+        with order_batch():
+            for item in items_data:
+                oi_id = item.get("id")
 
-        
-        to_delete = [oi for oid, oi in existing.items() if oid not in seen_ids]
-        if to_delete:
-            OrderItem.objects.filter(id__in=[x.id for x in to_delete]).delete()
+                if oi_id and oi_id in existing:
+                    oi = existing[oi_id]
+                    for attr in ("item", "item_name", "unit_price", "qty"):
+                        if attr in item:
+                            setattr(oi, attr, item[attr])
+                    oi.save()
+                    seen_ids.add(oi_id)
+                else:
+                    OrderItem.objects.create(order=order, **item)
 
-        
-        order.recalc_totals(commit=True)
+            to_delete = [oi for oid, oi in existing.items() if oid not in seen_ids]
+            if to_delete:
+                OrderItem.objects.filter(id__in=[x.id for x in to_delete]).delete()
+
+            mark_order_dirty(order)
 
     
     def create(self, validated_data):
@@ -158,3 +154,52 @@ class OrderSerializer(serializers.ModelSerializer):
             instance.recalc_totals(commit=True)
 
         return instance
+
+
+class BasketLineSerializer(serializers.Serializer):
+    item = serializers.IntegerField(min_value=1)
+    qty = serializers.IntegerField(min_value=1)
+
+
+class RoomServiceOrderSerializer(serializers.Serializer):
+    """
+    Places a full room-service basket in one request.
+
+    Menu items are resolved with one query, lines are written with a single
+    bulk_create and totals come from one DB aggregate, so the number of
+    queries does not grow with the basket size.
+    """
+    customer_name = serializers.CharField(max_length=100)
+    room = serializers.PrimaryKeyRelatedField(queryset=Room.objects.filter(is_active=True))
+    notes = serializers.CharField(required=False, allow_blank=True)
+    discount = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.00"), required=False)
+    tax = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.00"), required=False)
+    items = BasketLineSerializer(many=True, allow_empty=False)
+
+    def validate_items(self, lines):
+        menu = MenuItem.objects.filter(is_active=True).in_bulk({line["item"] for line in lines})
+        missing = sorted({line["item"] for line in lines} - menu.keys())
+        if missing:
+            raise serializers.ValidationError(
+                f"Unknown or inactive menu items: {', '.join(map(str, missing))}"
+            )
+        for line in lines:
+            line["item"] = menu[line["item"]]
+        return lines
+
+    def create(self, validated_data):
+        lines = validated_data.pop("items")
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    item=line["item"],
+                    item_name=line["item"].name,
+                    unit_price=line["item"].price,
+                    qty=line["qty"],
+                )
+                for line in lines
+            ])
+            order.recalc_totals(commit=True)
+        return order
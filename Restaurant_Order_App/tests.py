@@ -1,3 +1,274 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from restaurant.models import User
+
+from .models import MenuCategory, MenuItem, Order, OrderItem, Room
+from .search import FTS_TABLE, fts_available, search_customer_name
+from .views import STATS_CACHE_KEY, order_stats, paginate_orders
+
+
+class OrderFilterBackendTests(TestCase):
+    """Query-string filters on the hotel orders API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='staff@example.com', password='pass')
+        cls.room_a = Room.objects.create(number='101')
+        cls.room_b = Room.objects.create(number='202')
+        cls.pending = Order.objects.create(customer_name='Jane Doe', room=cls.room_a)
+        cls.completed = Order.objects.create(customer_name='Sam Otieno', room=cls.room_b, status='COMPLETED')
+        cls.cancelled = Order.objects.create(customer_name='Janet Wanjiru', room=cls.room_a, status='CANCELLED')
+        Order.objects.filter(pk=cls.cancelled.pk).update(created_at=timezone.now() - timedelta(days=10))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ids(self, **params):
+        response = self.client.get('/api/hotel/orders/', params)
+        self.assertEqual(response.status_code, 200)
+        return {row['id'] for row in response.data}
+
+    def test_status_accepts_a_comma_separated_list(self):
+        self.assertEqual(self.ids(status='pending'), {self.pending.pk})
+        self.assertEqual(self.ids(status='PENDING,COMPLETED'), {self.pending.pk, self.completed.pk})
+
+    def test_room_filters(self):
+        self.assertEqual(self.ids(room=self.room_a.pk), {self.pending.pk, self.cancelled.pk})
+        self.assertEqual(self.ids(room_number='202'), {self.completed.pk})
+
+    def test_created_bounds_accept_dates_and_datetimes(self):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.ids(created_after=since), {self.pending.pk, self.completed.pk})
+        self.assertEqual(self.ids(created_before=f'{since}T00:00:00'), {self.cancelled.pk})
+
+    def test_customer_name_search(self):
+        self.assertEqual(self.ids(q='jan'), {self.pending.pk, self.cancelled.pk})
+        self.assertEqual(self.ids(q='wanji'), {self.cancelled.pk})
+        self.assertEqual(self.ids(q='ja'), {self.pending.pk, self.cancelled.pk})
+
+    def test_invalid_parameters_are_rejected(self):
+        for params in (
+            {'status': 'LOST'},
+            {'room': 'abc'},
+            {'created_after': 'yesterday'},
+            {'created_after': '2024-02-30'},
+            {'created_before': '2024-02-30T10:00'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get('/api/hotel/orders/', params)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(next(iter(params)), response.data)
+
+
+class CustomerNameSearchTests(TestCase):
+    """The FTS5 trigram table follows the orders table through triggers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(number='101')
+
+    def setUp(self):
+        if not fts_available(connection.alias):
+            self.skipTest('SQLite build without FTS5 trigram support')
+
+    def matches(self, term):
+        return set(search_customer_name(Order.objects.all(), term).values_list('customer_name', flat=True))
+
+    def fts_rowids(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s', ['"Doe"'])
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_search_goes_through_the_fts_table(self):
+        Order.objects.create(customer_name='Jane Doe', room=self.room)
+        sql = str(search_customer_name(Order.objects.all(), 'doe').query)
+
+        self.assertIn(FTS_TABLE, sql)
+        self.assertEqual(self.matches('doe'), {'Jane Doe'})
+
+    def test_triggers_track_insert_update_and_delete(self):
+        order = Order.objects.create(customer_name='Jane Doe', room=self.room)
+        self.assertEqual(self.fts_rowids(), {order.pk})
+
+        Order.objects.filter(pk=order.pk).update(customer_name='Jane Smith')
+        self.assertEqual(self.fts_rowids(), set())
+        self.assertEqual(self.matches('smith'), {'Jane Smith'})
+
+        order.delete()
+        self.assertEqual(self.matches('smith'), set())
+
+    def test_terms_are_quoted_as_a_phrase(self):
+        Order.objects.create(customer_name='Anne "AJ" Doe', room=self.room)
+        self.assertEqual(self.matches('"AJ"'), {'Anne "AJ" Doe'})
+        self.assertEqual(self.matches('AND OR'), set())
+
+
+class OrderPaginationTests(TestCase):
+    """Keyset pagination of the order list, newest first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        room = Room.objects.create(number='101')
+        Order.objects.bulk_create([Order(customer_name=f'Guest {n}', room=room) for n in range(7)])
+        # Two pairs of orders share a timestamp, so pages must break ties on id
+        moment = timezone.now() - timedelta(hours=1)
+        ids = list(Order.objects.order_by('id').values_list('id', flat=True))
+        Order.objects.filter(pk__in=ids[:2]).update(created_at=moment)
+        Order.objects.filter(pk__in=ids[2:4]).update(created_at=moment - timedelta(hours=1))
+        cls.expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_pages_cover_every_order_once_in_order(self):
+        seen, cursor, pages = [], None, 0
+        while True:
+            page, cursor = paginate_orders(Order.objects.all(), cursor, page_size=3)
+            seen += [order.pk for order in page]
+            pages += 1
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(pages, 3)
+
+    def test_each_page_is_one_query(self):
+        _, cursor = paginate_orders(Order.objects.all(), page_size=3)
+        with self.assertNumQueries(1):
+            page, _ = paginate_orders(Order.objects.all(), cursor, page_size=3)
+        self.assertEqual([order.pk for order in page], self.expected[3:6])
+
+    def test_malformed_cursor_starts_from_the_first_page(self):
+        page, _ = paginate_orders(Order.objects.all(), 'not-a-cursor', page_size=3)
+        self.assertEqual([order.pk for order in page], self.expected[:3])
+
+    def test_order_list_links_to_the_next_page(self):
+        room = Room.objects.get()
+        Order.objects.bulk_create([Order(customer_name='Walk in', room=room) for _ in range(20)])
+
+        response = self.client.get('/api/orders/', {'status': 'PENDING'})
+        self.assertEqual(len(response.context['orders']), 25)
+        self.assertIn('status=PENDING', response.context['next_query'])
+
+        response = self.client.get(f"/api/orders/?{response.context['next_query']}")
+        self.assertEqual([order.pk for order in response.context['orders']], self.expected[-2:])
+        self.assertIsNone(response.context['next_query'])
+
+
+class OrderStatsTests(TestCase):
+    """Home-page order counts come from one grouped query and are cached."""
+
+    @classmethod
+    def setUpTestData(cls):
+        room = Room.objects.create(number='101')
+        for status in ('PENDING', 'PENDING', 'COMPLETED', 'CANCELLED'):
+            Order.objects.create(customer_name='Guest', room=room, status=status)
+
+    def setUp(self):
+        cache.delete(STATS_CACHE_KEY)
+        self.addCleanup(cache.delete, STATS_CACHE_KEY)
+
+    def test_counts_come_from_one_query_then_the_cache(self):
+        with self.assertNumQueries(1):
+            stats = order_stats()
+        self.assertEqual(stats, {'total_orders': 4, 'pending': 2, 'completed': 1})
+
+        Order.objects.filter(status='PENDING').update(status='COMPLETED')
+        with self.assertNumQueries(0):
+            self.assertEqual(order_stats(), stats)
+
+    def test_counts_refresh_once_the_entry_expires(self):
+        order_stats()
+        Order.objects.filter(status='PENDING').update(status='COMPLETED')
+        cache.delete(STATS_CACHE_KEY)
+
+        self.assertEqual(order_stats(), {'total_orders': 4, 'pending': 0, 'completed': 3})
+
+
+class RoomServiceOrderTests(TestCase):
+    """A whole basket is placed in one request at a constant query count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='staff@example.com', password='pass')
+        cls.room = Room.objects.create(number='101')
+        category = MenuCategory.objects.create(name='Mains')
+        cls.menu = MenuItem.objects.bulk_create([
+            MenuItem(category=category, name=f'Dish {n}', sku=f'DSH{n:03d}', price=Decimal('2.50'))
+            for n in range(40)
+        ])
+        cls.retired = MenuItem.objects.create(
+            category=category, name='Retired', sku='OLD001', price=Decimal('1.00'), is_active=False
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def place(self, items, **extra):
+        payload = {'customer_name': 'Jane Doe', 'room': self.room.pk, 'items': items, **extra}
+        return self.client.post('/api/hotel/orders/room-service/', payload, format='json')
+
+    def test_query_count_does_not_depend_on_basket_size(self):
+        # Room and menu lookups, order INSERT, lines bulk_create, totals
+        # aggregate and UPDATE inside a savepoint, then the re-read with its
+        # item and payment prefetches.
+        for size in (2, 40):
+            with self.subTest(lines=size), self.assertNumQueries(11):
+                response = self.place([{'item': item.pk, 'qty': 2} for item in self.menu[:size]])
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(len(response.data['items']), size)
+
+    def test_lines_and_totals_are_persisted(self):
+        response = self.place(
+            [{'item': self.menu[0].pk, 'qty': 2}, {'item': self.menu[1].pk, 'qty': 1}],
+            tax='1.00', discount='0.50',
+        )
+
+        order = Order.objects.get(pk=response.data['id'])
+        self.assertEqual((order.subtotal, order.total), (Decimal('7.50'), Decimal('8.00')))
+        self.assertEqual(order.created_by, self.user)
+        self.assertEqual(
+            sorted(order.items.values_list('item_name', 'unit_price', 'qty')),
+            [('Dish 0', Decimal('2.50'), 2), ('Dish 1', Decimal('2.50'), 1)],
+        )
+
+    def test_unknown_or_inactive_items_reject_the_whole_basket(self):
+        response = self.place([{'item': self.menu[0].pk, 'qty': 1}, {'item': self.retired.pk, 'qty': 1}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(self.retired.pk), str(response.data['items']))
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+
+class OrderCreateViewTests(TestCase):
+    """The HTML create form writes totals with the INSERT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = Room.objects.create(number='101')
+
+    def test_totals_are_written_without_a_second_update(self):
+        data = {
+            'customer_name': 'Jane Doe', 'room': self.room.pk, 'status': 'PENDING',
+            'notes': '', 'discount': '1.00', 'tax': '3.50',
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/orders/new/', data)
 
-# Create your tests here.
+        order = Order.objects.get()
+        self.assertRedirects(response, f'/api/orders/{order.pk}/', fetch_redirect_response=False)
+        self.assertEqual((order.subtotal, order.total), (Decimal('0.00'), Decimal('2.50')))
+        order_writes = [
+            q['sql'] for q in queries.captured_queries
+            if q['sql'].startswith(('INSERT', 'UPDATE')) and 'Restaurant_Order_App_order"' in q['sql']
+        ]
+        self.assertEqual(len(order_writes), 1)
+        self.assertTrue(order_writes[0].startswith('INSERT'))
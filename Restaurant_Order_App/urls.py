@@ -1,9 +1,14 @@
 # Hotel_Order_App/urls.py
-from django.urls import path
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
 from . import views
+from . import views_api
 
 app_name = 'api'  # This matches the namespace in the main urls.py
 
+router = DefaultRouter()
+router.register('orders', views_api.OrderViewSet, basename='hotel-order')
+
 urlpatterns = [
     path('', views.Home, name='home'),
     path('orders/', views.Order_list, name='order_list'),
@@ -11,4 +16,5 @@ urlpatterns = [
     path('orders/<int:pk>/', views.Order_detail, name='order_detail'),
     path('orders/<int:pk>/edit/', views.Order_edit, name='order_edit'),
     path('menu/', views.Menu_list, name='menu_list'),
+    path('hotel/', include(router.urls)),
 ]
@@ -1,40 +1,99 @@
 
-from django.shortcuts import render, redirect
 from datetime import datetime
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.shortcuts import render, redirect, get_object_or_404
 from .forms import OrderForm
+from .models import Order
+from .search import search_customer_name
+
+ORDERS_PAGE_SIZE = 25
+STATS_CACHE_KEY = "hotel_order_stats"
+STATS_CACHE_TTL = 30  # seconds
+
+
+def order_stats():
+    """Order counts per status from one grouped aggregate, cached briefly."""
+    def compute():
+        counts = dict(
+            Order.objects.order_by().values_list("status").annotate(n=Count("id"))
+        )
+        return {
+            "total_orders": sum(counts.values()),
+            "pending": counts.get(Order.Status.PENDING, 0),
+            "completed": counts.get(Order.Status.COMPLETED, 0),
+        }
+    return cache.get_or_set(STATS_CACHE_KEY, compute, STATS_CACHE_TTL)
+
+
+def _encode_cursor(order):
+    return f"{order.created_at.isoformat()}_{order.pk}"
+
+
+def _decode_cursor(value):
+    try:
+        created_at, pk = value.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def paginate_orders(queryset, cursor=None, page_size=ORDERS_PAGE_SIZE):
+    """
+    Keyset pagination on (created_at, id), newest first.
+
+    Returns the page of orders and the cursor of the next page (or None).
+    Each page seeks from the previous page's last row instead of skipping
+    OFFSET rows, so deep pages stay as cheap as the first.
+    """
+    queryset = queryset.order_by("-created_at", "-id")
+    position = _decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    rows = list(queryset[:page_size + 1])
+    next_cursor = _encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
 
-DEMO_ORDERS = [
-    {
-        "id": 1, "customer_name": "Alice Kim", "room_number": "203",
-        "status": "PENDING", "total": 24.50, "created_at": datetime.now(),
-        "items": [{"name":"Club Sandwich","qty":1,"price":12.50},
-                  {"name":"Tea","qty":2,"price":6.00}],
-        "notes": "No onions"
-    },
-    {
-        "id": 2, "customer_name": "John Doe", "room_number": "110",
-        "status": "COMPLETED", "total": 18.00, "created_at": datetime.now(),
-        "items": [{"name":"Pasta","qty":1,"price":12.00},
-                  {"name":"Soda","qty":1,"price":6.00}],
-        "notes": ""
-    },
-]
 
 def Home(request):
-    stats = {
-        "total_orders": len(DEMO_ORDERS),
-        "pending": sum(1 for o in DEMO_ORDERS if o["status"] == "PENDING"),
-        "completed": sum(1 for o in DEMO_ORDERS if o["status"] == "COMPLETED"),
-    }
-    recent = sorted(DEMO_ORDERS, key=lambda o: o["created_at"], reverse=True)[:5]
-    return render(request, "Restaurant_Order_App/Home.html", {"stats": stats, "recent_orders": recent})
+    recent = Order.objects.select_related("room").order_by("-created_at", "-id")[:5]
+    return render(request, "Restaurant_Order_App/home.html", {
+        "stats": order_stats(),
+        "recent_orders": recent,
+    })
 
 def Order_list(request):
-    return render(request, "Restaurant_Order_App/Order_list.html", {"orders": DEMO_ORDERS})
+    orders = Order.objects.select_related("room").prefetch_related("items")
+
+    status = request.GET.get("status")
+    if status in Order.Status.values:
+        orders = orders.filter(status=status)
+
+    q = request.GET.get("q", "").strip()
+    if q:
+        orders = search_customer_name(orders, q) | orders.filter(room__number=q)
+
+    page, next_cursor = paginate_orders(orders, request.GET.get("after"))
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params["after"] = next_cursor
+        next_query = params.urlencode()
+
+    return render(request, "Restaurant_Order_App/order_list.html", {
+        "orders": page,
+        "next_query": next_query,
+    })
 
 def Order_detail(request, pk):
-    order = next((o for o in DEMO_ORDERS if o["id"] == pk), None)
-    return render(request, "Restaurant_Order_App/Order_detail.html", {"order": order})
+    order = get_object_or_404(
+        Order.objects.select_related("room").prefetch_related("items"), pk=pk
+    )
+    return render(request, "Restaurant_Order_App/order_detail.html", {"order": order})
 
 
 def Order_create(request):
@@ -43,15 +102,17 @@ def Order_create(request):
         if form.is_valid():
             order = form.save(commit=False)
             order.created_by = request.user if request.user.is_authenticated else None
+            # New orders have no lines yet: compute totals in memory and
+            # write them with the INSERT instead of a second UPDATE
+            order.recalc_totals(commit=False)
             order.save()
-            order.recalc_totals()
-            return redirect("Order_detail", pk=order.pk)
+            return redirect("api:order_detail", pk=order.pk)
     else:
         form = OrderForm()
-    return render(request, "Restaurant_Order_App/Order_form.html", {"form": form})
+    return render(request, "Restaurant_Order_App/order_form.html", {"form": form})
 
 def Order_edit(request, pk):
-    return render(request, "Restaurant_Order_App/Order_form.html", {"form": type("F", (), {"instance": type("I", (), {"pk": pk})()})()})
+    return render(request, "Restaurant_Order_App/order_form.html", {"form": type("F", (), {"instance": type("I", (), {"pk": pk})()})()})
 
 
 def Menu_list(request):
@@ -1,10 +1,96 @@
+from datetime import datetime, time
+
+from django.db.models import Prefetch
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
-from rest_framework import filters
-from .models import Order
-from .serializers import OrderSerializer
+from .models import Order, OrderItem
+from .search import search_customer_name
+from .serializers import OrderSerializer, RoomServiceOrderSerializer
+
+
+class OrderFilterBackend(BaseFilterBackend):
+    """
+    Indexed query-string filters for orders:
+
+    - ``status``: exact status, or a comma separated list
+    - ``room``: room id; ``room_number``: exact room number
+    - ``created_after`` / ``created_before``: ISO date or datetime bounds
+    - ``q``: customer-name search through the trigram index
+
+    Status and created_at bounds together are served by the
+    (status, created_at) index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        statuses = [s for s in params.get("status", "").upper().split(",") if s]
+        if statuses:
+            invalid = set(statuses) - set(Order.Status.values)
+            if invalid:
+                raise ValidationError({"status": f"Unknown status: {', '.join(sorted(invalid))}"})
+            queryset = queryset.filter(status__in=statuses)
+
+        room = params.get("room")
+        if room:
+            if not room.isdigit():
+                raise ValidationError({"room": "Room must be a numeric id."})
+            queryset = queryset.filter(room_id=int(room))
+        if params.get("room_number"):
+            queryset = queryset.filter(room__number=params["room_number"])
+
+        created_after = self._parse_moment(params, "created_after")
+        if created_after:
+            queryset = queryset.filter(created_at__gte=created_after)
+        created_before = self._parse_moment(params, "created_before")
+        if created_before:
+            queryset = queryset.filter(created_at__lt=created_before)
+
+        return search_customer_name(queryset, params.get("q"))
+
+    def _parse_moment(self, params, name):
+        value = params.get(name)
+        if not value:
+            return None
+        # parse_* return None for malformed input but raise ValueError for
+        # well-formed impossible values such as 2024-02-30
+        try:
+            moment = parse_datetime(value)
+            day = parse_date(value) if moment is None else None
+        except ValueError:
+            moment = day = None
+        if moment is None:
+            if day is None:
+                raise ValidationError({name: "Expected an ISO date or datetime."})
+            moment = datetime.combine(day, time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
 
 class OrderViewSet(ModelViewSet):
-    queryset = Order.objects.prefetch_related("items").order_by("-created_at")
+    queryset = Order.objects.select_related("room", "created_by").prefetch_related(
+        Prefetch("items", queryset=OrderItem.objects.select_related("item")),
+        "payments",
+    ).order_by("-created_at")
     serializer_class = OrderSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["customer_name", "room_number", "status"]
+    permission_classes = [IsAuthenticated]
+    filter_backends = [OrderFilterBackend]
+
+    @action(detail=False, methods=["post"], url_path="room-service")
+    def room_service(self, request):
+        """Place a whole basket: {customer_name, room, items: [{item, qty}, ...]}."""
+        serializer = RoomServiceOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        order = serializer.save(created_by=request.user)
+
+        order = self.get_queryset().get(pk=order.pk)
+        data = OrderSerializer(order, context=self.get_serializer_context()).data
+        return Response(data, status=status.HTTP_201_CREATED)
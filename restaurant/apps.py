@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class RestaurantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'restaurant'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .utils.sqlite import configure_sqlite_connection
+
+        connection_created.connect(configure_sqlite_connection, dispatch_uid='restaurant_sqlite_pragmas')
@@ -4,6 +4,8 @@ from django.contrib.auth.backends import ModelBackend
 class EmailBackend(ModelBackend):
     def authenticate(self, request, email=None, password=None, **kwargs):
         UserModel = get_user_model()
+        # The login form posts the email as "username"
+        email = email or kwargs.get('username')
         try:
             user = UserModel.objects.get(email=email)
             if user.check_password(password):
@@ -15,6 +17,8 @@ class EmailBackend(ModelBackend):
     def get_user(self, user_id):
         UserModel = get_user_model()
         try:
-            return UserModel.objects.get(pk=user_id)
+            # Join the customer profile so request.customer costs no extra query
+            user = UserModel.objects.select_related('customer').get(pk=user_id)
         except UserModel.DoesNotExist:
             return None
+        return user if self.user_can_authenticate(user) else None
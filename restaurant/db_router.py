@@ -0,0 +1,140 @@
+"""
+Read-replica routing
+
+Reads go to the primary unless code opts in with read_replica(), which is
+reserved for staleness-tolerant paths (menu snapshots, kitchen display,
+order history, reports, analytics):
+
+    with read_replica():
+        orders = list(Order.objects.filter(...))
+
+    @read_replica()
+    def order_history(request): ...
+
+Replica aliases come from settings.READ_REPLICAS. One replica is picked per
+request (ReplicaStickinessMiddleware resets the choice) or, outside
+requests, per thread, so a page never mixes snapshots from two replicas.
+After a session writes (any non-GET request), ReplicaStickinessMiddleware
+pins that session to the primary for REPLICA_STICKINESS_SECONDS so users
+read their own writes. Only existing sessions are pinned; the middleware
+never creates one, and does nothing when no replicas are configured.
+"""
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+import random
+import time
+
+from django.conf import settings
+
+_use_replica = ContextVar('use_read_replica', default=False)
+_pinned_to_primary = ContextVar('pinned_to_primary', default=False)
+_chosen_replica = ContextVar('chosen_read_replica', default=None)
+
+PRIMARY = 'default'
+STICKY_SESSION_KEY = '_db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class read_replica(ContextDecorator):
+    """Route reads inside the block/function to a read replica"""
+
+    def __enter__(self):
+        self._token = _use_replica.set(True)
+        return self
+
+    def __exit__(self, *exc):
+        _use_replica.reset(self._token)
+        return False
+
+
+class pin_to_primary(ContextDecorator):
+    """Force reads inside the block/function to the primary"""
+
+    def __enter__(self):
+        self._token = _pinned_to_primary.set(True)
+        return self
+
+    def __exit__(self, *exc):
+        _pinned_to_primary.reset(self._token)
+        return False
+
+
+def replica_aliases():
+    return list(getattr(settings, 'READ_REPLICAS', []))
+
+
+def _current_replica(replicas):
+    """The replica chosen for this request/thread, picking one on first use"""
+    alias = _chosen_replica.get()
+    if alias not in replicas:
+        alias = random.choice(replicas)
+        _chosen_replica.set(alias)
+    return alias
+
+
+class ReadReplicaRouter:
+    """Send opted-in reads to this request's replica; everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or _pinned_to_primary.get():
+            return None
+        if model._meta.app_label == 'django_cache':
+            # DatabaseCache entries are invalidated on the primary; a lagging
+            # replica would serve the stale copy
+            return None
+        replicas = replica_aliases()
+        return _current_replica(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        pool = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication
+        if db in replica_aliases():
+            return False
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    """
+    Read-your-writes: a session that just wrote reads from the primary for
+    REPLICA_STICKINESS_SECONDS. Also starts each request without a chosen
+    replica. Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        session = getattr(request, 'session', None)
+        if session is not None and not session.session_key:
+            # No session cookie (API clients): don't create a session row per write
+            session = None
+        writes = request.method not in SAFE_METHODS
+        sticky = writes or (
+            session is not None and session.get(STICKY_SESSION_KEY, 0) > time.time()
+        )
+
+        token = _pinned_to_primary.set(True) if sticky else None
+        replica_token = _chosen_replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _chosen_replica.reset(replica_token)
+            if token is not None:
+                _pinned_to_primary.reset(token)
+
+        if writes and session is not None:
+            seconds = getattr(settings, 'REPLICA_STICKINESS_SECONDS', 5)
+            session[STICKY_SESSION_KEY] = time.time() + seconds
+        return response
@@ -1,8 +1,10 @@
 from django import forms
 from django.contrib.auth import get_user_model
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import PasswordResetForm, UserCreationForm
 from django.core.exceptions import ValidationError
 
+from restaurant.tasks import enqueue, send_password_reset_email
+
 User = get_user_model()
 
 class CustomUserCreationForm(forms.ModelForm):
@@ -51,3 +53,25 @@ class CustomUserCreationForm(forms.ModelForm):
         if commit:
             user.save()
         return user
+
+
+class QueuedPasswordResetForm(PasswordResetForm):
+    """
+    Password reset form that hands rendering and delivery to the background
+    worker, so a slow mail server does not hold up the response. The queued
+    payload holds the user id and template names only; the reset token is
+    generated by the worker when the email is sent.
+    """
+    def send_mail(self, subject_template_name, email_template_name, context,
+                  from_email, to_email, html_email_template_name=None):
+        enqueue(
+            send_password_reset_email,
+            user_id=context['user'].pk,
+            subject_template_name=subject_template_name,
+            email_template_name=email_template_name,
+            html_email_template_name=html_email_template_name,
+            domain=context['domain'],
+            site_name=context['site_name'],
+            use_https=context['protocol'] == 'https',
+            from_email=from_email,
+        )
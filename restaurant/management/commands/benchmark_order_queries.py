@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from restaurant.models import ACTIVE_ORDER_STATUSES, Order, Table
+from restaurant.utils.order_manager import OrderManager
+
+
+class Command(BaseCommand):
+    help = (
+        'Show query plans and latency of the hot active-order queries, with and '
+        'without the partial indexes. Generate history first, e.g. '
+        '`generate_load_data --orders 1000000`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--database', default='default', help='Database alias to benchmark')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be >= 1')
+
+        using = options['database']
+        table_id = (
+            Order.objects.using(using).active().values_list('table_id', flat=True).first()
+            or Table.objects.using(using).values_list('id', flat=True).first()
+        )
+        total = Order.objects.using(using).count()
+        active = Order.objects.using(using).active().count()
+        self.stdout.write(f'{connections[using].vendor}: {total} orders, {active} active')
+
+        # (name, partial-index query, equivalent query that cannot use the partial indexes)
+        queries = [
+            ('pending', OrderManager.get_pending_orders(),
+             Order.objects.filter(status='PENDING').order_by('created_at')),
+            ('kitchen queue', OrderManager.get_kitchen_queue(),
+             Order.objects.filter(status__in=['CONFIRMED', 'PREPARING']).order_by('created_at')),
+            ('ready', OrderManager.get_ready_orders(),
+             Order.objects.filter(status='READY').order_by('updated_at')),
+            ('table active orders', OrderManager.get_active_orders_by_table(table_id),
+             Order.objects.filter(table_id=table_id, status__in=ACTIVE_ORDER_STATUSES)),
+        ]
+
+        for name, partial, baseline in queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for label, queryset in (('partial index', partial), ('baseline', baseline)):
+                queryset = queryset.using(using).values_list('id', flat=True)
+                self.stdout.write(f'  {label}: {self._time(queryset, options["repeat"])}')
+                for line in queryset.explain().splitlines():
+                    self.stdout.write(f'      {line}')
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
+
+    def _time(self, queryset, repeat):
+        """Median and p95 latency of fetching the matching ids"""
+        rows = len(queryset)  # warm the cache
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        return f'{rows} rows, median {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms'
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from restaurant.sharding import branch_databases
+from restaurant.tasks import email_daily_report, enqueue
+from restaurant.utils.analytics import daily_sales_summary, format_daily_report
+
+
+class Command(BaseCommand):
+    help = 'Print sales figures for one day across branches (read from a replica when configured)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Report date (YYYY-MM-DD), defaults to yesterday')
+        parser.add_argument('--top', type=int, default=10, help='Number of best-selling items to list')
+        parser.add_argument('--branch', action='append', help='Limit the report to a branch (repeatable)')
+        parser.add_argument('--email', action='append',
+                            help='Queue the report for the task worker to email here instead of printing it (repeatable)')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f'Invalid date "{options["date"]}", expected YYYY-MM-DD')
+        else:
+            day = timezone.localdate() - timedelta(days=1)
+
+        unknown = set(options['branch'] or []) - set(branch_databases())
+        if unknown:
+            raise CommandError(f'Unknown branch(es): {", ".join(sorted(unknown))}')
+
+        if options['email']:
+            enqueue(email_daily_report, day=day.isoformat(), to=options['email'],
+                    branches=options['branch'], top=options['top'])
+            self.stdout.write(self.style.SUCCESS(
+                f'Queued daily report for {day:%Y-%m-%d} to {", ".join(options["email"])}'
+            ))
+            return
+
+        report = daily_sales_summary(day, branches=options['branch'] or None, top=options['top'])
+        title, *lines = format_daily_report(day, report)
+        self.stdout.write(self.style.SUCCESS(title))
+        for line in lines:
+            self.stdout.write(line)
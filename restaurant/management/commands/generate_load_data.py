@@ -0,0 +1,337 @@
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import DateTimeField, Max
+from django.utils import timezone
+
+from restaurant.models import (
+    DEFAULT_BRANCH, Customer, MenuCategory, MenuItem, Order, OrderItem, Payment, Table, User
+)
+from restaurant.search import menu_prefix_index
+from restaurant.sharding import PRIMARY, SHARDED_MODELS, branch_database
+from restaurant.utils.customer_stats import refresh_customer_stats
+
+# Relative order volume per hour of day (lunch and dinner peaks)
+HOUR_WEIGHTS = [
+    0, 0, 0, 0, 0, 0, 1, 3, 5, 4, 3, 6,
+    12, 14, 9, 4, 3, 5, 10, 14, 13, 9, 5, 2,
+]
+# Monday .. Sunday
+WEEKDAY_WEIGHTS = [0.8, 0.85, 0.9, 1.0, 1.3, 1.5, 1.2]
+ITEMS_PER_ORDER_WEIGHTS = [30, 30, 20, 10, 6, 4]  # 1..6 lines
+QTY_WEIGHTS = [70, 20, 7, 3]  # 1..4 units
+PAYMENT_METHOD_WEIGHTS = {
+    Payment.Method.MOBILE: 55, Payment.Method.CASH: 25, Payment.Method.CARD: 18, Payment.Method.OTHER: 2,
+}
+ACTIVE_STATUSES = [
+    Order.Status.PENDING, Order.Status.CONFIRMED, Order.Status.PREPARING,
+    Order.Status.READY, Order.Status.SERVED,
+]
+CANCELLED_RATE = 0.06
+
+FIRST_NAMES = ['Wanjiru', 'Otieno', 'Achieng', 'Kamau', 'Njeri', 'Mwangi', 'Akinyi', 'Kiprop', 'Amina', 'Juma']
+LAST_NAMES = ['Kariuki', 'Odhiambo', 'Wambui', 'Mutua', 'Chebet', 'Omondi', 'Kilonzo', 'Hassan', 'Njoroge', 'Wafula']
+LOCATIONS = ['Main Room', 'Patio', 'Terrace', 'Bar', 'Private Room']
+
+
+def zipf_cum_weights(n, exponent=0.9):
+    """Cumulative weights where rank 1 is the most popular, for random.choices"""
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic tables, customers, menu items, orders, order items and payments for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000, help='Number of orders to generate')
+        parser.add_argument('--customers', type=int, default=2000, help='Customers to create')
+        parser.add_argument('--tables', type=int, default=40, help='Ensure at least this many tables exist')
+        parser.add_argument('--menu-items', type=int, default=150, help='Ensure at least this many active menu items exist')
+        parser.add_argument('--days', type=int, default=90, help='Spread orders over this many days up to now')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Orders per insert batch/transaction')
+        parser.add_argument('--seed', type=int, help='Random seed for reproducible data')
+        parser.add_argument('--branch', default=DEFAULT_BRANCH, help='Branch of the generated tables, orders and payments; they are written to its database')
+
+    def handle(self, *args, **options):
+        if options['orders'] < 0 or options['days'] < 1 or options['chunk_size'] < 1:
+            raise CommandError('--orders must be >= 0, --days and --chunk-size >= 1')
+
+        self.rng = random.Random(options['seed'])
+        self.branch = options['branch']
+        # Tables, orders and payments go to the branch database; customers,
+        # staff and the menu are shared and always live in the default one
+        self.branch_db = branch_database(self.branch)
+        started = time.monotonic()
+
+        staff = self._staff_users()
+        table_ids = self._ensure_tables(options['tables'])
+        menu = self._ensure_menu(options['menu_items'])
+        customer_ids = self._create_customers(options['customers'])
+        if not customer_ids:
+            customer_ids = list(Customer.objects.using(PRIMARY).values_list('id', flat=True))
+        if not customer_ids:
+            raise CommandError('No customers available; pass --customers > 0')
+
+        counts = self._create_orders(
+            options['orders'], options['days'], options['chunk_size'],
+            staff, table_ids, menu, customer_ids,
+        )
+        self._reset_sequences()
+        # Raw inserts send no signals
+        self._refresh_customer_stats(counts['customers'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts['orders']} orders, {counts['items']} order items and "
+            f"{counts['payments']} payments in {elapsed:.1f}s"
+        ))
+
+    # Raw inserts
+
+    def _db(self, model):
+        """Database alias a model's generated rows are written to"""
+        return self.branch_db if model._meta.label_lower in SHARDED_MODELS else PRIMARY
+
+    def _insert(self, model, rows):
+        """
+        Insert rows (dicts keyed by field attname) with executemany.
+
+        bulk_create would run pre_save on every row, and auto_now_add would
+        overwrite the generated created_at timestamps, so rows are written
+        directly with explicit primary keys. Values must already be plain
+        database types; only datetimes are adapted (memoized, since an
+        order and its lines share a timestamp).
+        """
+        if not rows:
+            return
+        connection = connections[self._db(model)]
+        fields = [model._meta.get_field(name) for name in rows[0]]
+        columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = f'INSERT INTO {connection.ops.quote_name(model._meta.db_table)} ({columns}) VALUES ({placeholders})'
+
+        adapted = {}
+
+        def adapt_datetime(value):
+            if value not in adapted:
+                adapted[value] = connection.ops.adapt_datetimefield_value(value)
+            return adapted[value]
+
+        converters = [
+            (f.attname, adapt_datetime if isinstance(f, DateTimeField) else None) for f in fields
+        ]
+        params = [
+            [convert(row[attname]) if convert else row[attname] for attname, convert in converters]
+            for row in rows
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+
+    def _next_id(self, model):
+        return (model.objects.using(self._db(model)).aggregate(m=Max('id'))['m'] or 0) + 1
+
+    def _reset_sequences(self):
+        by_db = {}
+        for model in [Table, Customer, MenuCategory, MenuItem, Order, OrderItem, Payment]:
+            by_db.setdefault(self._db(model), []).append(model)
+        for using, models in by_db.items():
+            connection = connections[using]
+            statements = connection.ops.sequence_reset_sql(no_style(), models)
+            if statements:
+                with connection.cursor() as cursor:
+                    for sql in statements:
+                        cursor.execute(sql)
+
+    # Reference data
+
+    def _staff_users(self):
+        staff = list(User.objects.using(PRIMARY).filter(is_staff=True).values_list('id', flat=True)[:20])
+        if not staff:
+            user = User.objects.db_manager(PRIMARY).create_user(
+                email='loadtest@example.com', password=None, is_staff=True, first_name='Load', last_name='Test'
+            )
+            staff = [user.id]
+        return staff
+
+    def _ensure_tables(self, count):
+        tables = Table.objects.using(self.branch_db).filter(branch=self.branch)
+        existing = tables.count()
+        if existing < count:
+            Table.objects.using(self.branch_db).bulk_create([
+                Table(branch=self.branch, number=f'L{n}', capacity=self.rng.choice([2, 2, 4, 4, 6, 8]),
+                      location=self.rng.choice(LOCATIONS))
+                for n in range(existing + 1, count + 1)
+            ], ignore_conflicts=True)
+        return list(tables.values_list('id', flat=True))
+
+    def _ensure_menu(self, count):
+        active = MenuItem.objects.using(PRIMARY).filter(is_active=True)
+        missing = count - active.count()
+        if missing > 0:
+            category_names = ['Starters', 'Mains', 'Grill', 'Sides', 'Desserts', 'Beverages']
+            MenuCategory.objects.using(PRIMARY).bulk_create(
+                [MenuCategory(name=name) for name in category_names], ignore_conflicts=True
+            )
+            categories = list(MenuCategory.objects.using(PRIMARY).filter(name__in=category_names))
+            start = self._next_id(MenuItem)
+            MenuItem.objects.using(PRIMARY).bulk_create([
+                MenuItem(
+                    category=categories[n % len(categories)],
+                    name=f'Load Item {pk}',
+                    sku=f'LD{pk:06d}',
+                    price=Decimal(self.rng.randrange(100, 2500, 10)),
+                )
+                for n, pk in enumerate(range(start, start + missing))
+            ])
+            menu_prefix_index.invalidate()
+        menu = list(active.values_list('id', 'name', 'price'))
+        self.rng.shuffle(menu)
+        return menu
+
+    def _create_customers(self, count):
+        if count <= 0:
+            return []
+        start = self._next_id(Customer)
+        now = timezone.now()
+        ids = list(range(start, start + count))
+        with transaction.atomic(using=PRIMARY):
+            self._insert(Customer, [
+                {
+                    'id': pk,
+                    'name': f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}',
+                    'phone': f'07{self.rng.randrange(10 ** 8):08d}',
+                    'email': f'customer{pk}@load.test',
+                    'address': '',
+                    'loyalty_points': 0,
+                    'is_vip': self.rng.random() < 0.03,
+                    'notes': '',
+                    # Filled in from the generated orders once they are written
+                    'order_count': 0,
+                    'lifetime_spend': Decimal('0.00'),
+                    'last_order_at': None,
+                    'top_categories': '[]',
+                    'created_at': now,
+                    'updated_at': now,
+                }
+                for pk in ids
+            ])
+        return ids
+
+    # Orders
+
+    def _order_times(self, total, days):
+        """Yield `total` timestamps in ascending order, shaped by weekday and hour weights"""
+        now = timezone.now()
+        tz = timezone.get_current_timezone()
+        first_day = (now - timedelta(days=days - 1)).date()
+        day_list = [first_day + timedelta(days=d) for d in range(days)]
+        day_weights = [WEEKDAY_WEIGHTS[day.weekday()] for day in day_list]
+        per_day = [0] * days
+        for index in self.rng.choices(range(days), weights=day_weights, k=total):
+            per_day[index] += 1
+
+        hour_cum = list(accumulate(HOUR_WEIGHTS))
+        for day, count in zip(day_list, per_day):
+            midnight = timezone.make_aware(datetime.combine(day, datetime.min.time()), tz)
+            stamps = sorted(
+                midnight + timedelta(hours=hour, seconds=self.rng.randrange(3600))
+                for hour in self.rng.choices(range(24), cum_weights=hour_cum, k=count)
+            )
+            for stamp in stamps:
+                yield min(stamp, now)
+
+    def _create_orders(self, total, days, chunk_size, staff, table_ids, menu, customer_ids):
+        counts = {'orders': 0, 'items': 0, 'payments': 0, 'customers': set()}
+        if total <= 0:
+            return counts
+
+        order_id = self._next_id(Order)
+        item_id = self._next_id(OrderItem)
+        payment_id = self._next_id(Payment)
+        today = timezone.localdate()
+
+        customer_cum = zipf_cum_weights(len(customer_ids))
+        menu_cum = zipf_cum_weights(len(menu))
+        methods, method_weights = zip(*PAYMENT_METHOD_WEIGHTS.items())
+        lines_range = range(1, len(ITEMS_PER_ORDER_WEIGHTS) + 1)
+        qty_range = range(1, len(QTY_WEIGHTS) + 1)
+
+        orders, items, payments = [], [], []
+        for created_at in self._order_times(total, days):
+            if timezone.localdate(created_at) == today:
+                status = self.rng.choice(ACTIVE_STATUSES + [Order.Status.COMPLETED])
+            elif self.rng.random() < CANCELLED_RATE:
+                status = Order.Status.CANCELLED
+            else:
+                status = Order.Status.COMPLETED
+
+            subtotal = Decimal('0.00')
+            line_count = self.rng.choices(lines_range, weights=ITEMS_PER_ORDER_WEIGHTS)[0]
+            for menu_item_id, name, price in self.rng.choices(menu, cum_weights=menu_cum, k=line_count):
+                qty = self.rng.choices(qty_range, weights=QTY_WEIGHTS)[0]
+                subtotal += price * qty
+                items.append({
+                    'id': item_id, 'order_id': order_id, 'item_id': menu_item_id,
+                    'item_name': name, 'unit_price': price, 'qty': qty, 'notes': '',
+                    'created_at': created_at, 'updated_at': created_at,
+                })
+                item_id += 1
+
+            staff_id = self.rng.choice(staff)
+            finished_at = created_at + timedelta(minutes=self.rng.randrange(20, 90))
+            orders.append({
+                'id': order_id,
+                'branch': self.branch,
+                'customer_id': self.rng.choices(customer_ids, cum_weights=customer_cum)[0],
+                'table_id': self.rng.choice(table_ids),
+                'status': status,
+                'notes': '',
+                'subtotal': subtotal,
+                'discount': Decimal('0.00'),
+                'tax': Decimal('0.00'),
+                'total': subtotal,
+                'created_by_id': staff_id,
+                'served_by_id': staff_id if status in (Order.Status.SERVED, Order.Status.COMPLETED) else None,
+                'created_at': created_at,
+                'updated_at': finished_at if status == Order.Status.COMPLETED else created_at,
+            })
+            if status == Order.Status.COMPLETED:
+                payments.append({
+                    'id': payment_id, 'order_id': order_id, 'branch': self.branch, 'amount': subtotal,
+                    'method': self.rng.choices(methods, weights=method_weights)[0],
+                    'status': Payment.Status.COMPLETED, 'transaction_id': '', 'notes': '',
+                    'processed_by_id': staff_id, 'created_at': finished_at, 'updated_at': finished_at,
+                })
+                payment_id += 1
+            order_id += 1
+
+            if len(orders) >= chunk_size:
+                self._flush(orders, items, payments, counts)
+                orders, items, payments = [], [], []
+
+        self._flush(orders, items, payments, counts)
+        return counts
+
+    def _flush(self, orders, items, payments, counts):
+        if not orders:
+            return
+        with transaction.atomic(using=self.branch_db):
+            self._insert(Order, orders)
+            self._insert(OrderItem, items)
+            self._insert(Payment, payments)
+        counts['orders'] += len(orders)
+        counts['customers'].update(order['customer_id'] for order in orders)
+        counts['items'] += len(items)
+        counts['payments'] += len(payments)
+        self.stdout.write(f"  {counts['orders']} orders written")
+
+    def _refresh_customer_stats(self, customer_ids, chunk_size=500):
+        customer_ids = sorted(customer_ids)
+        for start in range(0, len(customer_ids), chunk_size):
+            refresh_customer_stats(customer_ids[start:start + chunk_size])
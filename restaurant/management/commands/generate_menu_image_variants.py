@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from restaurant.models import MenuItem
+from restaurant.utils.images import ensure_menu_item_variants
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive WebP/JPEG variants for menu item photos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants even if they look current')
+
+    def handle(self, *args, **options):
+        generated = 0
+        items = MenuItem.objects.only('id', 'sku', 'image', 'image_variants').order_by('id')
+        for item in items.iterator(chunk_size=200):
+            if ensure_menu_item_variants(item, force=options['force']):
+                generated += 1
+                self.stdout.write(f'  {item.sku}: {len(item.image_variants.get("jpeg", {}))} widths')
+
+        self.stdout.write(self.style.SUCCESS(f'Generated variants for {generated} menu items'))
@@ -0,0 +1,115 @@
+import os
+import re
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from restaurant.models import MenuItem
+from restaurant.tasks import enqueue, generate_menu_image_variants
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+# Item-name words whose photos are filed under a different word
+ALIASES = {
+    'fish': 'salmon',
+}
+
+# Filler words common in item names and downloaded photo filenames; matching
+# on them pairs unrelated items ("Rice with Beans" and "tea-with-milk.jpg")
+STOPWORDS = frozenset({
+    'and', 'with', 'the', 'for', 'from', 'recipe', 'recipes', 'easy', 'best',
+    'homemade', 'photo', 'image', 'stock', 'food', 'style', 'served',
+})
+
+_TOKEN_RE = re.compile(r'[a-z]+')
+
+
+def tokenize(text):
+    """
+    Lowercase alphabetic words of at least 3 letters, plus each adjacent pair
+    joined ("ice cream" -> "icecream") so spaced and unspaced spellings meet.
+    Long tokens are dropped; they are hashes from downloaded filenames.
+    Stopwords are dropped before pairing.
+    """
+    words = [
+        w for w in _TOKEN_RE.findall(text.lower())
+        if 3 <= len(w) <= 15 and w not in STOPWORDS
+    ]
+    return set(words) | {a + b for a, b in zip(words, words[1:])}
+
+
+class Command(BaseCommand):
+    help = 'Assign photos under media/menu_items/ to menu items by matching filename words'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Directory of images (default: MEDIA_ROOT/menu_items)')
+        parser.add_argument('--dry-run', action='store_true', help='Show the matches without saving them')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per bulk update')
+
+    def handle(self, *args, **options):
+        media_dir = options['dir'] or os.path.join(settings.MEDIA_ROOT, 'menu_items')
+        if not os.path.isdir(media_dir):
+            raise CommandError(f'Media directory not found: {media_dir}')
+
+        image_files = sorted(
+            f for f in os.listdir(media_dir) if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        default_image = MenuItem._meta.get_field('image').default
+        self.stdout.write(f'Found {len(image_files)} image files in {media_dir}')
+
+        # token -> files containing it, built once
+        index = defaultdict(list)
+        file_tokens = {}
+        for filename in image_files:
+            if os.path.join('menu_items', filename).replace(os.sep, '/') == default_image:
+                continue
+            file_tokens[filename] = tokenize(os.path.splitext(filename)[0])
+            for token in file_tokens[filename]:
+                index[token].append(filename)
+
+        to_update, unmatched = [], []
+        now = timezone.now()
+        for item in MenuItem.objects.only('id', 'name', 'image').order_by('id').iterator(chunk_size=1000):
+            matched = self._match(item.name, index, file_tokens)
+            if matched is None:
+                unmatched.append(item.name)
+                continue
+
+            image_path = f'menu_items/{matched}'
+            if item.image.name != image_path:
+                self.stdout.write(f'  {item.name} -> {matched}')
+                item.image = image_path
+                item.updated_at = now
+                to_update.append(item)
+
+        for name in unmatched:
+            self.stdout.write(f'  No matching image found for: {name}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Would update {len(to_update)} menu items (dry run)'))
+            return
+
+        with transaction.atomic():
+            MenuItem.objects.bulk_update(to_update, ['image', 'updated_at'], batch_size=options['batch_size'])
+            # bulk_update sends no post_save, so queue the resizing here
+            for item in to_update:
+                enqueue(generate_menu_image_variants, item_id=item.pk)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(to_update)} menu items with images'))
+
+    def _match(self, name, index, file_tokens):
+        """Pick the file sharing the most words with the item name"""
+        tokens = tokenize(name)
+        tokens |= {ALIASES[t] for t in tokens if t in ALIASES}
+
+        scores = defaultdict(int)
+        for token in tokens:
+            for filename in index.get(token, ()):
+                scores[filename] += 1
+        if not scores:
+            return None
+        # Most shared words, then the most specific (fewest words) filename
+        return min(scores, key=lambda f: (-scores[f], len(file_tokens[f]), f))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant.models import MenuItem
+from restaurant.utils.menu_io import FORMATS, detect_format, write_records
+
+
+class Command(BaseCommand):
+    help = 'Stream the menu catalog to a CSV, JSON Lines or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='Output file (default: stdout)')
+        parser.add_argument('--format', choices=FORMATS, help='Output format (default: from the file extension, csv for stdout)')
+        parser.add_argument('--active-only', action='store_true', help='Skip inactive items')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = options['format'] or ('csv' if path == '-' else detect_format(path))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        items = MenuItem.objects.order_by('category__name', 'sku')
+        if options['active_only']:
+            items = items.filter(is_active=True)
+        rows = items.values_list('sku', 'name', 'category__name', 'price', 'description', 'is_active')
+
+        records = (
+            {
+                'sku': sku, 'name': name, 'category': category, 'price': str(price),
+                'description': description, 'is_active': is_active,
+            }
+            for sku, name, category, price, description, is_active in rows.iterator(chunk_size=2000)
+        )
+
+        if path == '-':
+            self.stdout.ending = ''  # the writers supply their own newlines
+            write_records(self.stdout, records, fmt)
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            count = write_records(stream, records, fmt)
+        self.stdout.write(self.style.SUCCESS(f'Exported {count} menu items to {path}'))
@@ -0,0 +1,140 @@
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from restaurant.models import MenuCategory, MenuItem
+from restaurant.search import menu_prefix_index
+from restaurant.utils.menu_io import FORMATS, detect_format, parse_bool, read_records
+
+UPDATE_FIELDS = ['name', 'category', 'price', 'description', 'is_active', 'updated_at']
+
+
+class Command(BaseCommand):
+    help = 'Upsert menu categories and items by SKU from a CSV, JSON Lines or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or - for stdin')
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Items per upsert statement')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            fmt = detect_format(path, options['format'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.dry_run = options['dry_run']
+        self.categories = dict(MenuCategory.objects.values_list('name', 'id'))
+        totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        started = time.monotonic()
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        try:
+            records = (self._clean(line, record) for line, record in read_records(stream, fmt))
+            while True:
+                chunk = list(islice(records, options['chunk_size']))
+                if not chunk:
+                    break
+                for key, value in self._upsert(chunk).items():
+                    totals[key] += value
+        except (ValueError, KeyError) as e:
+            raise CommandError(str(e))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        if not self.dry_run and (totals['inserted'] or totals['updated']):
+            # bulk_create sends no signals
+            menu_prefix_index.invalidate()
+
+        elapsed = time.monotonic() - started
+        prefix = 'Dry run: would have ' if self.dry_run else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}inserted {totals['inserted']}, updated {totals['updated']}, "
+            f"unchanged {totals['unchanged']} menu items in {elapsed:.2f}s"
+        ))
+
+    def _clean(self, line, record):
+        """Validate one input record into a dict of model values"""
+        try:
+            sku = str(record['sku']).strip()
+            name = str(record['name']).strip()
+            category = str(record['category']).strip()
+            price = Decimal(str(record['price']).strip()).quantize(Decimal('0.01'))
+        except KeyError as e:
+            raise CommandError(f'Record {line}: missing field {e}')
+        except InvalidOperation:
+            raise CommandError(f'Record {line}: invalid price "{record.get("price")}"')
+        if not (sku and name and category):
+            raise CommandError(f'Record {line}: sku, name and category are required')
+        if price < 0:
+            raise CommandError(f'Record {line}: price must not be negative')
+        return {
+            'sku': sku,
+            'name': name,
+            'category': category,
+            'price': price,
+            'description': (record.get('description') or '').strip(),
+            'is_active': parse_bool(record.get('is_active')),
+        }
+
+    def _category_ids(self, names):
+        missing = [name for name in dict.fromkeys(names) if name not in self.categories]
+        if missing and not self.dry_run:
+            MenuCategory.objects.bulk_create(
+                [MenuCategory(name=name) for name in missing], ignore_conflicts=True
+            )
+            self.categories.update(
+                MenuCategory.objects.filter(name__in=missing).values_list('name', 'id')
+            )
+        return self.categories
+
+    def _upsert(self, chunk):
+        """Classify one chunk against the database and upsert the changed rows"""
+        # Later rows win when a SKU repeats inside the chunk
+        rows = {row['sku']: row for row in chunk}
+        categories = self._category_ids(row['category'] for row in rows.values())
+        # Compared by category name: in a dry run new categories have no id
+        existing = {
+            values[0]: values[1:]
+            for values in MenuItem.objects.filter(sku__in=rows).values_list(
+                'sku', 'name', 'category__name', 'price', 'description', 'is_active'
+            )
+        }
+
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        to_write = []
+        for sku, row in rows.items():
+            category_id = categories.get(row['category'])
+            current = existing.get(sku)
+            new = (row['name'], row['category'], row['price'], row['description'], row['is_active'])
+            if current is None:
+                counts['inserted'] += 1
+            elif current == new:
+                counts['unchanged'] += 1
+                continue
+            else:
+                counts['updated'] += 1
+            to_write.append(MenuItem(
+                sku=sku, name=row['name'], category_id=category_id, price=row['price'],
+                description=row['description'], is_active=row['is_active'],
+            ))
+
+        if to_write and not self.dry_run:
+            try:
+                with transaction.atomic():
+                    MenuItem.objects.bulk_create(
+                        to_write,
+                        update_conflicts=True,
+                        unique_fields=['sku'],
+                        update_fields=UPDATE_FIELDS,
+                    )
+            except IntegrityError as e:
+                raise CommandError(f'Upsert failed for SKUs {to_write[0].sku}..{to_write[-1].sku}: {e}')
+        return counts
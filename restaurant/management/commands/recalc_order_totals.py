@@ -0,0 +1,60 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from restaurant.models import Order
+from restaurant.utils.order_manager import OrderManager
+
+
+class Command(BaseCommand):
+    help = 'Recompute subtotal/total for a filtered set of orders in bulk'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status',
+            action='append',
+            choices=Order.Status.values,
+            help='Only recompute orders with this status (repeatable). Defaults to open orders.'
+        )
+        parser.add_argument(
+            '--all-statuses',
+            action='store_true',
+            help='Recompute orders in every status, including completed and cancelled'
+        )
+        parser.add_argument('--since', help='Only orders created on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--until', help='Only orders created before this date (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders per read/update chunk')
+        parser.add_argument('--dry-run', action='store_true', help='Report changes without writing them')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+
+        if options['status']:
+            orders = orders.filter(status__in=options['status'])
+        elif not options['all_statuses']:
+            orders = orders.active()
+        if options['since']:
+            orders = orders.filter(created_at__gte=self._parse_date(options['since']))
+        if options['until']:
+            orders = orders.filter(created_at__lt=self._parse_date(options['until']))
+
+        started = time.monotonic()
+        checked, changed = OrderManager.bulk_recalc_totals(
+            orders,
+            batch_size=options['batch_size'],
+            commit=not options['dry_run']
+        )
+        elapsed = time.monotonic() - started
+
+        verb = 'would change' if options['dry_run'] else 'updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {checked} orders, {verb} {changed} in {elapsed:.2f}s'
+        ))
+
+    def _parse_date(self, value):
+        try:
+            return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
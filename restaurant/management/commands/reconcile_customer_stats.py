@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from restaurant.models import Customer
+from restaurant.sharding import branch_databases
+from restaurant.utils.customer_stats import EMPTY_STATS, STAT_FIELDS, compute_customer_stats
+from restaurant.utils.dashboard import invalidate_dashboard
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored customer order statistics from completed orders (live and archived)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Customers per update batch')
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted customers without writing')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be >= 1')
+
+        started = time.monotonic()
+        computed = compute_customer_stats(sorted(set(branch_databases().values())))
+
+        checked, changed = 0, []
+        for customer in Customer.objects.only('id', *STAT_FIELDS).order_by('id').iterator(chunk_size=options['batch_size']):
+            checked += 1
+            stats = computed.get(customer.id, EMPTY_STATS)
+            if any(getattr(customer, field) != stats[field] for field in STAT_FIELDS):
+                for field in STAT_FIELDS:
+                    setattr(customer, field, stats[field])
+                changed.append(customer)
+
+        if not options['dry_run']:
+            with transaction.atomic():
+                Customer.objects.bulk_update(changed, STAT_FIELDS, batch_size=options['batch_size'])
+                # Cached dashboards show the stats; bulk_update sends no signals
+                for customer in changed:
+                    invalidate_dashboard(customer.pk)
+
+        elapsed = time.monotonic() - started
+        prefix = 'Dry run: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}checked {checked} customers, {len(changed)} out of date, in {elapsed:.2f}s'
+        ))
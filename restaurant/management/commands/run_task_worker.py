@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from restaurant.tasks import claim_due_tasks, prune_finished_tasks, requeue_stale_tasks, run_task
+
+PRUNE_INTERVAL = 3600  # seconds between prunes of finished tasks
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks (images, email, reports) with a thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of worker threads')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Requeue tasks left running for this many seconds by a dead worker')
+        parser.add_argument('--keep-days', type=float, default=7,
+                            help='Delete succeeded/failed tasks older than this many days (0 keeps them all)')
+        parser.add_argument('--once', action='store_true', help='Drain the due tasks and exit')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        succeeded = failed = 0
+
+        requeued = requeue_stale_tasks(options['stale_after'])
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale tasks')
+        self.stdout.write(f'Task worker started with {workers} threads')
+
+        keep_seconds = options['keep_days'] * 86400
+        pruned_at = None
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='task-worker') as pool:
+            try:
+                while True:
+                    if keep_seconds and (pruned_at is None or time.monotonic() - pruned_at > PRUNE_INTERVAL):
+                        pruned = prune_finished_tasks(keep_seconds)
+                        if pruned:
+                            self.stdout.write(f'Pruned {pruned} finished tasks')
+                        pruned_at = time.monotonic()
+
+                    tasks = claim_due_tasks(workers)
+                    if not tasks:
+                        if options['once']:
+                            break
+                        time.sleep(options['poll_interval'])
+                        continue
+
+                    for background_task, ok in zip(tasks, pool.map(run_task, tasks)):
+                        if ok:
+                            succeeded += 1
+                        else:
+                            failed += 1
+                            self.stderr.write(f'Task {background_task} failed (attempt {background_task.attempts})')
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping task worker')
+
+        self.stdout.write(self.style.SUCCESS(f'Ran {succeeded + failed} tasks: {succeeded} succeeded, {failed} failed'))
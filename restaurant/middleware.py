@@ -0,0 +1,28 @@
+"""
+Request middleware for the restaurant app
+"""
+from django.utils.functional import SimpleLazyObject
+
+
+def get_request_customer(user):
+    """The Customer linked to a user, or None (no query when joined by the auth backend)"""
+    if not user.is_authenticated:
+        return None
+    try:
+        return user.customer
+    except user._meta.model.customer.RelatedObjectDoesNotExist:
+        return None
+
+
+class CustomerMiddleware:
+    """
+    Attach a lazy `request.customer`: the logged-in user's Customer, or
+    None. Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.customer = SimpleLazyObject(lambda: get_request_customer(request.user))
+        return self.get_response(request)
@@ -0,0 +1,138 @@
+from django.db import migrations
+
+# Names and SQL are spelled out rather than imported from restaurant.search,
+# so later edits to that module cannot change what this migration runs.
+FTS = 'restaurant_menuitem_fts'
+TSV = 'restaurant_menuitem_search'
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER "{FTS}_item_ai" AFTER INSERT ON restaurant_menuitem BEGIN
+        INSERT INTO "{FTS}"(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description,
+                (SELECT name FROM restaurant_menucategory WHERE id = new.category_id));
+    END""",
+    f"""CREATE TRIGGER "{FTS}_item_ad" AFTER DELETE ON restaurant_menuitem BEGIN
+        DELETE FROM "{FTS}" WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER "{FTS}_item_au" AFTER UPDATE OF name, description, category_id
+        ON restaurant_menuitem BEGIN
+        UPDATE "{FTS}" SET
+            name = new.name,
+            description = new.description,
+            category = (SELECT name FROM restaurant_menucategory WHERE id = new.category_id)
+        WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER "{FTS}_category_au" AFTER UPDATE OF name ON restaurant_menucategory BEGIN
+        UPDATE "{FTS}" SET category = new.name
+        WHERE rowid IN (SELECT id FROM restaurant_menuitem WHERE category_id = new.id);
+    END""",
+]
+
+SQLITE_FORWARD = [
+    f"""CREATE VIRTUAL TABLE "{FTS}" USING fts5(
+        name, description, category,
+        tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+    )""",
+    *SQLITE_TRIGGERS,
+    f"""INSERT INTO "{FTS}"(rowid, name, description, category)
+        SELECT m.id, m.name, m.description, c.name
+        FROM restaurant_menuitem m JOIN restaurant_menucategory c ON c.id = m.category_id""",
+]
+
+SQLITE_BACKWARD = [
+    f'DROP TRIGGER IF EXISTS "{FTS}_category_au"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_item_au"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_item_ad"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_item_ai"',
+    f'DROP TABLE IF EXISTS "{FTS}"',
+]
+
+POSTGRES_FORWARD = [
+    f"""CREATE TABLE "{TSV}" (
+        item_id bigint PRIMARY KEY REFERENCES restaurant_menuitem(id) ON DELETE CASCADE,
+        document tsvector NOT NULL
+    )""",
+    f'CREATE INDEX "{TSV}_document_idx" ON "{TSV}" USING gin (document)',
+    f"""CREATE FUNCTION "{TSV}_refresh"() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO "{TSV}"(item_id, document)
+        SELECT NEW.id,
+               setweight(to_tsvector('simple', NEW.name), 'A') ||
+               setweight(to_tsvector('simple', c.name), 'B') ||
+               setweight(to_tsvector('simple', NEW.description), 'C')
+        FROM restaurant_menucategory c WHERE c.id = NEW.category_id
+        ON CONFLICT (item_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    f"""CREATE TRIGGER "{TSV}_item_refresh"
+        AFTER INSERT OR UPDATE OF name, description, category_id ON restaurant_menuitem
+        FOR EACH ROW EXECUTE FUNCTION "{TSV}_refresh"()""",
+    f"""CREATE FUNCTION "{TSV}_category_refresh"() RETURNS trigger AS $$
+    BEGIN
+        UPDATE "{TSV}" s SET document =
+               setweight(to_tsvector('simple', m.name), 'A') ||
+               setweight(to_tsvector('simple', NEW.name), 'B') ||
+               setweight(to_tsvector('simple', m.description), 'C')
+        FROM restaurant_menuitem m
+        WHERE m.id = s.item_id AND m.category_id = NEW.id;
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    f"""CREATE TRIGGER "{TSV}_category_refresh"
+        AFTER UPDATE OF name ON restaurant_menucategory
+        FOR EACH ROW EXECUTE FUNCTION "{TSV}_category_refresh"()""",
+    f"""INSERT INTO "{TSV}"(item_id, document)
+        SELECT m.id,
+               setweight(to_tsvector('simple', m.name), 'A') ||
+               setweight(to_tsvector('simple', c.name), 'B') ||
+               setweight(to_tsvector('simple', m.description), 'C')
+        FROM restaurant_menuitem m JOIN restaurant_menucategory c ON c.id = m.category_id""",
+]
+
+POSTGRES_BACKWARD = [
+    f'DROP TRIGGER IF EXISTS "{TSV}_category_refresh" ON restaurant_menucategory',
+    f'DROP TRIGGER IF EXISTS "{TSV}_item_refresh" ON restaurant_menuitem',
+    f'DROP FUNCTION IF EXISTS "{TSV}_category_refresh"()',
+    f'DROP FUNCTION IF EXISTS "{TSV}_refresh"()',
+    f'DROP TABLE IF EXISTS "{TSV}"',
+]
+
+
+def sqlite_supports_fts5(connection):
+    """Whether this SQLite build was compiled with FTS5."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        if not sqlite_supports_fts5(connection):
+            return
+        statements = SQLITE_FORWARD
+    elif connection.vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql, params=None)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}.get(vendor, [])
+    for sql in statements:
+        schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_menuitem_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+# The menu search triggers from 0003, spelled out so this migration does not
+# depend on restaurant.search.
+FTS = 'restaurant_menuitem_fts'
+
+SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER "{FTS}_item_ai" AFTER INSERT ON restaurant_menuitem BEGIN
+        INSERT INTO "{FTS}"(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description,
+                (SELECT name FROM restaurant_menucategory WHERE id = new.category_id));
+    END""",
+    f"""CREATE TRIGGER "{FTS}_item_ad" AFTER DELETE ON restaurant_menuitem BEGIN
+        DELETE FROM "{FTS}" WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER "{FTS}_item_au" AFTER UPDATE OF name, description, category_id
+        ON restaurant_menuitem BEGIN
+        UPDATE "{FTS}" SET
+            name = new.name,
+            description = new.description,
+            category = (SELECT name FROM restaurant_menucategory WHERE id = new.category_id)
+        WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER "{FTS}_category_au" AFTER UPDATE OF name ON restaurant_menucategory BEGIN
+        UPDATE "{FTS}" SET category = new.name
+        WHERE rowid IN (SELECT id FROM restaurant_menuitem WHERE category_id = new.id);
+    END""",
+]
+
+SQLITE_DROP_TRIGGERS = [
+    f'DROP TRIGGER IF EXISTS "{FTS}_{suffix}"'
+    for suffix in ('item_ai', 'item_ad', 'item_au', 'category_au')
+]
+
+
+def _has_fts_table(schema_editor):
+    connection = schema_editor.connection
+    return connection.vendor == 'sqlite' and FTS in connection.introspection.table_names()
+
+
+def drop_search_triggers(apps, schema_editor):
+    if _has_fts_table(schema_editor):
+        for sql in SQLITE_DROP_TRIGGERS:
+            schema_editor.execute(sql, params=None)
+
+
+def create_search_triggers(apps, schema_editor):
+    if _has_fts_table(schema_editor):
+        for sql in SQLITE_TRIGGERS:
+            schema_editor.execute(sql, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_menuitem_search_index'),
+    ]
+
+    operations = [
+        # SQLite rebuilds the table for AddField, which would drop the search triggers
+        migrations.RunPython(drop_search_triggers, create_search_triggers),
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Resized WebP/JPEG copies of the image, keyed by format and width'),
+        ),
+        migrations.RunPython(create_search_triggers, drop_search_triggers),
+    ]
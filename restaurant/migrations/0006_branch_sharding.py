@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0005_backgroundtask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='branch',
+            field=models.CharField(db_index=True, default='main', help_text='Restaurant branch; selects the branch database (see restaurant.sharding)', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='branch',
+            field=models.CharField(db_index=True, default='main', help_text='Restaurant branch; selects the branch database (see restaurant.sharding)', max_length=30),
+        ),
+        migrations.AddField(
+            model_name='table',
+            name='branch',
+            field=models.CharField(db_index=True, default='main', help_text='Restaurant branch; selects the branch database (see restaurant.sharding)', max_length=30),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='created_by',
+            field=models.ForeignKey(db_constraint=False, help_text='Staff member who created the order', on_delete=django.db.models.deletion.PROTECT, related_name='restaurant_orders_created', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='customer',
+            field=models.ForeignKey(db_constraint=False, help_text='Customer who placed the order', on_delete=django.db.models.deletion.PROTECT, related_name='orders', to='restaurant.customer'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='served_by',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Staff member who served the order', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='orders_served', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='item',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Menu item (null if item was deleted)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='restaurant.menuitem'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='processed_by',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Staff member who processed the payment', null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='table',
+            name='number',
+            field=models.CharField(help_text='Table number or identifier (unique within a branch)', max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name='table',
+            constraint=models.UniqueConstraint(fields=('branch', 'number'), name='restaurant_table_branch_number_uniq'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_branch_sharding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Id of the original order', primary_key=True, serialize=False)),
+                ('branch', models.CharField(default='main', help_text='Restaurant branch; selects the branch database (see restaurant.sharding)', max_length=30)),
+                ('table_number', models.CharField(blank=True, max_length=10)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('PREPARING', 'Preparing'), ('READY', 'Ready to Serve'), ('SERVED', 'Served'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('discount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('tax', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('items', models.JSONField(default=list, help_text='Order items at archive time')),
+                ('payments', models.JSONField(default=list, help_text='Payments at archive time')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(db_constraint=False, help_text='Customer who placed the order', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='restaurant.customer')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['customer', 'created_at'], name='restaurant_archord_cust_idx')],
+            },
+        ),
+    ]
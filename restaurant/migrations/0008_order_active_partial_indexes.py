@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0007_archivedorder'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ('PENDING', 'CONFIRMED', 'PREPARING', 'READY', 'SERVED'))), fields=['status', 'created_at'], name='restaurant_order_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status__in', ('PENDING', 'CONFIRMED', 'PREPARING', 'READY', 'SERVED'))), fields=['table', 'status'], name='restaurant_order_act_tbl_idx'),
+        ),
+    ]
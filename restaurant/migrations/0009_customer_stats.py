@@ -0,0 +1,106 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:23
+
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_customer_stats(apps, schema_editor):
+    """
+    Fill the new fields from each customer's completed orders, live and
+    archived. Orders placed before branch sharding all live in the
+    database that holds the customers, so this reads that database only;
+    reconcile_customer_stats rebuilds across branch databases.
+    """
+    Customer = apps.get_model('restaurant', 'Customer')
+    Order = apps.get_model('restaurant', 'Order')
+    OrderItem = apps.get_model('restaurant', 'OrderItem')
+    ArchivedOrder = apps.get_model('restaurant', 'ArchivedOrder')
+    MenuItem = apps.get_model('restaurant', 'MenuItem')
+    using = schema_editor.connection.alias
+
+    stats = defaultdict(lambda: {'order_count': 0, 'lifetime_spend': Decimal('0.00'), 'last_order_at': None})
+    quantities = defaultdict(Counter)
+    for model in (Order, ArchivedOrder):
+        rows = (
+            model.objects.using(using).filter(status='COMPLETED', customer__isnull=False)
+            .values_list('customer_id')
+            .annotate(count=Count('id'), spend=Sum('total'), last=Max('created_at'))
+            .order_by()
+        )
+        for customer_id, count, spend, last in rows:
+            entry = stats[customer_id]
+            entry['order_count'] += count
+            entry['lifetime_spend'] += spend or Decimal('0.00')
+            entry['last_order_at'] = max(filter(None, [entry['last_order_at'], last]))
+
+    rows = (
+        OrderItem.objects.using(using).filter(order__status='COMPLETED', item__isnull=False)
+        .values_list('order__customer_id', 'item_id').annotate(qty=Sum('qty')).order_by()
+    )
+    for customer_id, item_id, qty in rows:
+        quantities[customer_id][item_id] += qty
+    archived = ArchivedOrder.objects.using(using).filter(status='COMPLETED', customer__isnull=False)
+    for customer_id, items in archived.values_list('customer_id', 'items'):
+        for line in items:
+            if line.get('item_id'):
+                quantities[customer_id][line['item_id']] += line['qty']
+
+    categories = {
+        item_id: (category_id, name)
+        for item_id, category_id, name in MenuItem.objects.using(using)
+        .values_list('id', 'category_id', 'category__name')
+    }
+    customers = []
+    for customer in Customer.objects.using(using).only('id').iterator():
+        if customer.pk not in stats:
+            continue
+        counts, names = Counter(), {}
+        for item_id, qty in quantities[customer.pk].items():
+            if item_id in categories:
+                category_id, names[category_id] = categories[item_id]
+                counts[category_id] += qty
+        for field, value in stats[customer.pk].items():
+            setattr(customer, field, value)
+        customer.top_categories = [
+            {'id': category_id, 'name': names[category_id], 'count': count}
+            for category_id, count in sorted(counts.items(), key=lambda pair: (-pair[1], pair[0]))
+        ]
+        customers.append(customer)
+
+    Customer.objects.using(using).bulk_update(
+        customers, ['order_count', 'lifetime_spend', 'last_order_at', 'top_categories'], batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0008_order_active_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='last_order_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When the most recent completed order was placed', null=True),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='lifetime_spend',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, help_text='Sum of completed order totals', max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='order_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Number of completed orders'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='top_categories',
+            field=models.JSONField(blank=True, default=list, editable=False, help_text='Menu categories ordered from, most items first: [{id, name, count}]'),
+        ),
+        migrations.RunPython(backfill_customer_stats, migrations.RunPython.noop),
+    ]
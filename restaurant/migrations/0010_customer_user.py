@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 23:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def link_customers_to_users(apps, schema_editor):
+    """Backfill Customer.user by email; exact matches win over case-insensitive ones"""
+    Customer = apps.get_model('restaurant', 'Customer')
+    User = apps.get_model('restaurant', 'User')
+    using = schema_editor.connection.alias
+
+    users = dict(User.objects.using(using).values_list('email', 'id'))
+    users_lower = {email.lower(): user_id for email, user_id in users.items()}
+    customers = list(Customer.objects.using(using).values_list('id', 'email'))
+
+    links = {}
+    linked_users = set()
+    for lookup in (users.get, lambda email: users_lower.get(email.lower())):
+        for customer_id, email in customers:
+            user_id = lookup(email)
+            if customer_id not in links and user_id is not None and user_id not in linked_users:
+                links[customer_id] = user_id
+                linked_users.add(user_id)
+
+    Customer.objects.using(using).bulk_update(
+        [Customer(id=customer_id, user_id=user_id) for customer_id, user_id in links.items()],
+        ['user'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0009_customer_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='user',
+            field=models.OneToOneField(blank=True, help_text='Login account of this customer, if they have one', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='customer', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(link_customers_to_users, migrations.RunPython.noop),
+    ]
@@ -7,6 +7,42 @@ from django.core.validators import MinValueValidator, MaxValueValidator, MinLeng
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 
+from Restaurant_Order.batching import mark_order_dirty
+
+DEFAULT_BRANCH = 'main'
+
+# Orders still being worked on; the partial indexes on Order cover only these
+ACTIVE_ORDER_STATUSES = ('PENDING', 'CONFIRMED', 'PREPARING', 'READY', 'SERVED')
+
+
+def order_reference(branch, order_id):
+    """'WESTLANDS-000123': an order id paired with the branch whose database numbered it"""
+    return f'{branch.upper()}-{order_id:06d}'
+
+
+class LiteralIn(models.Lookup):
+    """
+    `field__literal_in=(...)`: an IN filter with the values inlined as SQL
+    literals. SQLite only uses a partial index when the query repeats its
+    WHERE clause exactly, which a bound-parameter IN never does.
+    Registered on Order.status only, the one field filtered with trusted
+    constants this way.
+    """
+    lookup_name = 'literal_in'
+    prepare_rhs = False
+
+    def as_sql(self, compiler, connection):
+        lhs, params = self.process_lhs(compiler, connection)
+        values = ', '.join("'%s'" % str(value).replace("'", "''") for value in self.rhs)
+        return f'{lhs} IN ({values})', params
+
+
+class OrderQuerySet(models.QuerySet):
+    def active(self):
+        """Orders not yet completed or cancelled (served by the partial indexes)"""
+        return self.filter(status__literal_in=ACTIVE_ORDER_STATUSES)
+
+
 class CustomUserManager(BaseUserManager):
     """Custom user model manager where email is the unique identifier"""
     def create_user(self, email, password=None, **extra_fields):
@@ -107,6 +143,12 @@ class MenuItem(TimeStampedModel):
         default='menu_items/default_food.jpg',
         help_text="Upload an image for this menu item"
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Resized WebP/JPEG copies of the image, keyed by format and width"
+    )
 
     class Meta:
         unique_together = [("category", "name")]
@@ -121,6 +163,39 @@ class MenuItem(TimeStampedModel):
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
+    def image_srcset(self, image_format='webp'):
+        """
+        Return a srcset value ("url 320w, url 640w") for the given format,
+        or an empty string when no variants have been generated yet.
+        """
+        widths = (self.image_variants or {}).get(image_format) or {}
+        storage = self.image.storage
+        return ", ".join(
+            f"{storage.url(name)} {width}w"
+            for width, name in sorted(widths.items(), key=lambda pair: int(pair[0]))
+        )
+
+    @property
+    def image_srcset_jpeg(self):
+        """JPEG srcset, for templates (which cannot pass arguments)"""
+        return self.image_srcset('jpeg')
+
+    def image_url_for_width(self, width, image_format='jpeg'):
+        """URL of the smallest variant at least `width` wide, else the original"""
+        widths = (self.image_variants or {}).get(image_format) or {}
+        candidates = sorted(widths.items(), key=lambda pair: int(pair[0]))
+        for variant_width, name in candidates:
+            if int(variant_width) >= width:
+                return self.image.storage.url(name)
+        if candidates:
+            return self.image.storage.url(candidates[-1][1])
+        return self.image.url if self.image else ""
+
+    @property
+    def thumbnail_url(self):
+        """Small JPEG suitable for cards and lists"""
+        return self.image_url_for_width(320)
+
 
 class Table(TimeStampedModel):
     """
@@ -133,10 +208,15 @@ class Table(TimeStampedModel):
         ('CLEANING', 'Cleaning'),
     ]
 
+    branch = models.CharField(
+        max_length=30,
+        default=DEFAULT_BRANCH,
+        db_index=True,
+        help_text="Restaurant branch; selects the branch database (see restaurant.sharding)"
+    )
     number = models.CharField(
         max_length=10, 
-        unique=True,
-        help_text="Table number or identifier"
+        help_text="Table number or identifier (unique within a branch)"
     )
     capacity = models.PositiveSmallIntegerField(
         default=2,
@@ -157,6 +237,9 @@ class Table(TimeStampedModel):
 
     class Meta:
         ordering = ['number']
+        constraints = [
+            models.UniqueConstraint(fields=['branch', 'number'], name='restaurant_table_branch_number_uniq'),
+        ]
         indexes = [
             models.Index(fields=['number'], name='restaurant_table_number_idx'),
             models.Index(fields=['status'], name='restaurant_table_status_idx'),
@@ -179,10 +262,21 @@ class Order(TimeStampedModel):
         COMPLETED = 'COMPLETED', 'Completed'
         CANCELLED = 'CANCELLED', 'Cancelled'
 
+    ACTIVE_STATUSES = ACTIVE_ORDER_STATUSES
+
+    branch = models.CharField(
+        max_length=30,
+        default=DEFAULT_BRANCH,
+        db_index=True,
+        help_text="Restaurant branch; selects the branch database (see restaurant.sharding)"
+    )
+    # Customers, users and menu items are shared across branches while orders
+    # live in their branch database, so these references carry no DB constraint.
     customer = models.ForeignKey(
         'Customer',
         related_name='orders',
         on_delete=models.PROTECT,
+        db_constraint=False,
         help_text="Customer who placed the order"
     )
     table = models.ForeignKey(
@@ -231,6 +325,7 @@ class Order(TimeStampedModel):
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.PROTECT,
+        db_constraint=False,
         related_name="restaurant_orders_created",
         help_text="Staff member who created the order"
     )
@@ -240,23 +335,49 @@ class Order(TimeStampedModel):
         blank=True,
         related_name="orders_served",
         on_delete=models.SET_NULL,
+        db_constraint=False,
         help_text="Staff member who served the order"
     )
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status', 'created_at'], name='restaurant_order_status_idx'),
             models.Index(fields=['created_at'], name='resto_order_created_at_idx'),
+            # Partial indexes: only the small set of active orders, not the history
+            models.Index(
+                fields=['status', 'created_at'],
+                condition=Q(status__in=ACTIVE_ORDER_STATUSES),
+                name='restaurant_order_active_idx',
+            ),
+            models.Index(
+                fields=['table', 'status'],
+                condition=Q(status__in=ACTIVE_ORDER_STATUSES),
+                name='restaurant_order_act_tbl_idx',
+            ),
         ]
         permissions = [
             ("can_manage_orders", "Can create, update, and delete orders"),
             ("can_view_reports", "Can view order reports and analytics"),
         ]
 
+    # Fields the customer stats signal compares against their stored values
+    STATS_TRACKED_FIELDS = ('status', 'customer_id', 'total')
+
     def __str__(self):
         return f"Order #{self.id} - {self.customer.name} - {self.get_status_display()}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        # Remember the stored values so a save can tell what changed without
+        # re-reading the row (see restaurant.signals)
+        if set(cls.STATS_TRACKED_FIELDS) <= set(field_names):
+            order._stored_stats_fields = tuple(getattr(order, f) for f in cls.STATS_TRACKED_FIELDS)
+        return order
+
     def recalc_totals(self, commit=True):
         """
         Recalculate subtotal (sum of line totals), apply discount and tax.
@@ -277,6 +398,10 @@ class Order(TimeStampedModel):
     @property
     def amount_paid(self):
         """Total amount paid for this order."""
+        # Use prefetched payments when available to avoid a query per order
+        prefetched = getattr(self, '_prefetched_objects_cache', {})
+        if 'payments' in prefetched:
+            return sum((p.amount for p in prefetched['payments']), Decimal('0.00'))
         return self.payments.aggregate(
             total=Sum('amount', default=Decimal('0.00')
         ))['total']
@@ -286,11 +411,24 @@ class Order(TimeStampedModel):
         """Amount still to be paid."""
         return max(self.total - self.amount_paid, Decimal('0.00'))
 
+    @property
+    def line_items(self):
+        """Order items; shared with ArchivedOrder so history templates fit both."""
+        return self.items.all()
+
+    @property
+    def reference(self):
+        """Customer-facing order number; ids are only unique within a branch database"""
+        return order_reference(self.branch, self.pk)
+
     def is_editable(self):
         """Check if the order can be edited."""
         return self.status in [self.Status.PENDING, self.Status.CONFIRMED]
 
 
+Order._meta.get_field('status').register_lookup(LiteralIn)
+
+
 class OrderItem(TimeStampedModel):
     """
     Model representing an item within an order.
@@ -307,6 +445,7 @@ class OrderItem(TimeStampedModel):
         null=True, 
         blank=True, 
         on_delete=models.SET_NULL,
+        db_constraint=False,
         help_text="Menu item (null if item was deleted)"
     )
     item_name = models.CharField(
@@ -342,7 +481,12 @@ class OrderItem(TimeStampedModel):
         return self.unit_price * self.qty
 
     def save(self, *args, **kwargs):
-        """Save the order item and update the order totals."""
+        """
+        Save the order item and update the order totals.
+
+        Inside an order_batch() the recalculation is deferred until the
+        batch exits, so editing many lines costs a single totals pass.
+        """
         # Set item name from menu item if not set and item exists
         if self.item and not self.item_name:
             self.item_name = self.item.name
@@ -352,7 +496,8 @@ class OrderItem(TimeStampedModel):
             self.unit_price = self.item.price
         
         super().save(*args, **kwargs)
-        self.order.recalc_totals()
+        if not mark_order_dirty(self.order):
+            self.order.recalc_totals()
 
 
 class Payment(TimeStampedModel):
@@ -371,6 +516,12 @@ class Payment(TimeStampedModel):
         FAILED = 'FAILED', 'Failed'
         REFUNDED = 'REFUNDED', 'Refunded'
 
+    branch = models.CharField(
+        max_length=30,
+        default=DEFAULT_BRANCH,
+        db_index=True,
+        help_text="Restaurant branch; selects the branch database (see restaurant.sharding)"
+    )
     order = models.ForeignKey(
         Order, 
         related_name="payments", 
@@ -409,6 +560,7 @@ class Payment(TimeStampedModel):
         null=True,
         blank=True,
         on_delete=models.SET_NULL,
+        db_constraint=False,
         help_text="Staff member who processed the payment"
     )
 
@@ -423,6 +575,9 @@ class Payment(TimeStampedModel):
     def save(self, *args, **kwargs):
         """Save the payment and update the order status if fully paid."""
         is_new = self._state.adding
+        if is_new and self.order_id:
+            # Payments are stored with their order's branch
+            self.branch = self.order.branch
         super().save(*args, **kwargs)
         
         # If this is a new payment and it's completed, check if order is fully paid
@@ -432,10 +587,138 @@ class Payment(TimeStampedModel):
                 self.order.save(update_fields=['status', 'updated_at'])
 
 
+class ArchivedOrder(models.Model):
+    """
+    A completed or cancelled order moved out of the hot order tables by
+    `python manage.py archive_orders`. Items and payments are stored as
+    JSON snapshots and the original order id is kept as the primary key.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Id of the original order")
+    branch = models.CharField(
+        max_length=30,
+        default=DEFAULT_BRANCH,
+        help_text="Restaurant branch; selects the branch database (see restaurant.sharding)"
+    )
+    customer = models.ForeignKey(
+        'Customer',
+        null=True,
+        related_name='archived_orders',
+        on_delete=models.SET_NULL,
+        db_constraint=False,
+        help_text="Customer who placed the order"
+    )
+    table_number = models.CharField(max_length=10, blank=True)
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    notes = models.TextField(blank=True)
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2)
+    discount = models.DecimalField(max_digits=10, decimal_places=2)
+    tax = models.DecimalField(max_digits=10, decimal_places=2)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    items = models.JSONField(default=list, help_text="Order items at archive time")
+    payments = models.JSONField(default=list, help_text="Payments at archive time")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['customer', 'created_at'], name='restaurant_archord_cust_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.id} - {self.get_status_display()}"
+
+    @classmethod
+    def from_order(cls, order):
+        """Snapshot an order with its prefetched items and payments"""
+        return cls(
+            id=order.id,
+            branch=order.branch,
+            customer_id=order.customer_id,
+            table_number=order.table.number,
+            status=order.status,
+            notes=order.notes,
+            subtotal=order.subtotal,
+            discount=order.discount,
+            tax=order.tax,
+            total=order.total,
+            items=[
+                {
+                    'item_id': line.item_id,
+                    'item_name': line.item_name,
+                    'unit_price': str(line.unit_price),
+                    'qty': line.qty,
+                    'notes': line.notes,
+                }
+                for line in order.items.all()
+            ],
+            payments=[
+                {
+                    'amount': str(payment.amount),
+                    'method': payment.method,
+                    'status': payment.status,
+                    'transaction_id': payment.transaction_id,
+                    'processed_by_id': payment.processed_by_id,
+                    'created_at': payment.created_at.isoformat(),
+                }
+                for payment in order.payments.all()
+            ],
+            created_at=order.created_at,
+            updated_at=order.updated_at,
+        )
+
+    @property
+    def line_items(self):
+        """Archived items with the attributes of a live OrderItem"""
+        return [
+            {**line, 'unit_price': Decimal(line['unit_price']),
+             'line_total': Decimal(line['unit_price']) * line['qty']}
+            for line in self.items
+        ]
+
+    @property
+    def reference(self):
+        return order_reference(self.branch, self.pk)
+
+
+class CustomerManager(models.Manager):
+    def get_or_create_for_user(self, user):
+        """
+        The customer profile of a logged-in user, created on first use.
+
+        A profile staff already created under the user's email is adopted
+        and linked rather than duplicated.
+
+        Returns:
+            (Customer, created) like get_or_create
+        """
+        customer = self.filter(user=user).first()
+        if customer is not None:
+            return customer, False
+        if self.filter(email=user.email, user__isnull=True).update(user=user):
+            return self.get(user=user), False
+        name = f"{user.first_name} {user.last_name}".strip() or user.email.split('@')[0]
+        # get_or_create on the unique link retries the lookup if a concurrent request wins
+        return self.get_or_create(
+            user=user,
+            defaults={'email': user.email, 'name': name, 'phone': user.phone or ''},
+        )
+
+
 class Customer(models.Model):
     """
     Model representing a restaurant customer.
     """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        related_name='customer',
+        on_delete=models.SET_NULL,
+        help_text="Login account of this customer, if they have one"
+    )
+    
     name = models.CharField(
         max_length=100,
         help_text="Enter the customer's full name",
@@ -475,9 +758,38 @@ class Customer(models.Model):
         help_text="Additional notes about the customer"
     )
     
+    # Denormalized from completed orders (live and archived) by
+    # restaurant.utils.customer_stats; rebuild with reconcile_customer_stats
+    order_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of completed orders"
+    )
+    lifetime_spend = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        editable=False,
+        help_text="Sum of completed order totals"
+    )
+    last_order_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="When the most recent completed order was placed"
+    )
+    top_categories = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        help_text="Menu categories ordered from, most items first: [{id, name, count}]"
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CustomerManager()
+    
     class Meta:
         ordering = ['name']
         verbose_name = 'Customer'
@@ -493,8 +805,36 @@ class Customer(models.Model):
         return f"{self.name} ({self.email})"
     
     def total_spent(self):
-        """Calculate total amount spent by the customer."""
-        return Order.objects.filter(
-            customer=self, 
-            status=Order.Status.COMPLETED
-        ).aggregate(total=Sum('total'))['total'] or Decimal('0.00')
+        """Total amount spent by the customer (stored, see lifetime_spend)."""
+        return self.lifetime_spend
+
+
+class BackgroundTask(TimeStampedModel):
+    """
+    A unit of deferred work (image resizing, email, reports) stored in the
+    database and executed by the run_task_worker management command.
+    See restaurant.tasks for the registry and enqueue().
+    """
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        RUNNING = 'RUNNING', 'Running'
+        SUCCEEDED = 'SUCCEEDED', 'Succeeded'
+        FAILED = 'FAILED', 'Failed'
+
+    name = models.CharField(max_length=100, help_text="Registered task name")
+    payload = models.JSONField(default=dict, blank=True, help_text="Keyword arguments for the task")
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(help_text="Earliest time the task may run")
+    locked_at = models.DateTimeField(null=True, blank=True, help_text="When a worker claimed the task")
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='restaurant_task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.get_status_display()})"
@@ -0,0 +1,221 @@
+"""
+Full-text menu search
+
+Menu items are indexed by name, description and category name in a
+search table maintained by database triggers (migration 0003):
+an FTS5 table on SQLite and a tsvector column with a GIN index on
+PostgreSQL. Queries are ranked and every term is prefix-matched, so the
+index can answer type-ahead lookups as the user types.
+
+SQLite drops the triggers whenever Django rebuilds restaurant_menuitem
+(AddField/AlterField), so such migrations must drop and recreate them
+around the rebuild, as migration 0004 does.
+"""
+from bisect import bisect_left, insort
+from decimal import Decimal
+import re
+import threading
+import time
+
+from django.db import connections
+from django.db.models import Q
+
+MENU_FTS_TABLE = 'restaurant_menuitem_fts'
+MENU_TSV_TABLE = 'restaurant_menuitem_search'
+
+# Column weights for ranking: name, description, category
+SQLITE_BM25_WEIGHTS = (10.0, 1.0, 4.0)
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+_index_available = {}
+
+
+def _search_table(alias):
+    """Name of the search table on this database, or None if not installed"""
+    if alias not in _index_available:
+        connection = connections[alias]
+        table = {'sqlite': MENU_FTS_TABLE, 'postgresql': MENU_TSV_TABLE}.get(connection.vendor)
+        if table and table not in connection.introspection.table_names():
+            table = None
+        _index_available[alias] = table
+    return _index_available[alias]
+
+
+def search_terms(query):
+    """Split a free-text query into at most MAX_TERMS lowercase word terms"""
+    return _TERM_RE.findall((query or '').lower())[:MAX_TERMS]
+
+
+def search_menu_items(query, limit=10, using='default'):
+    """
+    Search active menu items, best matches first
+
+    Args:
+        query: Free text; every word is treated as a prefix
+        limit: Maximum number of results
+        using: Database alias to search
+
+    Returns:
+        List of MenuItem instances with their category selected
+    """
+    from restaurant.models import MenuItem
+
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    table = _search_table(using)
+    items = MenuItem.objects.using(using).select_related('category')
+    if table is None:
+        matches = Q()
+        for term in terms:
+            matches &= (
+                Q(name__icontains=term) | Q(description__icontains=term) |
+                Q(category__name__icontains=term)
+            )
+        return list(items.filter(matches, is_active=True)[:limit])
+
+    if connections[using].vendor == 'sqlite':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(w) for w in SQLITE_BM25_WEIGHTS)
+        sql = (
+            f'SELECT m.id FROM "{table}" f '
+            f'JOIN restaurant_menuitem m ON m.id = f.rowid '
+            f'WHERE "{table}" MATCH %s AND m.is_active '
+            f'ORDER BY bm25("{table}", {weights}) LIMIT %s'
+        )
+        params = [match, limit]
+    else:
+        match = ' & '.join(f'{term}:*' for term in terms)
+        sql = (
+            f'SELECT m.id FROM "{table}" s '
+            f'JOIN restaurant_menuitem m ON m.id = s.item_id '
+            f"WHERE s.document @@ to_tsquery('simple', %s) AND m.is_active "
+            f"ORDER BY ts_rank(s.document, to_tsquery('simple', %s)) DESC LIMIT %s"
+        )
+        params = [match, match, limit]
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        ids = [row[0] for row in cursor.fetchall()]
+
+    found = items.in_bulk(ids)
+    return [found[pk] for pk in ids if pk in found]
+
+
+class MenuPrefixIndex:
+    """
+    In-process prefix index over active menu item names and SKUs
+
+    Keys are kept in a sorted list of (token, item_id) pairs, so a prefix
+    lookup is a bisect plus a short scan and never touches the database.
+    Each name word, the full name and the SKU are indexed. Entries are
+    updated incrementally from menu change signals (see restaurant.signals);
+    the whole index is also rebuilt every REBUILD_INTERVAL seconds to pick
+    up changes written by other processes or by bulk operations.
+    """
+    REBUILD_INTERVAL = 300  # seconds
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._keys = []
+        self._entries = {}
+        self._built_at = None
+
+    @staticmethod
+    def _tokens(entry):
+        name = entry['name'].lower()
+        tokens = set(_TERM_RE.findall(name))
+        tokens.add(' '.join(name.split()))
+        if entry['sku']:
+            tokens.add(entry['sku'].lower())
+        return tokens
+
+    @staticmethod
+    def _entry(item, category_name):
+        return {
+            'id': item.id,
+            'name': item.name,
+            'sku': item.sku,
+            'price': format(Decimal(item.price), '.2f'),
+            'category': category_name,
+        }
+
+    def rebuild(self):
+        """Reload every active item from the database"""
+        from restaurant.models import MenuItem
+
+        rows = MenuItem.objects.filter(
+            is_active=True, category__is_active=True
+        ).select_related('category').order_by()
+        entries = {item.id: self._entry(item, item.category.name) for item in rows}
+        keys = sorted(
+            (token, item_id)
+            for item_id, entry in entries.items()
+            for token in self._tokens(entry)
+        )
+        with self._lock:
+            self._entries = entries
+            self._keys = keys
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        """Force a full rebuild on the next lookup"""
+        with self._lock:
+            self._built_at = None
+
+    def _ensure_fresh(self):
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self.REBUILD_INTERVAL:
+            self.rebuild()
+
+    def _discard(self, item_id):
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        for token in self._tokens(entry):
+            position = bisect_left(self._keys, (token, item_id))
+            if position < len(self._keys) and self._keys[position] == (token, item_id):
+                del self._keys[position]
+
+    def update_item(self, item):
+        """Re-index a single item after it was saved"""
+        with self._lock:
+            if self._built_at is None:
+                return
+            self._discard(item.id)
+            if item.is_active and item.category.is_active:
+                entry = self._entry(item, item.category.name)
+                self._entries[item.id] = entry
+                for token in self._tokens(entry):
+                    insort(self._keys, (token, item.id))
+
+    def remove_item(self, item_id):
+        """Drop a single item after it was deleted"""
+        with self._lock:
+            if self._built_at is not None:
+                self._discard(item_id)
+
+    def lookup(self, prefix, limit=10):
+        """Return up to `limit` item dicts whose name words, name or SKU start with `prefix`"""
+        prefix = ' '.join((prefix or '').lower().split())
+        if not prefix:
+            return []
+        self._ensure_fresh()
+
+        with self._lock:
+            results, seen = [], set()
+            position = bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and len(results) < limit:
+                token, item_id = self._keys[position]
+                if not token.startswith(prefix):
+                    break
+                if item_id not in seen:
+                    seen.add(item_id)
+                    results.append(self._entries[item_id])
+                position += 1
+            return results
+
+
+menu_prefix_index = MenuPrefixIndex()
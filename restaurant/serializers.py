@@ -1,6 +1,9 @@
 from decimal import Decimal
 from typing import List, Dict
 
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (
     MenuCategory, MenuItem, Table, Order, OrderItem, Payment, Customer
@@ -25,6 +28,10 @@ class MenuItemSerializer(serializers.ModelSerializer):
                  "category", "category_name", "created_at", "updated_at")
         read_only_fields = ("id", "created_at", "updated_at")
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related('category')
+
 
 class TableSerializer(serializers.ModelSerializer):
     """Serializer for the Table model."""
@@ -40,6 +47,7 @@ class TableSerializer(serializers.ModelSerializer):
 class CustomerSerializer(serializers.ModelSerializer):
     """Serializer for the Customer model."""
     total_spent = serializers.DecimalField(
+        source="lifetime_spend",
         max_digits=12, decimal_places=2, read_only=True, 
         help_text="Total amount spent by the customer"
     )
@@ -47,9 +55,10 @@ class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ("id", "name", "email", "phone", "address", 
-                 "loyalty_points", "is_vip", "total_spent", "notes", 
-                 "created_at", "updated_at")
-        read_only_fields = ("id", "created_at", "updated_at", "total_spent")
+                 "loyalty_points", "is_vip", "total_spent", "order_count",
+                 "last_order_at", "notes", "created_at", "updated_at")
+        read_only_fields = ("id", "created_at", "updated_at", "total_spent",
+                            "order_count", "last_order_at")
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -74,6 +83,10 @@ class PaymentSerializer(serializers.ModelSerializer):
                  "processed_by", "processed_by_username", "created_at", "updated_at")
         read_only_fields = ("id", "created_at", "updated_at")
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related('processed_by')
+
 
 class OrderItemSerializer(serializers.ModelSerializer):
     """Serializer for the OrderItem model with line total calculation."""
@@ -90,13 +103,41 @@ class OrderItemSerializer(serializers.ModelSerializer):
                  "qty", "notes", "line_total", "created_at", "updated_at")
         read_only_fields = ("created_at", "updated_at")
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        return queryset.select_related('item')
+
     def get_line_total(self, obj):
         return obj.line_total
 
 
+class MenuItemRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field for menu items that resolves values from the map
+    OrderSerializer prefetches for the whole payload, so nested lines do
+    not cost one lookup each.
+    """
+    def to_internal_value(self, data):
+        prefetched = self.context.get("prefetched_menu_items") or {}
+        try:
+            return prefetched[int(data)]
+        except (KeyError, TypeError, ValueError):
+            return super().to_internal_value(data)
+
+
+class NestedOrderItemSerializer(OrderItemSerializer):
+    """Order item serializer used inside OrderSerializer; the order is implied."""
+    item = MenuItemRelatedField(
+        queryset=MenuItem.objects.all(), allow_null=True, required=False
+    )
+
+    class Meta(OrderItemSerializer.Meta):
+        read_only_fields = ("order", "created_at", "updated_at")
+
+
 class OrderSerializer(serializers.ModelSerializer):
     """Serializer for the Order model with nested items and payments."""
-    items = OrderItemSerializer(many=True, required=False)
+    items = NestedOrderItemSerializer(many=True, required=False)
     payments = PaymentSerializer(many=True, read_only=True)
     table = serializers.PrimaryKeyRelatedField(queryset=Table.objects.all())
     table_number = serializers.CharField(source="table.number", read_only=True)
@@ -133,56 +174,120 @@ class OrderSerializer(serializers.ModelSerializer):
             "amount_paid", "balance_due"
         )
 
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Select/prefetch every relation this serializer reads, so listing
+        any number of orders runs a constant number of queries.
+        """
+        return queryset.select_related(
+            'customer', 'table', 'created_by', 'served_by'
+        ).prefetch_related(
+            Prefetch('items', queryset=NestedOrderItemSerializer.setup_eager_loading(OrderItem.objects.all())),
+            Prefetch('payments', queryset=PaymentSerializer.setup_eager_loading(Payment.objects.all())),
+        )
+
     def get_amount_paid(self, obj):
         return obj.amount_paid
 
     def get_balance_due(self, obj):
         return obj.balance_due
 
+    def to_internal_value(self, data):
+        # Resolve every referenced menu item with one query up front
+        items = data.get("items") if hasattr(data, "get") else None
+        if isinstance(items, list):
+            item_ids = set()
+            for line in items:
+                try:
+                    item_ids.add(int(line.get("item")))
+                except (AttributeError, TypeError, ValueError):
+                    continue
+            self.context["prefetched_menu_items"] = MenuItem.objects.in_bulk(item_ids)
+        return super().to_internal_value(data)
+
     def _sync_items(self, order: Order, items_data: List[Dict]):
         """
         Sync order items with the provided data.
-        - If an item dict has 'id', update that row
+        - If an item dict has 'id', update that row (it must belong to this
+          order, otherwise a ValidationError is raised before any write)
         - Else create a new row
         - Delete rows that were not sent
+
+        The diff is computed in memory and applied with one bulk_create,
+        one bulk_update and one delete. Totals are left to the caller.
         """
         if items_data is None:
             return
 
-        # Get all item IDs from the request data
-        item_ids = [item.get('id') for item in items_data if item.get('id')]
-        
-        # Delete items not included in the request
-        OrderItem.objects.filter(order=order).exclude(id__in=item_ids).delete()
-        
-        # Create or update items
+        existing = {line.id: line for line in order.items.all()}
+        sent_ids = set()
+        to_create, to_update, update_fields = [], [], set()
+        now = timezone.now()
+
         for item_data in items_data:
+            item_data = dict(item_data)
             item_id = item_data.pop('id', None)
-            if item_id:
-                # Update existing item
-                OrderItem.objects.filter(id=item_id, order=order).update(**item_data)
-            else:
-                # Create new item
-                OrderItem.objects.create(order=order, **item_data)
+
+            if not item_id:
+                line = OrderItem(order=order, **item_data)
+                if line.item and not line.item_name:
+                    line.item_name = line.item.name
+                if line.item and not line.unit_price:
+                    line.unit_price = line.item.price
+                to_create.append(line)
+                continue
+
+            sent_ids.add(item_id)
+            line = existing.get(item_id)
+            if line is None:
+                raise serializers.ValidationError(
+                    {'items': [f'Order item {item_id} does not belong to order {order.pk}.']}
+                )
+
+            changed = []
+            for attr, value in item_data.items():
+                if attr == 'item':
+                    current, new = line.item_id, (value.pk if value is not None else None)
+                else:
+                    current, new = getattr(line, attr), value
+                if current != new:
+                    setattr(line, attr, value)
+                    changed.append(attr)
+            if changed:
+                line.updated_at = now
+                update_fields.update(changed)
+                to_update.append(line)
+
+        stale_ids = [line_id for line_id in existing if line_id not in sent_ids]
+        if stale_ids:
+            OrderItem.objects.filter(id__in=stale_ids).delete()
+        if to_update:
+            OrderItem.objects.bulk_update(to_update, sorted(update_fields | {'updated_at'}))
+        if to_create:
+            OrderItem.objects.bulk_create(to_create)
 
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
-        order = Order.objects.create(**validated_data)
-        self._sync_items(order, items_data)
-        order.recalc_totals()
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            self._sync_items(order, items_data)
+            order.recalc_totals()
         return order
 
     def update(self, instance, validated_data):
         items_data = validated_data.pop('items', None)
         
-        # Update order fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        
-        # Update items if provided
-        if items_data is not None:
-            self._sync_items(instance, items_data)
-        
-        instance.recalc_totals()
-        instance.save()
+        with transaction.atomic():
+            # Update order fields
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            
+            # Update items if provided
+            if items_data is not None:
+                self._sync_items(instance, items_data)
+            
+            # One totals pass, written together with the order fields
+            instance.recalc_totals(commit=False)
+            instance.save()
         return instance
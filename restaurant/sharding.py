@@ -0,0 +1,158 @@
+"""
+Branch sharding
+
+Order, OrderItem, Table, Payment and ArchivedOrder rows are partitioned by branch. Each
+branch listed in settings.BRANCH_DATABASES ({branch: database alias}) has
+its own database; unlisted branches (including the default 'main') stay
+in the default database. Customers, users and the menu are shared and
+always live in the default database.
+
+Writes follow the instance's branch. Reads follow the active branch:
+
+    with using_branch('westlands'):
+        Order.objects.filter(status='PENDING')
+
+Cross-branch reporting fans out over every branch database in parallel;
+see restaurant.utils.analytics. Per-customer pages, whose orders may sit
+in any branch, query each branch in turn with each_branch().
+"""
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from restaurant.models import DEFAULT_BRANCH
+
+PRIMARY = 'default'
+SHARDED_MODELS = {
+    'restaurant.order', 'restaurant.orderitem', 'restaurant.table', 'restaurant.payment',
+    'restaurant.archivedorder',
+}
+
+BRANCH_HEADER = 'X-Restaurant-Branch'
+BRANCH_SESSION_KEY = 'branch'
+
+_current_branch = ContextVar('current_branch', default=None)
+
+
+def branch_databases():
+    """{branch: alias} for every branch, the default branch included"""
+    branches = {DEFAULT_BRANCH: PRIMARY}
+    branches.update(getattr(settings, 'BRANCH_DATABASES', {}))
+    return branches
+
+
+def branch_database(branch):
+    """Database alias holding a branch's orders, tables and payments"""
+    return branch_databases().get(branch or DEFAULT_BRANCH, PRIMARY)
+
+
+def current_branch():
+    return _current_branch.get()
+
+
+class using_branch(ContextDecorator):
+    """Route sharded reads and writes inside the block/function to a branch"""
+
+    def __init__(self, branch):
+        self.branch = branch
+
+    def __enter__(self):
+        self._token = _current_branch.set(self.branch)
+        return self
+
+    def __exit__(self, *exc):
+        _current_branch.reset(self._token)
+        return False
+
+
+def each_branch(func, branches=None):
+    """
+    Call func(branch) for every branch, one after another, with the branch
+    active. For small per-customer reads, where a thread per branch costs
+    more than the queries.
+
+    Returns:
+        dict: {branch: func(branch)}
+    """
+    results = {}
+    for branch in branches or branch_databases():
+        with using_branch(branch):
+            results[branch] = func(branch)
+    return results
+
+
+def _is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def _instance_branch(instance):
+    branch = getattr(instance, 'branch', None)
+    if branch is None and 'order' in instance._state.fields_cache:
+        # Order items live with their order
+        branch = instance.order.branch
+    return branch
+
+
+class BranchRouter:
+    """
+    Route sharded models to their branch database. Returns None (defer to
+    the next router) for shared models and when no branch is known.
+
+    Instance hints are only trusted when they are sharded rows themselves;
+    a Customer's orders, for example, may sit in any branch database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if not _is_sharded(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and _is_sharded(type(instance)) and instance._state.db:
+            return instance._state.db
+        branch = current_branch()
+        alias = branch_database(branch) if branch else PRIMARY
+        # Leave primary reads to the next router so read_replica() still applies
+        return None if alias == PRIMARY else alias
+
+    def db_for_write(self, model, **hints):
+        if not _is_sharded(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and _is_sharded(type(instance)):
+            if instance._state.db and not instance._state.adding:
+                return instance._state.db
+            branch = _instance_branch(instance)
+            if branch:
+                return branch_database(branch)
+        branch = current_branch()
+        return branch_database(branch) if branch else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Shared rows in the default database may be referenced from any branch
+        aliases = set(branch_databases().values())
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Every branch database carries the full schema
+        return None
+
+
+class BranchMiddleware:
+    """
+    Activate the request's branch: the X-Restaurant-Branch header (branch
+    terminals) or the 'branch' session key. Must come after SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = getattr(request, 'session', None)
+        branch = request.headers.get(BRANCH_HEADER) or (session.get(BRANCH_SESSION_KEY) if session is not None else None)
+        if branch not in branch_databases():
+            branch = None
+        request.branch = branch or DEFAULT_BRANCH
+        with using_branch(branch):
+            return self.get_response(request)
@@ -0,0 +1,91 @@
+"""
+Signal handlers for the restaurant app
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import MenuCategory, MenuItem, Order
+from .search import menu_prefix_index
+from .tasks import enqueue, generate_menu_image_variants
+from .utils.customer_stats import schedule_stats_refresh
+from .utils.dashboard import invalidate_dashboard
+from .utils.images import variants_are_stale
+
+
+# The in-memory type-ahead index is process-wide, so it only learns about
+# menu changes once they commit; a rolled-back edit never reaches it.
+
+@receiver(post_save, sender=MenuItem)
+def reindex_menu_item(sender, instance, using=None, **kwargs):
+    """Keep the in-memory type-ahead index in step with item edits"""
+    transaction.on_commit(lambda: menu_prefix_index.update_item(instance), using=using)
+
+
+@receiver(post_save, sender=MenuItem)
+def refresh_menu_item_image_variants(sender, instance, raw=False, **kwargs):
+    """Queue resizing of a newly uploaded photo; no-op when the image did not change"""
+    if not raw and variants_are_stale(instance):
+        enqueue(generate_menu_image_variants, item_id=instance.pk)
+
+
+@receiver(post_delete, sender=MenuItem)
+def unindex_menu_item(sender, instance, using=None, **kwargs):
+    item_id = instance.pk
+    transaction.on_commit(lambda: menu_prefix_index.remove_item(item_id), using=using)
+
+
+@receiver([post_save, post_delete], sender=MenuCategory)
+def invalidate_menu_index(sender, instance, using=None, **kwargs):
+    """Category renames/deactivation affect many items; rebuild lazily"""
+    transaction.on_commit(menu_prefix_index.invalidate, using=using)
+
+
+@receiver(pre_save, sender=Order)
+def detect_customer_stats_change(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    """
+    Note the customers whose stats a save changes: the order enters or
+    leaves COMPLETED, or a completed order changes customer or total.
+    The stored values come from when the instance was loaded or last
+    saved; only an instance loaded without them (deferred fields) costs a
+    lookup of the stored row.
+    """
+    instance._stats_customers = set()
+    if raw:
+        return
+    if update_fields is not None and not {'status', 'customer', 'customer_id', 'total'} & set(update_fields):
+        return
+    current = tuple(getattr(instance, f) for f in Order.STATS_TRACKED_FIELDS)
+    previous = None
+    if not instance._state.adding:
+        previous = getattr(instance, '_stored_stats_fields', None)
+        if previous is None:
+            previous = Order.objects.using(using).filter(pk=instance.pk).values_list(
+                *Order.STATS_TRACKED_FIELDS
+            ).first()
+    if previous == current:
+        return
+    instance._stats_customers = {
+        customer_id for status, customer_id, _ in filter(None, [previous, current])
+        if status == Order.Status.COMPLETED
+    }
+
+
+@receiver(post_save, sender=Order)
+def update_customer_stats(sender, instance, using=None, update_fields=None, **kwargs):
+    schedule_stats_refresh(getattr(instance, '_stats_customers', ()), using=using)
+    instance._stats_customers = set()
+    if update_fields is None or {'status', 'customer', 'customer_id', 'total'} & set(update_fields):
+        instance._stored_stats_fields = tuple(getattr(instance, f) for f in Order.STATS_TRACKED_FIELDS)
+
+
+@receiver(post_delete, sender=Order)
+def remove_from_customer_stats(sender, instance, using=None, **kwargs):
+    if instance.status == Order.Status.COMPLETED:
+        schedule_stats_refresh([instance.customer_id], using=using)
+
+
+@receiver([post_save, post_delete], sender=Order)
+def invalidate_customer_dashboard(sender, instance, using=None, **kwargs):
+    """Any order event (new order, status change, new items via totals) refreshes the dashboard"""
+    invalidate_dashboard(instance.customer_id, using=using)
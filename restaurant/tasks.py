@@ -0,0 +1,243 @@
+"""
+Database-backed background tasks
+
+Slow side effects (image resizing, email, reports) are recorded as
+BackgroundTask rows and executed by `python manage.py run_task_worker`,
+so request threads only pay for one INSERT. No external broker is needed.
+
+    @task()
+    def send_email(subject, body, to, from_email=None, html_body=None):
+        ...
+
+    enqueue('send_email', subject='Hi', body='...', to=['guest@example.com'])
+
+enqueue() defers the INSERT with transaction.on_commit, so a task never
+runs against data from a transaction that rolled back.
+"""
+from datetime import timedelta
+import logging
+import traceback
+
+from django.core.mail import EmailMultiAlternatives
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+RETRY_BASE_DELAY = 10  # seconds; doubled on every attempt
+RETRY_MAX_DELAY = 3600
+
+_registry = {}
+
+
+def task(name=None, max_attempts=5):
+    """Register a function as a background task"""
+    def decorator(func):
+        task_name = name or func.__name__
+        _registry[task_name] = (func, max_attempts)
+        func.task_name = task_name
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry[name][0]
+
+
+def enqueue(name, run_after=None, using=None, **payload):
+    """
+    Schedule a registered task once the current transaction commits.
+
+    Args:
+        name: Registered task name (or the decorated function itself)
+        run_after: Optional datetime before which the task must not run
+        using: Database alias whose transaction to wait for
+        **payload: JSON-serializable keyword arguments for the task
+    """
+    from restaurant.models import BackgroundTask
+
+    name = getattr(name, 'task_name', name)
+    if name not in _registry:
+        raise KeyError(f"Unknown background task '{name}'")
+    max_attempts = _registry[name][1]
+
+    def create():
+        BackgroundTask.objects.create(
+            name=name,
+            payload=payload,
+            max_attempts=max_attempts,
+            run_after=run_after or timezone.now(),
+        )
+
+    transaction.on_commit(create, using=using)
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 10s, 20s, 40s, ... capped at an hour"""
+    return timedelta(seconds=min(RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), RETRY_MAX_DELAY))
+
+
+def prune_finished_tasks(older_than):
+    """
+    Delete SUCCEEDED and FAILED tasks last touched more than `older_than`
+    seconds ago, so the queue table only holds recent history.
+
+    Returns:
+        int: Number of deleted tasks
+    """
+    from restaurant.models import BackgroundTask
+
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    deleted, _ = BackgroundTask.objects.filter(
+        status__in=[BackgroundTask.Status.SUCCEEDED, BackgroundTask.Status.FAILED],
+        updated_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+def requeue_stale_tasks(stale_after):
+    """Return tasks left RUNNING by a crashed worker to the queue"""
+    from restaurant.models import BackgroundTask
+
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return BackgroundTask.objects.filter(
+        status=BackgroundTask.Status.RUNNING, locked_at__lt=cutoff
+    ).update(status=BackgroundTask.Status.PENDING, locked_at=None)
+
+
+def claim_due_tasks(limit):
+    """
+    Claim up to `limit` due tasks for this worker.
+
+    Each claim is a conditional UPDATE on the PENDING status, so concurrent
+    workers never run the same task twice.
+    """
+    from restaurant.models import BackgroundTask
+
+    now = timezone.now()
+    candidate_ids = list(
+        BackgroundTask.objects.filter(
+            status=BackgroundTask.Status.PENDING, run_after__lte=now
+        ).order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+    )
+    claimed = [
+        task_id for task_id in candidate_ids
+        if BackgroundTask.objects.filter(
+            id=task_id, status=BackgroundTask.Status.PENDING
+        ).update(
+            status=BackgroundTask.Status.RUNNING,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+    ]
+    return list(BackgroundTask.objects.filter(id__in=claimed))
+
+
+def run_task(background_task):
+    """
+    Execute one claimed task and record the outcome.
+
+    Failures are retried with exponential backoff until max_attempts is
+    reached, after which the task is marked FAILED with its traceback.
+
+    Returns:
+        bool: True if the task succeeded
+    """
+    from restaurant.models import BackgroundTask
+
+    close_old_connections()
+    try:
+        func = get_task(background_task.name)
+        func(**background_task.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning(f"Background task {background_task} failed: {error}")
+        if background_task.attempts >= background_task.max_attempts:
+            status, run_after = BackgroundTask.Status.FAILED, background_task.run_after
+        else:
+            status = BackgroundTask.Status.PENDING
+            run_after = timezone.now() + retry_delay(background_task.attempts)
+        BackgroundTask.objects.filter(pk=background_task.pk).update(
+            status=status, run_after=run_after, locked_at=None,
+            last_error=error, updated_at=timezone.now(),
+        )
+        return False
+    else:
+        BackgroundTask.objects.filter(pk=background_task.pk).update(
+            status=BackgroundTask.Status.SUCCEEDED, locked_at=None,
+            last_error='', updated_at=timezone.now(),
+        )
+        return True
+    finally:
+        close_old_connections()
+
+
+# Tasks
+
+@task()
+def generate_menu_image_variants(item_id):
+    """Resize a menu item's photo into its responsive variants"""
+    from restaurant.models import MenuItem
+    from restaurant.utils.images import ensure_menu_item_variants
+
+    item = MenuItem.objects.filter(pk=item_id).first()
+    if item is not None:
+        ensure_menu_item_variants(item)
+
+
+@task()
+def send_email(subject, body, to, from_email=None, html_body=None):
+    """Send an email through the configured EMAIL_BACKEND"""
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html_body:
+        message.attach_alternative(html_body, 'text/html')
+    message.send()
+
+
+@task()
+def send_password_reset_email(user_id, subject_template_name, email_template_name, domain, site_name,
+                              use_https=False, from_email=None, html_email_template_name=None):
+    """
+    Render and send a password reset email.
+
+    Only the user id travels through the queue: the reset link is built
+    here, so no live token is ever stored in BackgroundTask.payload.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.forms import PasswordResetForm
+    from django.contrib.auth.tokens import default_token_generator
+    from django.utils.encoding import force_bytes
+    from django.utils.http import urlsafe_base64_encode
+
+    user = get_user_model()._default_manager.filter(pk=user_id, is_active=True).first()
+    if user is None or not user.has_usable_password():
+        return
+
+    email_field = user.get_email_field_name()
+    context = {
+        'email': getattr(user, email_field),
+        'domain': domain,
+        'site_name': site_name,
+        'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+        'user': user,
+        'token': default_token_generator.make_token(user),
+        'protocol': 'https' if use_https else 'http',
+    }
+    PasswordResetForm().send_mail(
+        subject_template_name, email_template_name, context, from_email,
+        context['email'], html_email_template_name=html_email_template_name,
+    )
+
+
+@task()
+def email_daily_report(day, to, branches=None, top=10):
+    """Compute the sales report for `day` (YYYY-MM-DD) and email it as plain text"""
+    from datetime import date
+
+    from restaurant.utils.analytics import daily_sales_summary, format_daily_report
+
+    report_day = date.fromisoformat(day)
+    lines = format_daily_report(report_day, daily_sales_summary(report_day, branches=branches, top=top))
+    send_email(subject=lines[0], body='\n'.join(lines) + '\n', to=to)
@@ -1,3 +1,1548 @@
-from django.test import TestCase
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.contrib.sessions.backends.base import SessionBase
+from django.core import mail
+from django.core.exceptions import FieldError
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from . import search, tasks
+from .backends import EmailBackend
+from .management.commands import map_menu_images
+from .db_router import (
+    STICKY_SESSION_KEY, ReadReplicaRouter, ReplicaStickinessMiddleware, pin_to_primary, read_replica,
+)
+from .middleware import get_request_customer
+from .models import ArchivedOrder, BackgroundTask, Customer, MenuCategory, MenuItem, Order, OrderItem, Payment, Table, User
+from .serializers import CustomerSerializer, OrderSerializer
+from .sharding import BranchMiddleware, BranchRouter, using_branch
+from .utils.analytics import branch_sales_summary
+from .utils.archive import customer_order_history
+from .utils.dashboard import build_dashboard, get_dashboard
+from .utils.images import ensure_menu_item_variants, generate_variants, variants_are_stale
+from .utils.order_manager import OrderManager
+from .utils.performance import order_batch
+from .utils.sqlite import PRODUCTION_PRAGMAS, pragma_statements
+from .views_api import CreatedAtCursorPagination
+
+
+def create_order_fixtures(**user_fields):
+    """Staff user, customer, table and one menu item (Pilau, in Mains) to place orders with"""
+    user = User.objects.create_user(email='staff@example.com', password='pass', **user_fields)
+    customer = Customer.objects.create(name='Jane Doe', phone='0712345678', email='jane@example.com')
+    table = Table.objects.create(number='T1')
+    category = MenuCategory.objects.create(name='Mains')
+    item = MenuItem.objects.create(category=category, name='Pilau', sku='PIL001', price=Decimal('5.00'))
+    return user, customer, table, item
+
+
+class OrderBatchTests(TestCase):
+    """order_batch() recalculates each dirty order once, when the outer block exits."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.customer, cls.table, cls.item = create_order_fixtures()
+
+    def setUp(self):
+        self.order = Order.objects.create(customer=self.customer, table=self.table, created_by=self.user)
+        recalc = Order.recalc_totals
+        patcher = mock.patch.object(Order, 'recalc_totals', autospec=True, side_effect=recalc)
+        self.recalc = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def add_line(self, qty=1):
+        OrderItem.objects.create(order=self.order, item=self.item, item_name='Pilau', unit_price=Decimal('5.00'), qty=qty)
+
+    def test_lines_outside_a_batch_recalculate_every_time(self):
+        self.add_line()
+        self.add_line()
+        self.assertEqual(self.recalc.call_count, 2)
+
+    def test_batch_recalculates_once(self):
+        with order_batch():
+            for qty in (1, 2, 3):
+                self.add_line(qty)
+            self.assertEqual(self.recalc.call_count, 0)
+
+        self.assertEqual(self.recalc.call_count, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total, Decimal('30.00'))
+
+    def test_nested_batch_flushes_with_the_outer_block(self):
+        with order_batch():
+            with order_batch():
+                self.add_line()
+            self.assertEqual(self.recalc.call_count, 0)
+            self.add_line()
+
+        self.assertEqual(self.recalc.call_count, 1)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total, Decimal('10.00'))
+
+    def test_failed_batch_discards_pending_recalculations(self):
+        with self.assertRaises(RuntimeError):
+            with order_batch():
+                self.add_line()
+                raise RuntimeError('boom')
+
+        self.assertEqual(self.recalc.call_count, 0)
+        # The next batch starts clean
+        with order_batch():
+            self.add_line()
+        self.assertEqual(self.recalc.call_count, 1)
+
+
+class BulkRecalcTotalsTests(TestCase):
+    """Bulk totals recalculation works chunk by chunk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user, customer, table, item = create_order_fixtures()
+
+        # bulk_create skips OrderItem.save, so every total starts out stale
+        cls.orders = Order.objects.bulk_create([
+            Order(customer=customer, table=table, created_by=user, status=status, tax=Decimal('1.00'))
+            for status in ['PENDING'] * 5 + ['COMPLETED'] * 2
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, item_name=item.name, unit_price=item.price, qty=2)
+            for order in cls.orders
+        ])
+
+    def test_recalculates_in_chunks(self):
+        # Per chunk: orders, line sums, bulk_update; plus the final empty read
+        with self.assertNumQueries(3 * 3 + 1):
+            checked, changed = OrderManager.bulk_recalc_totals(Order.objects.all(), batch_size=3)
+
+        self.assertEqual((checked, changed), (7, 7))
+        self.assertEqual(set(Order.objects.values_list('subtotal', 'total')), {(Decimal('10.00'), Decimal('11.00'))})
+        self.assertEqual(OrderManager.bulk_recalc_totals(Order.objects.all()), (7, 0))
+
+    def test_dry_run_writes_nothing(self):
+        checked, changed = OrderManager.bulk_recalc_totals(Order.objects.all(), commit=False)
+
+        self.assertEqual((checked, changed), (7, 7))
+        self.assertFalse(Order.objects.exclude(total=Decimal('0.00')).exists())
+
+    def test_command_defaults_to_active_orders(self):
+        out = StringIO()
+        call_command('recalc_order_totals', batch_size=2, stdout=out)
+
+        self.assertIn('Checked 5 orders, updated 5', out.getvalue())
+        self.assertEqual(Order.objects.filter(status='COMPLETED', total=Decimal('0.00')).count(), 2)
+
+    def test_command_status_and_dry_run_options(self):
+        out = StringIO()
+        call_command('recalc_order_totals', status=['COMPLETED'], dry_run=True, stdout=out)
+        self.assertIn('Checked 2 orders, would change 2', out.getvalue())
+
+        call_command('recalc_order_totals', all_statuses=True, stdout=out)
+        self.assertFalse(Order.objects.filter(total=Decimal('0.00')).exists())
+
+
+class OrderSerializerItemSyncTests(TestCase):
+    """PATCHing nested items is a diff applied in bulk."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff, cls.customer, cls.table, pilau = create_order_fixtures(is_staff=True)
+        category = pilau.category
+        cls.menu = [
+            MenuItem.objects.create(category=category, name=f'Dish {n}', sku=f'DSH{n:03d}', price=Decimal('2.00'))
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def make_order(self, lines):
+        order = Order.objects.create(customer=self.customer, table=self.table, created_by=self.staff)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=self.menu[n % 3], item_name='Dish', unit_price=Decimal('2.00'), qty=1)
+            for n in range(lines)
+        ])
+        return order
+
+    def items_payload(self, order, keep, new):
+        """Update `keep` existing lines, drop the rest and add `new` lines"""
+        lines = list(order.items.values_list('id', flat=True))
+        items = [{'id': line_id, 'qty': 3} for line_id in lines[:keep]]
+        items += [{'item': self.menu[n % 3].id, 'qty': 1} for n in range(new)]
+        return {'items': items}
+
+    def patch(self, order, payload):
+        return self.client.patch(f'/api/v1/orders/{order.pk}/', payload, format='json')
+
+    def test_query_count_does_not_depend_on_line_count(self):
+        small, large = self.make_order(4), self.make_order(20)
+        small_payload = self.items_payload(small, keep=2, new=2)
+        large_payload = self.items_payload(large, keep=15, new=15)
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.assertEqual(self.patch(small, small_payload).status_code, 200)
+        with self.assertNumQueries(14):
+            response = self.patch(large, large_payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(small_queries), 14)
+        self.assertEqual(len(response.data['items']), 30)
+        self.assertEqual(response.data['total'], '120.00')
+
+    def test_lines_of_another_order_are_rejected(self):
+        order, other = self.make_order(1), self.make_order(1)
+        foreign_line = other.items.get()
+
+        response = self.client.patch(
+            f'/api/v1/orders/{order.pk}/', {'items': [{'id': foreign_line.pk, 'qty': 5}]}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('does not belong', str(response.data['items']))
+        foreign_line.refresh_from_db()
+        self.assertEqual(foreign_line.qty, 1)
+        self.assertEqual(order.items.count(), 1)
+
+
+class OrderSerializerQueryCountTests(TestCase):
+    """Serializing orders must not issue queries per order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user, customer, table, item = create_order_fixtures()
+
+        orders = Order.objects.bulk_create([
+            Order(customer=customer, table=table, created_by=user, served_by=user)
+            for _ in range(200)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, item_name=item.name, unit_price=item.price, qty=qty)
+            for order in orders
+            for qty in (1, 2)
+        ])
+        Payment.objects.bulk_create([
+            Payment(order=order, amount=Decimal('5.00'), processed_by=user)
+            for order in orders
+        ])
+
+    def serialize(self, limit):
+        queryset = OrderSerializer.setup_eager_loading(Order.objects.all())[:limit]
+        return OrderSerializer(queryset, many=True).data
+
+    def test_serializing_200_orders_runs_constant_queries(self):
+        # orders (with joined relations) + items + payments
+        with self.assertNumQueries(3):
+            data = self.serialize(200)
+
+        self.assertEqual(len(data), 200)
+        self.assertEqual(len(data[0]['items']), 2)
+        self.assertEqual(data[0]['amount_paid'], Decimal('5.00'))
+
+    def test_query_count_does_not_grow_with_order_count(self):
+        with self.assertNumQueries(3):
+            self.serialize(10)
+        with self.assertNumQueries(3):
+            self.serialize(200)
+
+
+class ApiViewSetTests(TestCase):
+    """The v1 viewsets page newest first by cursor and scope rows to the caller."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        cls.jane = User.objects.create_user(email='jane@example.com', password='pass')
+        cls.sam = User.objects.create_user(email='sam@example.com', password='pass')
+        jane_customer, _ = Customer.objects.get_or_create_for_user(cls.jane)
+        sam_customer, _ = Customer.objects.get_or_create_for_user(cls.sam)
+        table = Table.objects.create(number='T1')
+        category = MenuCategory.objects.create(name='Mains')
+        item = MenuItem.objects.create(category=category, name='Pilau', sku='PIL001', price=Decimal('5.00'))
+
+        cls.orders = {}
+        for customer in (jane_customer, sam_customer):
+            cls.orders[customer.email] = [
+                Order.objects.create(customer=customer, table=table, created_by=cls.staff)
+                for _ in range(3)
+            ]
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, item=item, item_name=item.name, unit_price=item.price, qty=1)
+                for order in cls.orders[customer.email]
+            ])
+
+        # Shared timestamps so the id tie-breaker decides the order
+        same_moment = timezone.now() - timedelta(days=1)
+        Order.objects.filter(pk__in=[o.pk for o in cls.orders['sam@example.com']]).update(created_at=same_moment)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def ids(self, url, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_every_list_endpoint_is_cursor_paginated(self):
+        self.client.force_authenticate(self.staff)
+        for name in ('customers', 'menu-items', 'tables', 'orders', 'order-items'):
+            with self.subTest(endpoint=name):
+                response = self.client.get(f'/api/v1/{name}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(set(response.data), {'next', 'previous', 'results'})
+
+    def test_orders_are_newest_first_with_id_tie_breaker(self):
+        ids = self.ids('/api/v1/orders/', self.staff)
+
+        expected = list(
+            Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+        self.assertEqual(ids[-3:], sorted((o.pk for o in self.orders['sam@example.com']), reverse=True))
+
+    def test_cursor_pages_are_stable_under_inserts(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/v1/orders/', {'page_size': 2})
+        seen = [row['id'] for row in response.data['results']]
+
+        # A new order lands at the head; the next page must neither repeat nor skip rows
+        first = self.orders['jane@example.com'][0]
+        Order.objects.create(customer=first.customer, table=first.table, created_by=self.staff)
+
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [row['id'] for row in response.data['results']]
+
+        expected = [o.pk for orders in self.orders.values() for o in orders]
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(sorted(seen), sorted(expected))
+
+    @mock.patch.object(CreatedAtCursorPagination, 'max_page_size', 4)
+    def test_page_size_is_capped(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/v1/orders/', {'page_size': 10_000})
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_customers_only_see_their_own_orders_and_lines(self):
+        jane_orders = {o.pk for o in self.orders['jane@example.com']}
+
+        self.assertEqual(set(self.ids('/api/v1/orders/', self.jane)), jane_orders)
+        lines = self.client.get('/api/v1/order-items/').data['results']
+        self.assertEqual({line['order'] for line in lines}, jane_orders)
+
+        sam_order = self.orders['sam@example.com'][0]
+        self.assertEqual(self.client.get(f'/api/v1/orders/{sam_order.pk}/').status_code, 404)
+
+    def test_scoping_follows_the_user_link_not_the_email(self):
+        jane_orders = {o.pk for o in self.orders['jane@example.com']}
+        # A changed login email keeps the orders; a lookalike profile gains none
+        User.objects.filter(pk=self.jane.pk).update(email='jane.doe@example.com')
+        Customer.objects.filter(user=self.sam).update(email='jane.doe@example.com')
+        self.jane.refresh_from_db()
+
+        self.assertEqual(set(self.ids('/api/v1/orders/', self.jane)), jane_orders)
+        lines = self.client.get('/api/v1/order-items/').data['results']
+        self.assertEqual({line['order'] for line in lines}, jane_orders)
+
+    def test_customers_cannot_write_or_list_customers(self):
+        self.client.force_authenticate(self.jane)
+        order = self.orders['jane@example.com'][0]
+
+        self.assertEqual(self.client.patch(f'/api/v1/orders/{order.pk}/', {'notes': 'x'}).status_code, 403)
+        self.assertEqual(self.client.get('/api/v1/customers/').status_code, 403)
+
+    def test_anonymous_users_read_menu_but_not_orders(self):
+        self.assertEqual(self.client.get('/api/v1/menu-items/').status_code, 200)
+        self.assertEqual(self.client.get('/api/v1/tables/').status_code, 200)
+        self.assertIn(self.client.get('/api/v1/orders/').status_code, (401, 403))
+        self.assertIn(self.client.get('/api/v1/order-items/').status_code, (401, 403))
+
+
+class MenuSearchTests(TestCase):
+    """Ranked prefix search over the trigger-maintained menu index."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mains = MenuCategory.objects.create(name='Mains')
+        cls.drinks = MenuCategory.objects.create(name='Drinks')
+        cls.pilau = MenuItem.objects.create(
+            category=cls.mains, name='Beef Pilau', sku='PIL001', price=Decimal('5.00'),
+            description='Spiced rice',
+        )
+        cls.stew = MenuItem.objects.create(
+            category=cls.mains, name='Bean Stew', sku='STW001', price=Decimal('4.00'),
+            description='Slow cooked with pilau masala',
+        )
+        cls.tea = MenuItem.objects.create(category=cls.drinks, name='Masala Tea', sku='TEA001', price=Decimal('1.00'))
+
+    def setUp(self):
+        if search._search_table(connection.alias) is None:
+            self.skipTest('database without the menu search index')
+
+    def names(self, query, **kwargs):
+        return [item.name for item in search.search_menu_items(query, **kwargs)]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.names('pilau'), ['Beef Pilau', 'Bean Stew'])
+
+    def test_every_term_is_a_prefix_and_all_must_match(self):
+        self.assertEqual(self.names('mas te'), ['Masala Tea'])
+        self.assertEqual(set(self.names('be')), {'Beef Pilau', 'Bean Stew'})
+        self.assertEqual(self.names('drinks'), ['Masala Tea'])
+
+    def test_inactive_items_are_hidden(self):
+        MenuItem.objects.filter(pk=self.tea.pk).update(is_active=False)
+        self.assertEqual(self.names('masala'), ['Bean Stew'])
+
+    def test_triggers_follow_item_and_category_changes(self):
+        self.stew.name = 'Bean Curry'
+        self.stew.save()
+        self.assertEqual(self.names('curry'), ['Bean Curry'])
+        self.assertEqual(self.names('stew'), [])
+
+        MenuCategory.objects.filter(pk=self.drinks.pk).update(name='Beverages')
+        self.assertEqual(self.names('beverages'), ['Masala Tea'])
+
+        self.tea.delete()
+        self.assertEqual(self.names('beverages'), [])
+
+    def test_punctuation_cannot_break_the_match_expression(self):
+        self.assertEqual(self.names('"pilau"* ('), ['Beef Pilau', 'Bean Stew'])
+        self.assertEqual(self.names('NEAR( " * )'), [])
+
+    def test_fallback_scan_without_an_index(self):
+        with mock.patch.object(search, '_search_table', return_value=None):
+            self.assertEqual(set(self.names('pilau')), {'Beef Pilau', 'Bean Stew'})
+
+    def test_cost_does_not_grow_with_the_menu(self):
+        MenuItem.objects.bulk_create([
+            MenuItem(category=self.mains, name=f'Dish {n}', sku=f'DSH{n:05d}', price=Decimal('2.00'))
+            for n in range(3000)
+        ])
+
+        # Index lookup, then the matched rows with their category
+        with self.assertNumQueries(2):
+            started = time.monotonic()
+            self.assertEqual(len(search.search_menu_items('dish', limit=10)), 10)
+            elapsed = time.monotonic() - started
+        self.assertLess(elapsed, 0.5)
+
+    def test_json_endpoint(self):
+        response = self.client.get('/api/menu/search/', {'q': 'masala', 'limit': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{
+            'id': self.tea.pk, 'name': 'Masala Tea', 'sku': 'TEA001', 'price': '1.00', 'category': 'Drinks',
+        }])
+
+
+class MenuPrefixIndexTests(TestCase):
+    """The in-memory type-ahead index and the endpoint serving it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        cls.mains = MenuCategory.objects.create(name='Mains')
+        cls.retired = MenuCategory.objects.create(name='Retired', is_active=False)
+        cls.pilau = MenuItem.objects.create(category=cls.mains, name='Beef Pilau', sku='PIL001', price=Decimal('5'))
+        cls.stew = MenuItem.objects.create(category=cls.mains, name='Bean Stew', sku='STW001', price=Decimal('4'))
+        MenuItem.objects.create(category=cls.retired, name='Beef Fry', sku='FRY001', price=Decimal('6'))
+
+    def setUp(self):
+        search.menu_prefix_index.invalidate()
+        self.addCleanup(search.menu_prefix_index.invalidate)
+
+    def names(self, prefix, index=search.menu_prefix_index):
+        return [entry['name'] for entry in index.lookup(prefix)]
+
+    def test_matches_name_words_full_name_and_sku(self):
+        index = search.MenuPrefixIndex()
+        index.rebuild()
+
+        self.assertEqual(self.names('be', index), ['Bean Stew', 'Beef Pilau'])
+        self.assertEqual(self.names('beef pi', index), ['Beef Pilau'])
+        self.assertEqual(self.names('STW', index), ['Bean Stew'])
+        self.assertEqual(self.names('  ', index), [])
+
+    def test_lookups_after_the_build_do_not_query(self):
+        index = search.MenuPrefixIndex()
+        with self.assertNumQueries(1):
+            index.lookup('be')
+        with self.assertNumQueries(0):
+            self.assertEqual(index.lookup('pilau')[0]['price'], '5.00')
+
+    def test_committed_edits_update_the_index(self):
+        self.names('be')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.stew.name = 'Bean Curry'
+            self.stew.save()
+            # Not visible until the transaction commits
+            self.assertEqual(self.names('curry'), [])
+        self.assertEqual(self.names('curry'), ['Bean Curry'])
+        self.assertEqual(self.names('stew'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pilau.delete()
+        self.assertEqual(self.names('beef'), [])
+
+    def test_rolled_back_edits_never_reach_the_index(self):
+        self.names('be')
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.stew.name = 'Bean Curry'
+                self.stew.save()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.names('curry'), [])
+
+    def test_category_changes_trigger_a_rebuild(self):
+        self.names('be')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.retired.is_active = True
+            self.retired.save()
+        self.assertIn('Beef Fry', self.names('beef'))
+
+    def test_autocomplete_endpoint(self):
+        self.assertEqual(self.client.get('/api/menu/autocomplete/', {'q': 'be'}).status_code, 302)
+
+        self.client.force_login(self.user)
+        response = self.client.get('/api/menu/autocomplete/', {'q': 'be', 'limit': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'success': True, 'results': [{
+            'id': self.stew.pk, 'name': 'Bean Stew', 'sku': 'STW001', 'price': '4.00', 'category': 'Mains',
+        }]})
+
+
+# Replica aliases cannot see rows written inside the test; read the primary
+@override_settings(READ_REPLICAS=[])
+class MenuCategoryItemsETagTests(TestCase):
+    """Conditional GETs of a category's items follow the category too."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        cls.category = MenuCategory.objects.create(name='Mains')
+        cls.item = MenuItem.objects.create(category=cls.category, name='Pilau', sku='PIL001', price=Decimal('5'))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = f'/api/menu/categories/{self.category.pk}/items/'
+
+    def get(self, etag=None, **params):
+        headers = {'If-None-Match': etag} if etag else {}
+        return self.client.get(self.url, params, headers=headers)
+
+    def test_unchanged_category_is_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['items'][0]['name'], 'Pilau')
+
+        self.assertEqual(self.get(response['ETag']).status_code, 304)
+        self.assertEqual(self.get(response['ETag'], page_size=5).status_code, 200)
+
+    def test_item_and_category_edits_change_the_etag(self):
+        etag = self.get()['ETag']
+
+        self.item.price = Decimal('6')
+        self.item.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+
+        self.category.name = 'Main Dishes'
+        self.category.save()
+        response = self.get(response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['category']['name'], 'Main Dishes')
+
+    def test_deactivated_or_missing_category_is_not_found(self):
+        etag = self.get()['ETag']
+
+        self.category.is_active = False
+        self.category.save()
+        self.assertEqual(self.get(etag).status_code, 404)
+
+        response = self.client.get('/api/menu/categories/999/items/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 404)
+
+
+# Replica aliases cannot see rows written inside the test; read the primary
+@override_settings(READ_REPLICAS=[])
+class MenuImageVariantTests(TestCase):
+    """Menu photos get resized WebP/JPEG copies used by the menu page."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = MenuCategory.objects.create(name='Mains')
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = self.settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def photo(self, width, height, mode='RGB', name='pilau.png'):
+        buffer = BytesIO()
+        Image.new(mode, (width, height), (200, 120, 40, 128)[:len(mode)]).save(buffer, format='PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+    def make_item(self, image, sku='PIL001'):
+        return MenuItem.objects.create(
+            category=self.category, name=f'Pilau {sku}', sku=sku, price=Decimal('5'), image=image
+        )
+
+    def test_variants_for_each_width_and_format(self):
+        item = self.make_item(self.photo(1200, 800, mode='RGBA'))
+
+        variants = generate_variants(item.image)
+
+        self.assertEqual(variants['source'], item.image.name)
+        for key, extension in (('webp', 'WEBP'), ('jpeg', 'JPEG')):
+            self.assertEqual(set(variants[key]), {'320', '640', '1024'})
+            with Image.open(item.image.storage.path(variants[key]['640'])) as resized:
+                self.assertEqual((resized.format, resized.size), (extension, (640, 427)))
+
+    def test_small_sources_are_not_upscaled(self):
+        item = self.make_item(self.photo(200, 100))
+        self.assertEqual(generate_variants(item.image)['jpeg'], {'200': mock.ANY})
+
+    def test_identical_uploads_share_files(self):
+        first = self.make_item(self.photo(700, 700, name='a.png'), sku='A1')
+        second = self.make_item(self.photo(700, 700, name='b.png'), sku='A2')
+
+        self.assertEqual(generate_variants(first.image)['webp'], generate_variants(second.image)['webp'])
+
+    def test_ensure_regenerates_only_stale_variants(self):
+        item = self.make_item(self.photo(800, 600))
+
+        self.assertTrue(ensure_menu_item_variants(item))
+        self.assertEqual(MenuItem.objects.get(pk=item.pk).image_variants, item.image_variants)
+        self.assertFalse(ensure_menu_item_variants(item))
+
+        item.image = self.photo(900, 600, name='new.png')
+        self.assertTrue(variants_are_stale(item))
+
+    def test_placeholder_image_has_no_variants(self):
+        item = MenuItem.objects.create(category=self.category, name='Tea', sku='TEA001', price=Decimal('1'))
+        self.assertFalse(ensure_menu_item_variants(item))
+        self.assertEqual(item.image_variants, {})
+
+    def test_menu_page_serves_srcset(self):
+        item = self.make_item(self.photo(1200, 800))
+        ensure_menu_item_variants(item)
+
+        response = self.client.get('/menu/')
+
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, f'{settings.MEDIA_URL}{item.image_variants["webp"]["320"]} 320w')
+        self.assertContains(response, f'src="{settings.MEDIA_URL}{item.image_variants["jpeg"]["320"]}"')
+
+
+# Replica aliases cannot see rows written inside the test; read the primary
+@override_settings(READ_REPLICAS=[])
+class BackgroundTaskQueueTests(TransactionTestCase):
+    """
+    The DB-backed task queue. TransactionTestCase because the worker runs
+    tasks on pool threads with their own connections and closes stale ones.
+    """
+    # The daily report task reads every branch database
+    databases = {'default', *settings.BRANCH_DATABASES.values()}
+
+    def setUp(self):
+        self.calls = []
+        self.outcomes = []
+
+        def flaky(**payload):
+            self.calls.append(payload)
+            if self.outcomes and self.outcomes.pop(0):
+                raise RuntimeError('boom')
+
+        registry = mock.patch.dict(tasks._registry, {'flaky': (flaky, 3)})
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def make_task(self, **fields):
+        fields = {'name': 'flaky', 'payload': {'n': 1}, 'max_attempts': 3, 'run_after': timezone.now(), **fields}
+        return BackgroundTask.objects.create(**fields)
+
+    def test_enqueue_waits_for_the_commit(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            tasks.enqueue('flaky', n=1)
+            raise RuntimeError
+        self.assertFalse(BackgroundTask.objects.exists())
+
+        with transaction.atomic():
+            tasks.enqueue('flaky', n=2)
+            self.assertFalse(BackgroundTask.objects.exists())
+        task = BackgroundTask.objects.get()
+        self.assertEqual((task.name, task.payload, task.max_attempts), ('flaky', {'n': 2}, 3))
+
+        with self.assertRaises(KeyError):
+            tasks.enqueue('missing')
+
+    def test_claim_takes_due_pending_tasks_once(self):
+        due = self.make_task()
+        self.make_task(run_after=timezone.now() + timedelta(minutes=5))
+        self.make_task(status=BackgroundTask.Status.SUCCEEDED)
+
+        claimed = tasks.claim_due_tasks(10)
+
+        self.assertEqual([task.pk for task in claimed], [due.pk])
+        self.assertEqual((claimed[0].status, claimed[0].attempts), (BackgroundTask.Status.RUNNING, 1))
+        self.assertEqual(tasks.claim_due_tasks(10), [])
+
+    def test_failures_back_off_until_max_attempts(self):
+        self.assertEqual([tasks.retry_delay(n).seconds for n in (1, 2, 3)], [10, 20, 40])
+        self.assertEqual(tasks.retry_delay(20).seconds, tasks.RETRY_MAX_DELAY)
+
+        self.outcomes = [True, True, True]
+        task = self.make_task()
+        for attempt in (1, 2):
+            claimed = tasks.claim_due_tasks(1)[0]
+            self.assertFalse(tasks.run_task(claimed))
+            task.refresh_from_db()
+            self.assertEqual(task.status, BackgroundTask.Status.PENDING)
+            self.assertAlmostEqual(
+                (task.run_after - timezone.now()).total_seconds(), tasks.retry_delay(attempt).seconds, delta=2
+            )
+            self.assertIn('RuntimeError: boom', task.last_error)
+            BackgroundTask.objects.filter(pk=task.pk).update(run_after=timezone.now())
+
+        self.assertFalse(tasks.run_task(tasks.claim_due_tasks(1)[0]))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (BackgroundTask.Status.FAILED, 3))
+
+    def test_stale_and_finished_tasks(self):
+        long_ago = timezone.now() - timedelta(days=30)
+        stale = self.make_task(status=BackgroundTask.Status.RUNNING, locked_at=long_ago)
+        old_done = self.make_task(status=BackgroundTask.Status.SUCCEEDED)
+        old_failed = self.make_task(status=BackgroundTask.Status.FAILED)
+        recent_done = self.make_task(status=BackgroundTask.Status.SUCCEEDED)
+        BackgroundTask.objects.filter(pk__in=[old_done.pk, old_failed.pk]).update(updated_at=long_ago)
+
+        self.assertEqual(tasks.requeue_stale_tasks(600), 1)
+        self.assertEqual(BackgroundTask.objects.get(pk=stale.pk).status, BackgroundTask.Status.PENDING)
+
+        self.assertEqual(tasks.prune_finished_tasks(7 * 86400), 2)
+        self.assertEqual(set(BackgroundTask.objects.values_list('pk', flat=True)), {stale.pk, recent_done.pk})
+
+    def test_worker_drains_the_queue(self):
+        self.outcomes = [False, True]
+        self.make_task()
+        self.make_task()
+        out, err = StringIO(), StringIO()
+
+        call_command('run_task_worker', once=True, workers=2, stdout=out, stderr=err)
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertIn('Ran 2 tasks: 1 succeeded, 1 failed', out.getvalue())
+        self.assertIn('failed (attempt 1)', err.getvalue())
+        self.assertEqual(
+            sorted(BackgroundTask.objects.values_list('status', flat=True)),
+            [BackgroundTask.Status.PENDING, BackgroundTask.Status.SUCCEEDED],
+        )
+
+    def test_password_reset_queues_no_token(self):
+        user = User.objects.create_user(email='jane@example.com', password='pass')
+
+        response = self.client.post('/password_reset/', {'email': 'jane@example.com'})
+
+        self.assertRedirects(response, '/password_reset/done/', fetch_redirect_response=False)
+        self.assertEqual(mail.outbox, [])
+        task = BackgroundTask.objects.get()
+        self.assertEqual(task.name, 'send_password_reset_email')
+        self.assertEqual(task.payload['user_id'], user.pk)
+        self.assertNotIn('token', task.payload)
+        self.assertNotIn('reset/', str(task.payload))
+
+        call_command('run_task_worker', once=True, workers=1, stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['jane@example.com'])
+        uidb64, token = re.search(r'/reset/([^/]+)/([^/]+)/', mail.outbox[0].body).groups()
+        self.assertEqual(uidb64, urlsafe_base64_encode(force_bytes(user.pk)))
+        self.assertTrue(default_token_generator.check_token(user, token))
+
+    def test_daily_report_is_emailed_by_the_worker(self):
+        out = StringIO()
+        call_command('generate_daily_report', date='2026-01-05', email=['boss@example.com'], stdout=out)
+
+        self.assertIn('Queued daily report for 2026-01-05', out.getvalue())
+        self.assertEqual(BackgroundTask.objects.get().payload['day'], '2026-01-05')
+
+        call_command('run_task_worker', once=True, workers=1, stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Daily report for 2026-01-05')
+        self.assertIn('Orders: 0', mail.outbox[0].body)
+
+
+class MapMenuImagesTests(TestCase):
+    """map_menu_images pairs items and photos by meaningful filename words."""
+
+    FILES = [
+        'tea-with-milk.jpg',
+        'pilau-rice-recipe.jpg',
+        'ice-cream.webp',
+        'grilled_salmon_8f3a9c2b7d6e5f4a3b2c.png',
+        'readme.txt',
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        category = MenuCategory.objects.create(name='Mains')
+        cls.items = {
+            name: MenuItem.objects.create(category=category, name=name, sku=f'SKU{n}', price=Decimal('1'))
+            for n, name in enumerate(['Beef Pilau', 'Masala Tea', 'Icecream Sundae', 'Fish Fillet', 'Beans with Chapati'])
+        }
+
+    def setUp(self):
+        self.media_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_dir, ignore_errors=True)
+        for filename in self.FILES:
+            open(os.path.join(self.media_dir, filename), 'wb').close()
+
+    def images(self):
+        return dict(MenuItem.objects.values_list('name', 'image'))
+
+    def test_stopwords_do_not_count_as_matches(self):
+        self.assertEqual(map_menu_images.tokenize('Rice with Beans and Recipe'), {'rice', 'beans', 'ricebeans'})
+        self.assertEqual(map_menu_images.tokenize('tea-with-milk'), {'tea', 'milk', 'teamilk'})
+
+    def test_items_are_matched_to_photos(self):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('map_menu_images', dir=self.media_dir, stdout=out)
+
+        images = self.images()
+        self.assertEqual(images['Beef Pilau'], 'menu_items/pilau-rice-recipe.jpg')
+        self.assertEqual(images['Masala Tea'], 'menu_items/tea-with-milk.jpg')
+        self.assertEqual(images['Icecream Sundae'], 'menu_items/ice-cream.webp')
+        self.assertEqual(images['Fish Fillet'], 'menu_items/grilled_salmon_8f3a9c2b7d6e5f4a3b2c.png')
+        # Shares only "with" with the tea photo
+        self.assertEqual(images['Beans with Chapati'], 'menu_items/default_food.jpg')
+        self.assertIn('No matching image found for: Beans with Chapati', out.getvalue())
+        self.assertIn('Updated 4 menu items', out.getvalue())
+        self.assertEqual(BackgroundTask.objects.filter(name='generate_menu_image_variants').count(), 4)
+
+    def test_dry_run_writes_nothing(self):
+        before = self.images()
+        out = StringIO()
+        call_command('map_menu_images', dir=self.media_dir, dry_run=True, stdout=out)
+
+        self.assertIn('Would update 4 menu items', out.getvalue())
+        self.assertEqual(self.images(), before)
+
+
+class MenuImportExportTests(TestCase):
+    """menu_export output imports back unchanged; dry runs predict real runs."""
+
+    @classmethod
+    def setUpTestData(cls):
+        mains = MenuCategory.objects.create(name='Mains')
+        drinks = MenuCategory.objects.create(name='Drinks')
+        MenuItem.objects.create(category=mains, name='Pilau, Beef', sku='PIL001', price=Decimal('5.50'),
+                                description='Spiced "Swahili" rice\nwith beef')
+        MenuItem.objects.create(category=mains, name='Ugali', sku='UGA001', price=Decimal('2.00'), is_active=False)
+        MenuItem.objects.create(category=drinks, name='Chai', sku='TEA001', price=Decimal('1.00'))
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+
+    def catalog(self):
+        return set(MenuItem.objects.values_list('sku', 'name', 'category__name', 'price', 'description', 'is_active'))
+
+    def run_import(self, path, **options):
+        out = StringIO()
+        call_command('menu_import', path, stdout=out, **options)
+        return out.getvalue()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp_dir, name)
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            stream.write(text)
+        return path
+
+    def test_round_trip_in_every_format(self):
+        original = self.catalog()
+        for fmt in ('csv', 'jsonl', 'json'):
+            with self.subTest(format=fmt):
+                path = os.path.join(self.tmp_dir, f'menu.{fmt}')
+                call_command('menu_export', path, stdout=StringIO())
+
+                self.assertIn('inserted 0, updated 0, unchanged 3', self.run_import(path))
+
+                MenuItem.objects.update(price=Decimal('9.99'), is_active=True)
+                self.assertIn('inserted 0, updated 3, unchanged 0', self.run_import(path, chunk_size=2))
+                self.assertEqual(self.catalog(), original)
+
+    def test_active_only_export(self):
+        path = os.path.join(self.tmp_dir, 'menu.jsonl')
+        call_command('menu_export', path, active_only=True, stdout=StringIO())
+        with open(path, encoding='utf-8') as stream:
+            self.assertEqual(sorted(json.loads(line)['sku'] for line in stream), ['PIL001', 'TEA001'])
+
+    def test_dry_run_matches_the_real_run(self):
+        path = self.write('menu.csv', (
+            'sku,name,category,price,description,is_active\n'
+            'TEA001,Chai,Drinks,1.00,,true\n'
+            'UGA001,Ugali,Sides,2.00,,false\n'
+            'CHP001,Chapati,Sides,0.50,,true\n'
+        ))
+        before = self.catalog()
+
+        dry = self.run_import(path, dry_run=True)
+        self.assertIn('would have inserted 1, updated 1, unchanged 1', dry)
+        self.assertEqual(self.catalog(), before)
+        self.assertFalse(MenuCategory.objects.filter(name='Sides').exists())
+
+        self.assertIn('inserted 1, updated 1, unchanged 1', self.run_import(path))
+        self.assertEqual(
+            set(MenuItem.objects.filter(category__name='Sides').values_list('sku', flat=True)), {'UGA001', 'CHP001'}
+        )
+
+    def test_invalid_records_are_rejected(self):
+        path = self.write('menu.jsonl', '{"sku": "X1", "name": "X", "category": "Mains", "price": "abc"}\n')
+        with self.assertRaisesMessage(CommandError, 'Record 1: invalid price "abc"'):
+            self.run_import(path)
+
+
+class SQLitePragmaTests(SimpleTestCase):
+    """New SQLite connections run the configured PRAGMAs."""
+
+    def open_connection(self, **options):
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir, ignore_errors=True)
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': os.path.join(tmp_dir, 'pragmas.sqlite3'),
+            'OPTIONS': options,
+        }
+        wrapper = SQLiteDatabaseWrapper(settings_dict, alias='pragma_test')
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS=PRODUCTION_PRAGMAS)
+    def test_production_profile_is_applied(self):
+        wrapper = self.open_connection(timeout=20)
+
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64000)
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)  # MEMORY
+        # The lock wait is the OPTIONS timeout, not overridden by a PRAGMA
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 20000)
+
+    @override_settings(SQLITE_PRAGMAS=None)
+    def test_defaults_without_the_setting(self):
+        wrapper = self.open_connection()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
+
+    def test_unsupported_pragmas_and_values_are_rejected(self):
+        with self.assertRaisesMessage(ValueError, "Unsupported SQLite PRAGMA 'busy_timeout'"):
+            pragma_statements({'busy_timeout': 5000})
+        with self.assertRaisesMessage(ValueError, "Unsupported SQLite PRAGMA 'foreign_keys'"):
+            pragma_statements({'foreign_keys': 'OFF'})
+        with self.assertRaisesMessage(ValueError, 'Invalid value'):
+            pragma_statements({'journal_mode': 'WAL; DROP TABLE x'})
+
+
+class StubSession(dict):
+    """Dict session that looks like one the client already holds"""
+    session_key = 'existing'
+
+
+@override_settings(READ_REPLICAS=['replica1', 'replica2'])
+class ReadReplicaRouterTests(SimpleTestCase):
+    """Reads opt in to replicas; writes and sticky sessions stay on the primary."""
+
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+
+    def test_reads_use_primary_by_default(self):
+        self.assertIsNone(self.router.db_for_read(Order))
+
+    def test_read_replica_block_routes_reads_to_a_replica(self):
+        with read_replica():
+            self.assertIn(self.router.db_for_read(Order), ['replica1', 'replica2'])
+        self.assertIsNone(self.router.db_for_read(Order))
+
+    def test_writes_always_use_primary(self):
+        with read_replica():
+            self.assertEqual(self.router.db_for_write(Order), 'default')
+
+    def test_pinned_session_reads_primary_inside_replica_block(self):
+        with pin_to_primary(), read_replica():
+            self.assertIsNone(self.router.db_for_read(Order))
+
+    def test_one_replica_per_request(self):
+        routed = []
+
+        def view(request):
+            with read_replica():
+                routed.append({self.router.db_for_read(model) for model in (Order, MenuItem, Customer)})
+            with read_replica():
+                routed[-1].add(self.router.db_for_read(Order))
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        with mock.patch('restaurant.db_router.random.choice', side_effect=['replica1', 'replica2']) as choice:
+            for _ in range(2):
+                request = RequestFactory().get('/')
+                request.session = StubSession()
+                middleware(request)
+
+        self.assertEqual(routed, [{'replica1'}, {'replica2'}])
+        self.assertEqual(choice.call_count, 2)
+
+    def test_database_cache_reads_stay_on_primary(self):
+        cache_model = DatabaseCache('restaurant_cache', {}).cache_model_class
+        with read_replica():
+            self.assertIsNone(self.router.db_for_read(cache_model))
+
+    def test_no_migrations_on_replicas(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'restaurant'))
+        self.assertIsNone(self.router.allow_migrate('default', 'restaurant'))
+
+    @override_settings(READ_REPLICAS=[])
+    def test_without_replicas_everything_uses_primary(self):
+        with read_replica():
+            self.assertIsNone(self.router.db_for_read(Order))
+
+    def test_session_reads_its_own_writes_after_post(self):
+        routed = []
+
+        def view(request):
+            with read_replica():
+                routed.append(self.router.db_for_read(Order))
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        factory = RequestFactory()
+        session = StubSession()
+
+        for method in ('get', 'post', 'get'):
+            request = getattr(factory, method)('/')
+            request.session = session
+            middleware(request)
+
+        self.assertIn(routed[0], ['replica1', 'replica2'])
+        self.assertEqual(routed[1:], [None, None])
+        self.assertIn(STICKY_SESSION_KEY, session)
+
+    def test_sessions_are_never_created_or_touched_without_need(self):
+        middleware = ReplicaStickinessMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().post('/')
+        request.session = SessionBase()
+        middleware(request)
+        self.assertFalse(request.session.modified)
+
+        request = RequestFactory().post('/')
+        request.session = StubSession()
+        with override_settings(READ_REPLICAS=[]):
+            middleware(request)
+        self.assertNotIn(STICKY_SESSION_KEY, request.session)
+
+    @override_settings(REPLICA_STICKINESS_SECONDS=0)
+    def test_stickiness_expires(self):
+        routed = []
+
+        def view(request):
+            with read_replica():
+                routed.append(self.router.db_for_read(Order))
+            return HttpResponse()
+
+        middleware = ReplicaStickinessMiddleware(view)
+        session = StubSession()
+        for method in ('post', 'get'):
+            request = getattr(RequestFactory(), method)('/')
+            request.session = session
+            middleware(request)
+
+        self.assertIn(routed[1], ['replica1', 'replica2'])
+
+
+@override_settings(READ_REPLICAS=['test_replica'])
+class ReadReplicaDatabaseTests(TransactionTestCase):
+    """
+    End-to-end routing against the replica aliases. They mirror the test
+    database, so the write must be committed before a replica can read it.
+    """
+    databases = '__all__'
+
+    def test_replica_reads_are_served_from_a_replica_alias(self):
+        MenuCategory.objects.create(name='Drinks')
+
+        with read_replica():
+            category = MenuCategory.objects.get(name='Drinks')
+        self.assertIn(category._state.db, settings.READ_REPLICAS)
+        self.assertEqual(MenuCategory.objects.get(name='Drinks')._state.db, 'default')
+
+
+@override_settings(BRANCH_DATABASES={'westlands': 'branch_westlands'})
+class BranchRouterTests(SimpleTestCase):
+    """Sharded rows follow their branch; shared data stays on the primary."""
+
+    def setUp(self):
+        self.router = BranchRouter()
+
+    def test_writes_follow_the_instance_branch(self):
+        order = Order(branch='westlands')
+        self.assertEqual(self.router.db_for_write(Order, instance=order), 'branch_westlands')
+        self.assertEqual(self.router.db_for_write(Payment, instance=Payment(branch='main')), 'default')
+
+    def test_order_items_follow_their_order(self):
+        item = OrderItem(order=Order(branch='westlands'))
+        self.assertEqual(self.router.db_for_write(OrderItem, instance=item), 'branch_westlands')
+
+    def test_reads_follow_the_active_branch(self):
+        self.assertIsNone(self.router.db_for_read(Order))
+        with using_branch('westlands'):
+            self.assertEqual(self.router.db_for_read(Order), 'branch_westlands')
+            self.assertEqual(self.router.db_for_read(Table), 'branch_westlands')
+            # Shared data stays in the primary database
+            self.assertIsNone(self.router.db_for_read(Customer))
+            self.assertIsNone(self.router.db_for_read(MenuItem))
+
+    def test_middleware_activates_branch_from_header(self):
+        routed = []
+
+        def view(request):
+            routed.append((request.branch, self.router.db_for_read(Order)))
+            return HttpResponse()
+
+        middleware = BranchMiddleware(view)
+        middleware(RequestFactory().get('/', HTTP_X_RESTAURANT_BRANCH='westlands'))
+        middleware(RequestFactory().get('/', HTTP_X_RESTAURANT_BRANCH='unknown'))
+
+        self.assertEqual(routed, [('westlands', 'branch_westlands'), ('main', None)])
+
+
+class BranchSalesSummaryTests(SimpleTestCase):
+    """Per-branch item sales are merged before the top N is cut."""
+
+    def test_item_outside_every_branch_top_n_can_lead_overall(self):
+        def branch(items):
+            return {
+                'orders_by_status': {}, 'revenue': Decimal('0.00'), 'completed_orders': 0,
+                'payments_by_method': {}, 'items': items,
+            }
+
+        per_branch = {
+            'main': branch([('Stew', 5, Decimal('40.00')), ('Tea', 4, Decimal('8.00'))]),
+            'westlands': branch([('Chips', 5, Decimal('15.00')), ('Tea', 4, Decimal('8.00'))]),
+        }
+        with mock.patch('restaurant.utils.analytics.fan_out', return_value=per_branch):
+            report = branch_sales_summary(timezone.now(), timezone.now(), top=1)
+
+        self.assertEqual(report['top_items'], [('Tea', 8, Decimal('16.00'))])
+
+
+@override_settings(BRANCH_DATABASES={'westlands': 'test_branch'})
+class BranchShardingDatabaseTests(TransactionTestCase):
+    """Orders land in their branch database and reports merge every branch"""
+    databases = '__all__'
+
+    def setUp(self):
+        self.branch = next(iter(settings.BRANCH_DATABASES))
+        self.alias = settings.BRANCH_DATABASES[self.branch]
+        self.user = User.objects.create_user(email='staff@example.com', password='x')
+        self.customer = Customer.objects.create(name='Ann', email='ann@example.com')
+        category = MenuCategory.objects.create(name='Mains')
+        self.menu_item = MenuItem.objects.create(category=category, name='Stew', price=Decimal('8.00'))
+
+    def _place_order(self, branch):
+        with using_branch(branch):
+            table = Table.objects.create(branch=branch, number='1', capacity=4)
+        return OrderManager.create_order_with_validation(
+            self.customer, table.id, [{'item_id': self.menu_item.id, 'quantity': 2}], self.user, branch=branch,
+        )
+
+    def test_orders_are_stored_and_reported_per_branch(self):
+        branch_order = self._place_order(self.branch)
+        main_order = self._place_order('main')
+
+        self.assertEqual(branch_order._state.db, self.alias)
+        self.assertEqual(main_order._state.db, 'default')
+        self.assertEqual(Order.objects.using(self.alias).get().items.get().qty, 2)
+        self.assertFalse(Order.objects.filter(branch=self.branch).exists())
+
+        start = branch_order.created_at - timedelta(minutes=1)
+        report = branch_sales_summary(start, start + timedelta(hours=1))
+        self.assertEqual(report['orders_by_status'], {'PENDING': 2})
+        self.assertEqual(report['top_items'], [('Stew', 4, Decimal('32.00'))])
+        self.assertEqual(report['branches'][self.branch]['orders_by_status'], {'PENDING': 1})
+
+    def test_load_data_for_a_branch_keeps_shared_rows_in_default(self):
+        call_command(
+            'generate_load_data', branch=self.branch, orders=20, customers=3, menu_items=5, tables=2,
+            days=2, seed=1, stdout=StringIO(),
+        )
+
+        self.assertEqual(Order.objects.using(self.alias).filter(branch=self.branch).count(), 20)
+        self.assertFalse(Order.objects.using('default').exists())
+        self.assertFalse(Customer.objects.using(self.alias).exists())
+        self.assertFalse(MenuItem.objects.using(self.alias).exists())
+        completed = Order.objects.using(self.alias).filter(status=Order.Status.COMPLETED).count()
+        self.assertEqual(sum(Customer.objects.values_list('order_count', flat=True)), completed)
+
+    def test_customer_pages_include_every_branch(self):
+        main_order = self._place_order('main')
+        branch_order = self._place_order(self.branch)
+
+        self.assertEqual(
+            [(order.pk, order.branch) for order in customer_order_history(self.customer)],
+            [(branch_order.pk, self.branch), (main_order.pk, 'main')],
+        )
+        recent = build_dashboard(self.customer)['recent_orders']
+        self.assertEqual([order['created_at'] for order in recent], [branch_order.created_at, main_order.created_at])
+        # Ids are numbered per branch database; the reference tells them apart
+        self.assertEqual(
+            [order['reference'] for order in recent],
+            [f'{self.branch.upper()}-{branch_order.pk:06d}', f'MAIN-{main_order.pk:06d}'],
+        )
+
+
+class ArchiveOrdersTests(TestCase):
+    """Old finished orders move to the archive and stay in the history."""
+    # Commands and customer pages read every branch database
+    databases = {'default', *settings.BRANCH_DATABASES.values()}
+
+    @classmethod
+    def setUpTestData(cls):
+        user, cls.customer, table, item = create_order_fixtures()
+
+        cls.old, cls.recent, cls.active = Order.objects.bulk_create([
+            Order(customer=cls.customer, table=table, created_by=user, status=status)
+            for status in (Order.Status.COMPLETED, Order.Status.COMPLETED, Order.Status.PENDING)
+        ])
+        Order.objects.filter(pk__in=[cls.old.pk, cls.active.pk]).update(
+            created_at=timezone.now() - timedelta(days=400)
+        )
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, item_name=item.name, unit_price=item.price, qty=2)
+            for order in (cls.old, cls.recent, cls.active)
+        ])
+        Payment.objects.bulk_create([Payment(order=cls.old, amount=Decimal('10.00'), processed_by=user)])
+
+    def test_archives_only_old_finished_orders(self):
+        call_command('archive_orders', days=180, chunk_size=1, stdout=StringIO())
+
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)), {self.recent.pk, self.active.pk})
+        self.assertFalse(OrderItem.objects.filter(order_id=self.old.pk).exists())
+        self.assertFalse(Payment.objects.exists())
+
+        archived = ArchivedOrder.objects.get()
+        self.assertEqual(archived.pk, self.old.pk)
+        self.assertEqual(archived.table_number, 'T1')
+        self.assertEqual(archived.payments[0]['amount'], '10.00')
+        self.assertEqual(archived.line_items[0]['line_total'], Decimal('10.00'))
+
+    def test_dry_run_changes_nothing(self):
+        out = StringIO()
+        call_command('archive_orders', days=180, dry_run=True, stdout=out)
+
+        self.assertIn('would have archived 1 orders', out.getvalue())
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_history_reads_through_to_the_archive(self):
+        call_command('archive_orders', days=180, stdout=StringIO())
+
+        history = customer_order_history(self.customer)
+        self.assertEqual([order.pk for order in history], [self.recent.pk, self.active.pk, self.old.pk])
+        self.assertIsInstance(history[-1], ArchivedOrder)
+
+
+class ActiveOrderQueryTests(TestCase):
+    """Active-order queries match the partial index conditions."""
+
+    @classmethod
+    def setUpTestData(cls):
+        user, customer, cls.table, _ = create_order_fixtures()
+        Order.objects.bulk_create([
+            Order(customer=customer, table=cls.table, created_by=user, status=status)
+            for status in Order.Status.values
+        ])
+
+    def test_active_excludes_finished_orders(self):
+        statuses = set(Order.objects.active().values_list('status', flat=True))
+        self.assertEqual(statuses, set(Order.ACTIVE_STATUSES))
+
+    def test_active_statuses_are_inlined_for_sqlite_partial_indexes(self):
+        sql = str(Order.objects.active().query)
+        self.assertIn("IN ('PENDING', 'CONFIRMED', 'PREPARING', 'READY', 'SERVED')", sql)
+
+    def test_literal_in_is_only_registered_on_order_status(self):
+        with self.assertRaises(FieldError):
+            Customer.objects.filter(name__literal_in=('Jane Doe',))
+        with self.assertRaises(FieldError):
+            Order.objects.filter(branch__literal_in=('main',))
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite query plan')
+    def test_table_lookup_uses_partial_index(self):
+        plan = OrderManager.get_active_orders_by_table(self.table.id).explain()
+        self.assertIn('restaurant_order_act_tbl_idx', plan)
+
+
+class CustomerStatsTests(TestCase):
+    """Stored customer stats follow order completion and can be rebuilt."""
+    # Commands and customer pages read every branch database
+    databases = {'default', *settings.BRANCH_DATABASES.values()}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.customer, cls.table, cls.pilau = create_order_fixtures()
+        drinks = MenuCategory.objects.create(name='Drinks')
+        cls.soda = MenuItem.objects.create(category=drinks, name='Soda', sku='SOD001', price=Decimal('1.00'))
+
+    def place_order(self, lines):
+        order = Order.objects.create(customer=self.customer, table=self.table, created_by=self.user, status='SERVED')
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, item_name=item.name, unit_price=item.price, qty=qty)
+            for item, qty in lines
+        ])
+        order.recalc_totals()
+        return order
+
+    def complete(self, order):
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderManager.update_order_status(order.id, 'COMPLETED', self.user)
+
+    def test_completion_updates_stats(self):
+        first = self.place_order([(self.pilau, 2), (self.soda, 1)])
+        second = self.place_order([(self.soda, 3)])
+        self.complete(first)
+        self.complete(second)
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.order_count, 2)
+        self.assertEqual(self.customer.lifetime_spend, Decimal('14.00'))
+        self.assertEqual(self.customer.last_order_at, second.created_at)
+        self.assertEqual(
+            [(entry['name'], entry['count']) for entry in self.customer.top_categories],
+            [('Drinks', 4), ('Mains', 2)],
+        )
+        self.assertEqual(CustomerSerializer(self.customer).data['total_spent'], '14.00')
+
+    def test_unfinished_orders_are_not_counted(self):
+        self.place_order([(self.pilau, 1)])
+
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.order_count, 0)
+
+    def test_orders_leaving_completed_are_taken_back_out(self):
+        first = self.place_order([(self.pilau, 2)])
+        second = self.place_order([(self.soda, 3)])
+        self.complete(first)
+        self.complete(second)
+
+        # Completed through another instance; load the stored row before editing
+        second = Order.objects.get(pk=second.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.status = Order.Status.CANCELLED
+            second.save()
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.order_count, self.customer.lifetime_spend), (1, Decimal('10.00')))
+        self.assertEqual(self.customer.last_order_at, first.created_at)
+        self.assertEqual([entry['name'] for entry in self.customer.top_categories], ['Mains'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.get(pk=first.pk).delete()
+        self.customer.refresh_from_db()
+        self.assertEqual(
+            (self.customer.order_count, self.customer.lifetime_spend, self.customer.last_order_at),
+            (0, Decimal('0.00'), None),
+        )
+        self.assertEqual(self.customer.top_categories, [])
+
+    def test_orders_loaded_without_status_still_update_stats(self):
+        order = self.place_order([(self.pilau, 2)])
+        self.complete(order)
+
+        order = Order.objects.only('id', 'notes').get(pk=order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = Order.Status.CANCELLED
+            order.save(update_fields=['status'])
+        self.customer.refresh_from_db()
+        self.assertEqual(self.customer.order_count, 0)
+
+    def test_archiving_keeps_stats(self):
+        order = self.place_order([(self.pilau, 2)])
+        self.complete(order)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=400))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_orders', days=180, stdout=StringIO())
+
+        self.customer.refresh_from_db()
+        self.assertEqual((self.customer.order_count, self.customer.lifetime_spend), (1, Decimal('10.00')))
+
+    def test_generated_load_data_has_stats(self):
+        call_command('generate_load_data', orders=60, customers=5, menu_items=10, days=3, seed=1, stdout=StringIO())
+
+        completed = Order.objects.filter(status=Order.Status.COMPLETED)
+        self.assertEqual(
+            sum(Customer.objects.values_list('order_count', flat=True)), completed.count(),
+        )
+        self.assertEqual(
+            sum(Customer.objects.values_list('lifetime_spend', flat=True)),
+            completed.aggregate(total=Sum('total'))['total'],
+        )
+
+    def test_reconcile_rebuilds_drifted_stats(self):
+        order = self.place_order([(self.pilau, 2)])
+        self.complete(order)
+        expected = Customer.objects.values(
+            'order_count', 'lifetime_spend', 'last_order_at', 'top_categories'
+        ).get(pk=self.customer.pk)
+        Customer.objects.update(order_count=7, lifetime_spend=0, last_order_at=None, top_categories=[])
+
+        out = StringIO()
+        call_command('reconcile_customer_stats', stdout=out)
+
+        self.assertIn('1 out of date', out.getvalue())
+        self.assertEqual(
+            Customer.objects.values('order_count', 'lifetime_spend', 'last_order_at', 'top_categories')
+            .get(pk=self.customer.pk),
+            expected,
+        )
+
+
+class DashboardTests(TestCase):
+    """The dashboard is one query cold, none warm, and refreshes on order events."""
+    # Commands and customer pages read every branch database
+    databases = {'default', *settings.BRANCH_DATABASES.values()}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='jane@example.com', password='pass', first_name='Jane')
+        cls.table = Table.objects.create(number='T1')
+
+    def setUp(self):
+        cache.clear()
+        self.customer, _ = Customer.objects.get_or_create_for_user(self.user)
+
+    def place_order(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Order.objects.create(customer=self.customer, table=self.table, created_by=self.user)
+
+    def test_customer_profile_is_created_once(self):
+        self.assertEqual(self.customer.name, 'Jane')
+        customer, created = Customer.objects.get_or_create_for_user(self.user)
+        self.assertFalse(created)
+        self.assertEqual(customer.pk, self.customer.pk)
+
+    def test_cached_until_next_order(self):
+        self.place_order()
+        with self.assertNumQueries(1):
+            data = get_dashboard(self.customer)
+        with self.assertNumQueries(0):
+            get_dashboard(self.customer)
+        self.assertEqual(len(data['recent_orders']), 1)
+
+        self.place_order()
+        self.assertEqual(len(get_dashboard(self.customer)['recent_orders']), 2)
+
+    def test_reconcile_refreshes_cached_dashboards(self):
+        Customer.objects.filter(pk=self.customer.pk).update(order_count=7)
+        self.customer.refresh_from_db()
+        self.assertEqual(get_dashboard(self.customer)['total_orders'], 7)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_customer_stats', stdout=StringIO())
+
+        self.customer.refresh_from_db()
+        self.assertEqual(get_dashboard(self.customer)['total_orders'], 0)
+
+    def test_view_renders_from_cache(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/dashboard/').status_code, 200)
+
+        response = self.client.get('/dashboard/')
+        self.assertContains(response, 'Completed Orders')
+
+
+class CustomerUserLinkTests(TestCase):
+    """Customers are found through the User link, not by email."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='jane@example.com', password='pass')
+
+    def test_existing_profile_is_adopted_by_email(self):
+        customer = Customer.objects.create(name='Jane Doe', phone='0712345678', email='jane@example.com')
+
+        linked, created = Customer.objects.get_or_create_for_user(self.user)
+
+        self.assertFalse(created)
+        self.assertEqual(linked.pk, customer.pk)
+        self.assertEqual(Customer.objects.get(pk=customer.pk).user, self.user)
+
+    def test_backend_joins_customer(self):
+        customer, _ = Customer.objects.get_or_create_for_user(self.user)
+
+        user = EmailBackend().get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_request_customer(user), customer)
+
+    def test_request_customer_is_none_without_profile(self):
+        user = EmailBackend().get_user(self.user.pk)
+        self.assertIsNone(get_request_customer(user))
+
+        self.client.force_login(self.user)
+        response = self.client.get('/orders/')
+        self.assertRedirects(response, '/menu/', fetch_redirect_response=False)
+
+    def test_migration_backfills_links_by_email(self):
+        other = User.objects.create_user(email='Sam@Example.com', password='pass')
+        jane = Customer.objects.create(name='Jane Doe', phone='0712345678', email='jane@example.com')
+        sam = Customer.objects.create(name='Sam Doe', phone='0712345679', email='sam@example.com')
+        Customer.objects.create(name='Walk In', phone='0712345670', email='walkin@example.com')
+
+        migration = import_module('restaurant.migrations.0010_customer_user')
+        migration.link_customers_to_users(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(
+            dict(Customer.objects.filter(user__isnull=False).values_list('id', 'user_id')),
+            {jane.pk: self.user.pk, sam.pk: other.pk},
+        )
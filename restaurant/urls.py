@@ -1,10 +1,20 @@
-from django.urls import path, include
+from django.urls import path, include, reverse_lazy
 from django.contrib.auth import views as auth_views
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import get_user_model
+from rest_framework.routers import DefaultRouter
 from . import views
+from . import views_api
 from . import views_order_management
+from .forms import QueuedPasswordResetForm
+
+router = DefaultRouter()
+router.register('customers', views_api.CustomerViewSet, basename='customer')
+router.register('menu-items', views_api.MenuItemViewSet, basename='menuitem')
+router.register('tables', views_api.TableViewSet, basename='table')
+router.register('orders', views_api.OrderViewSet, basename='order')
+router.register('order-items', views_api.OrderItemViewSet, basename='orderitem')
 
 # Custom Authentication Form that uses email instead of username
 class EmailAuthenticationForm(AuthenticationForm):
@@ -23,6 +33,7 @@ urlpatterns = [
     # Menu Views
     path('menu/', views.modern_menu, name='menu'),  # Main menu page
     path('menu/legacy/', views.menu_list, name='legacy_menu'),  # Kept for backward compatibility
+    path('api/menu/search/', views.menu_search, name='menu_search'),
     path('dashboard/', views.dashboard, name='dashboard'),
     
     # Cart API Endpoints
@@ -52,9 +63,15 @@ urlpatterns = [
     
     # API Endpoints for AJAX
     path('api/kitchen/queue/', views_order_management.api_kitchen_queue, name='api_kitchen_queue'),
+    path('api/menu/categories/', views_order_management.api_menu_categories, name='api_menu_categories'),
+    path('api/menu/categories/<int:category_id>/items/', views_order_management.api_menu_category_items, name='api_menu_category_items'),
+    path('api/menu/autocomplete/', views_order_management.api_menu_autocomplete, name='api_menu_autocomplete'),
     path('api/orders/<int:order_id>/status/', views_order_management.api_order_status, name='api_order_status'),
     path('api/tables/<int:table_id>/status/', views_order_management.api_table_status, name='api_table_status'),
     
+    # REST API (DRF viewsets)
+    path('api/v1/', include(router.urls)),
+    
     # Authentication URLs
     path('login/', auth_views.LoginView.as_view(
         template_name='restaurant/registration/login.html',
@@ -68,13 +85,16 @@ urlpatterns = [
     path('password_reset/', auth_views.PasswordResetView.as_view(
         template_name='restaurant/registration/password_reset_form.html',
         email_template_name='restaurant/registration/password_reset_email.html',
-        subject_template_name='restaurant/registration/password_reset_subject.txt'
+        subject_template_name='restaurant/registration/password_reset_subject.txt',
+        form_class=QueuedPasswordResetForm,
+        success_url=reverse_lazy('restaurant:password_reset_done')
     ), name='password_reset'),
     path('password_reset/done/', auth_views.PasswordResetDoneView.as_view(
         template_name='restaurant/registration/password_reset_done.html'
     ), name='password_reset_done'),
     path('reset/<uidb64>/<token>/', auth_views.PasswordResetConfirmView.as_view(
-        template_name='restaurant/registration/password_reset_confirm.html'
+        template_name='restaurant/registration/password_reset_confirm.html',
+        success_url=reverse_lazy('restaurant:password_reset_complete')
     ), name='password_reset_confirm'),
     path('reset/done/', auth_views.PasswordResetCompleteView.as_view(
         template_name='restaurant/registration/password_reset_complete.html'
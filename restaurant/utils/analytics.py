@@ -0,0 +1,138 @@
+"""
+Cross-branch reporting
+
+Each branch keeps its orders in its own database (see restaurant.sharding),
+so reports run the same query against every branch in parallel and merge
+the partial results. Primary-database reads still go through read_replica().
+"""
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models import Count, DecimalField, F, Sum
+from django.utils import timezone
+
+from restaurant.db_router import read_replica
+from restaurant.sharding import branch_databases, using_branch
+
+
+def fan_out(func, branches=None, max_workers=None):
+    """
+    Call func(branch) for every branch concurrently.
+
+    Each call runs in its own thread with the branch active and its own
+    database connections, which are closed before the thread is reused.
+
+    Returns:
+        dict: {branch: func(branch)}
+    """
+    branches = list(branches or branch_databases())
+
+    def run(branch):
+        try:
+            with using_branch(branch), read_replica():
+                return func(branch)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(branches)) as executor:
+        return dict(zip(branches, executor.map(run, branches)))
+
+
+def _branch_sales(start, end):
+    from restaurant.models import Order, OrderItem, Payment
+
+    orders = Order.objects.filter(created_at__gte=start, created_at__lt=end)
+    revenue = orders.filter(status=Order.Status.COMPLETED).aggregate(total=Sum('total'), count=Count('id'))
+    return {
+        'orders_by_status': dict(orders.values_list('status').annotate(n=Count('id')).order_by()),
+        'revenue': revenue['total'] or Decimal('0.00'),
+        'completed_orders': revenue['count'],
+        'payments_by_method': dict(
+            Payment.objects.filter(created_at__gte=start, created_at__lt=end, status=Payment.Status.COMPLETED)
+            .values_list('method').annotate(total=Sum('amount')).order_by()
+        ),
+        # Every item sold, not a top-N: an item just outside each branch's
+        # top N can still lead overall, so the cut is made after merging.
+        # The menu bounds the size.
+        'items': list(
+            OrderItem.objects.filter(order__in=orders.exclude(status=Order.Status.CANCELLED))
+            .values_list('item_name')
+            .annotate(
+                quantity=Sum('qty'),
+                sales=Sum(F('unit_price') * F('qty'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+            )
+            .order_by('-quantity')
+        ),
+    }
+
+
+def branch_sales_summary(start, end, branches=None, top=10):
+    """
+    Sales figures for [start, end) across branches.
+
+    Args:
+        start: Inclusive start datetime
+        end: Exclusive end datetime
+        branches: Branch names to include; all configured branches by default
+        top: Number of best-selling items to return
+
+    Returns:
+        dict with the merged 'orders_by_status', 'revenue', 'completed_orders',
+        'payments_by_method' and 'top_items' ((name, quantity, sales) tuples),
+        plus the unmerged per-branch results under 'branches' (with every
+        item sold under 'items')
+    """
+    per_branch = fan_out(lambda branch: _branch_sales(start, end), branches)
+
+    orders_by_status, payments_by_method = Counter(), Counter()
+    quantities, sales = Counter(), Counter()
+    revenue, completed_orders = Decimal('0.00'), 0
+    for result in per_branch.values():
+        orders_by_status.update(result['orders_by_status'])
+        payments_by_method.update(result['payments_by_method'])
+        revenue += result['revenue']
+        completed_orders += result['completed_orders']
+        for name, quantity, item_sales in result['items']:
+            quantities[name] += quantity
+            sales[name] += item_sales
+
+    return {
+        'orders_by_status': dict(orders_by_status),
+        'revenue': revenue,
+        'completed_orders': completed_orders,
+        'payments_by_method': dict(payments_by_method),
+        'top_items': [(name, quantity, sales[name]) for name, quantity in quantities.most_common(top)],
+        'branches': per_branch,
+    }
+
+
+def daily_sales_summary(day, branches=None, top=10):
+    """branch_sales_summary() for one local calendar day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return branch_sales_summary(start, start + timedelta(days=1), branches=branches, top=top)
+
+
+def format_daily_report(day, report):
+    """
+    Render a daily_sales_summary() result as plain-text lines, shared by the
+    generate_daily_report command and the email_daily_report task.
+    """
+    by_status = report['orders_by_status']
+    payments = sorted(report['payments_by_method'].items(), key=lambda row: row[1], reverse=True)
+    top_items = report['top_items']
+
+    lines = [f'Daily report for {day:%Y-%m-%d}', f'Orders: {sum(by_status.values())}']
+    lines += [f'  {status}: {count}' for status, count in sorted(by_status.items())]
+    lines.append(f"Revenue (completed orders): {report['revenue'] or 0}")
+    if len(report['branches']) > 1:
+        lines += [f"  {branch}: {result['revenue']}" for branch, result in sorted(report['branches'].items())]
+    if report['completed_orders']:
+        lines.append(f"Average order value: {report['revenue'] / report['completed_orders']:.2f}")
+    lines.append('Payments by method:')
+    lines += [f'  {method}: {total}' for method, total in payments]
+    lines.append(f'Top {len(top_items)} items:')
+    lines += [f'  {name}: {quantity} sold, {sales}' for name, quantity, sales in top_items]
+    return lines
@@ -0,0 +1,72 @@
+"""
+Order archival
+
+Completed and cancelled orders older than a cutoff are moved, with their
+items and payments, from the hot order tables into ArchivedOrder, in the
+same (branch) database. Each chunk is copied and deleted in one
+transaction, so an order is always in exactly one of the two places.
+"""
+from heapq import merge
+from operator import attrgetter
+
+from django.db import transaction
+from django.db.models import Prefetch
+
+from restaurant.sharding import each_branch
+from restaurant.utils.customer_stats import customer_stats_batch
+
+ARCHIVABLE_STATUSES = ('COMPLETED', 'CANCELLED')
+
+
+def archivable_orders(cutoff, using='default'):
+    """Finished orders created before `cutoff`"""
+    from restaurant.models import Order
+
+    return Order.objects.using(using).filter(status__in=ARCHIVABLE_STATUSES, created_at__lt=cutoff)
+
+
+def archive_chunk(cutoff, chunk_size, using='default'):
+    """
+    Archive up to `chunk_size` of the oldest archivable orders.
+
+    Returns:
+        int: Number of orders archived (0 when nothing is left)
+    """
+    from restaurant.models import ArchivedOrder, Order
+
+    # Archived orders still count; one stats refresh per customer, not per order
+    with transaction.atomic(using=using), customer_stats_batch(using):
+        ids = list(
+            archivable_orders(cutoff, using).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return 0
+        orders = (
+            Order.objects.using(using).filter(id__in=ids)
+            .select_related('table').prefetch_related('items', 'payments')
+        )
+        ArchivedOrder.objects.using(using).bulk_create([ArchivedOrder.from_order(order) for order in orders])
+        # Items and payments go with their orders through the cascade
+        Order.objects.using(using).filter(id__in=ids).delete()
+    return len(ids)
+
+
+def customer_order_history(customer):
+    """
+    A customer's live and archived orders from every branch, newest first.
+
+    Live orders come with their items and tables prefetched; archived
+    orders expose the same line_items/status/total attributes.
+    """
+    from restaurant.models import ArchivedOrder, Order, OrderItem
+
+    def branch_history(branch):
+        live = (
+            Order.objects.filter(customer=customer).select_related('table')
+            .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('item')))
+            .order_by('-created_at')
+        )
+        archived = ArchivedOrder.objects.filter(customer=customer).order_by('-created_at')
+        return list(merge(live, archived, key=attrgetter('created_at'), reverse=True))
+
+    return list(merge(*each_branch(branch_history).values(), key=attrgetter('created_at'), reverse=True))
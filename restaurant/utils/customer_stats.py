@@ -0,0 +1,160 @@
+"""
+Denormalized customer statistics
+
+Customer.order_count, lifetime_spend, last_order_at and top_categories
+summarize the customer's COMPLETED orders so dashboards and the API read
+them without aggregating. Whenever a save or delete changes which orders
+count (see restaurant.signals), the affected customers are recomputed
+from their own orders once the transaction commits; reconcile_customer_stats
+rebuilds every customer from the order and archive tables of every
+branch database.
+"""
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from restaurant.utils.dashboard import invalidate_dashboard
+
+COMPLETED = 'COMPLETED'
+STAT_FIELDS = ['order_count', 'lifetime_spend', 'last_order_at', 'top_categories']
+EMPTY_STATS = {'order_count': 0, 'lifetime_spend': Decimal('0.00'), 'last_order_at': None, 'top_categories': []}
+
+_local = threading.local()
+
+
+def _ranked_categories(counts, names):
+    """[{id, name, count}] most ordered first"""
+    return [
+        {'id': category_id, 'name': names.get(category_id, ''), 'count': count}
+        for category_id, count in sorted(counts.items(), key=lambda pair: (-pair[1], pair[0]))
+    ]
+
+
+def _menu_categories(item_ids):
+    """{menu item id: (category id, category name)} from the shared menu"""
+    from restaurant.models import MenuItem
+
+    return {
+        item_id: (category_id, name)
+        for item_id, category_id, name in MenuItem.objects.filter(id__in=item_ids)
+        .values_list('id', 'category_id', 'category__name').iterator()
+    }
+
+
+def refresh_customer_stats(customer_ids):
+    """Recompute and store the stats of the given customers from every branch database"""
+    from restaurant.models import Customer
+    from restaurant.sharding import branch_databases
+
+    customer_ids = sorted(set(customer_ids))
+    computed = compute_customer_stats(sorted(set(branch_databases().values())), customer_ids)
+    customers = [Customer(pk=pk, **computed.get(pk, EMPTY_STATS)) for pk in customer_ids]
+    with transaction.atomic():
+        Customer.objects.bulk_update(customers, STAT_FIELDS, batch_size=1000)
+        for pk in customer_ids:
+            invalidate_dashboard(pk)
+
+
+def schedule_stats_refresh(customer_ids, using=None):
+    """
+    Refresh the customers' stats once the current transaction on `using`
+    commits, so a rolled back change is never counted. Inside a
+    customer_stats_batch() the customers are collected instead.
+    """
+    customer_ids = set(filter(None, customer_ids))
+    if not customer_ids:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.update(customer_ids)
+        return
+    transaction.on_commit(lambda: refresh_customer_stats(customer_ids), using=using)
+
+
+@contextmanager
+def customer_stats_batch(using=None):
+    """
+    Coalesce stats refreshes for bulk order changes: every customer touched
+    inside the block is recomputed once, after the transaction on `using`
+    commits. Nested blocks join the outer one.
+    """
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+
+    _local.pending = set()
+    try:
+        yield
+        pending = _local.pending
+    finally:
+        _local.pending = None
+
+    if pending:
+        transaction.on_commit(lambda: refresh_customer_stats(pending), using=using)
+
+
+def compute_customer_stats(databases, customer_ids=None):
+    """
+    Aggregate completed orders per customer across the given databases,
+    for every customer or only those in `customer_ids`.
+
+    Returns:
+        dict: {customer id: {'order_count', 'lifetime_spend', 'last_order_at', 'top_categories'}}
+    """
+    from restaurant.models import ArchivedOrder, Order, OrderItem
+
+    totals = defaultdict(lambda: {'order_count': 0, 'lifetime_spend': Decimal('0.00'), 'last_order_at': None})
+    item_quantities = defaultdict(Counter)
+
+    def add(customer_id, count, spend, last):
+        stats = totals[customer_id]
+        stats['order_count'] += count
+        stats['lifetime_spend'] += spend or Decimal('0.00')
+        stats['last_order_at'] = max(filter(None, [stats['last_order_at'], last]))
+
+    def for_customers(queryset, customer_field='customer_id'):
+        if customer_ids is None:
+            return queryset
+        return queryset.filter(**{f'{customer_field}__in': customer_ids})
+
+    for using in databases:
+        for model in (Order, ArchivedOrder):
+            rows = (
+                for_customers(model.objects.using(using).filter(status=COMPLETED, customer__isnull=False))
+                .values_list('customer_id')
+                .annotate(count=Count('id'), spend=Sum('total'), last=Max('created_at'))
+                .order_by()
+            )
+            for customer_id, count, spend, last in rows.iterator():
+                add(customer_id, count, spend, last)
+
+        rows = (
+            for_customers(
+                OrderItem.objects.using(using).filter(order__status=COMPLETED, item__isnull=False),
+                'order__customer_id',
+            )
+            .values_list('order__customer_id', 'item_id').annotate(qty=Sum('qty')).order_by()
+        )
+        for customer_id, item_id, qty in rows.iterator():
+            item_quantities[customer_id][item_id] += qty
+        archived = for_customers(
+            ArchivedOrder.objects.using(using).filter(status=COMPLETED, customer__isnull=False)
+        ).values_list('customer_id', 'items')
+        for customer_id, items in archived.iterator():
+            for line in items:
+                if line.get('item_id'):
+                    item_quantities[customer_id][line['item_id']] += line['qty']
+
+    categories = _menu_categories({item_id for counter in item_quantities.values() for item_id in counter})
+    for customer_id, stats in totals.items():
+        counts, names = Counter(), {}
+        for item_id, qty in item_quantities[customer_id].items():
+            if item_id in categories:
+                category_id, names[category_id] = categories[item_id]
+                counts[category_id] += qty
+        stats['top_categories'] = _ranked_categories(counts, names)
+    return dict(totals)
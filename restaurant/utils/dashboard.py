@@ -0,0 +1,78 @@
+"""
+Customer dashboard data
+
+The dashboard is the landing page after every login, so its widgets are
+built once and cached per customer until the customer's next order
+event (see restaurant.signals). A cold build costs a single query per
+branch database: the order statistics are stored on the customer
+(utils.customer_stats) and the recent orders, which may come from any
+branch, are fetched with their item counts annotated.
+"""
+from heapq import merge
+from itertools import islice
+from operator import attrgetter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from restaurant.sharding import each_branch
+
+CACHE_KEY = 'restaurant:dashboard:customer:{}'
+CACHE_TIMEOUT = 60 * 60  # safety net; order events invalidate sooner
+RECENT_ORDERS = 5
+FAVORITE_CATEGORIES = 3
+
+
+def _cache_key(customer_id):
+    return CACHE_KEY.format(customer_id)
+
+
+def build_dashboard(customer):
+    """Dashboard widgets for a customer, uncached"""
+    from restaurant.models import Order
+
+    def branch_recent(branch):
+        return list(
+            Order.objects.filter(customer=customer)
+            .annotate(item_count=Count('items'))
+            .order_by('-created_at')[:RECENT_ORDERS]
+        )
+
+    recent_orders = islice(
+        merge(*each_branch(branch_recent).values(), key=attrgetter('created_at'), reverse=True),
+        RECENT_ORDERS,
+    )
+    return {
+        'recent_orders': [
+            {
+                'id': order.id,
+                'branch': order.branch,
+                'reference': order.reference,
+                'created_at': order.created_at,
+                'item_count': order.item_count,
+                'total': order.total,
+                'status': order.status,
+                'status_display': order.get_status_display(),
+            }
+            for order in recent_orders
+        ],
+        'total_orders': customer.order_count,
+        'total_spent': customer.lifetime_spend,
+        'favorite_categories': customer.top_categories[:FAVORITE_CATEGORIES],
+    }
+
+
+def get_dashboard(customer):
+    """Cached dashboard widgets for a customer"""
+    key = _cache_key(customer.pk)
+    data = cache.get(key)
+    if data is None:
+        data = build_dashboard(customer)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_dashboard(customer_id, using=None):
+    """Drop a customer's cached dashboard once the current transaction commits"""
+    transaction.on_commit(lambda: cache.delete(_cache_key(customer_id)), using=using)
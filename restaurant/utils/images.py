@@ -0,0 +1,124 @@
+"""
+Responsive image derivatives for menu item photos
+"""
+import hashlib
+import io
+import logging
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1024)
+VARIANT_DIR = 'menu_items/variants'
+
+# format name -> (Pillow format, file extension, save options)
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+def _content_digest(field_file):
+    digest = hashlib.sha256()
+    with field_file.open('rb') as source:
+        for chunk in iter(lambda: source.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _flatten(image):
+    """JPEG has no alpha channel; composite transparent images onto white"""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def generate_variants(field_file, widths=VARIANT_WIDTHS):
+    """
+    Write resized WebP and JPEG copies of an image file.
+
+    Variant names are derived from a hash of the source bytes, so identical
+    uploads share files and a changed photo never reuses a cached URL.
+    Widths larger than the source are skipped (the source width is used
+    instead when every requested width is larger).
+
+    Args:
+        field_file: FieldFile of the source image
+        widths: Target widths in pixels
+
+    Returns:
+        dict: {'source': name, 'webp': {width: name}, 'jpeg': {width: name}}
+    """
+    storage = field_file.storage
+    digest = _content_digest(field_file)
+
+    with field_file.open('rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+
+    targets = sorted({w for w in widths if w <= original.width} or {original.width})
+    variants = {'source': field_file.name}
+
+    for key, (pil_format, extension, options) in VARIANT_FORMATS.items():
+        variants[key] = {}
+        for width in targets:
+            name = f'{VARIANT_DIR}/{digest}-{width}w.{extension}'
+            if not storage.exists(name):
+                height = max(round(original.height * width / original.width), 1)
+                resized = original.resize((width, height), Image.LANCZOS)
+                if pil_format == 'JPEG':
+                    resized = _flatten(resized)
+                elif resized.mode not in ('RGB', 'RGBA'):
+                    resized = resized.convert('RGBA')
+                buffer = io.BytesIO()
+                resized.save(buffer, format=pil_format, **options)
+                name = storage.save(name, ContentFile(buffer.getvalue()))
+            variants[key][str(width)] = name
+
+    return variants
+
+
+def variants_are_stale(item):
+    """Whether the stored variants do not match the item's current photo"""
+    from restaurant.models import MenuItem
+
+    image_name = item.image.name if item.image else ''
+    if not image_name or image_name == MenuItem._meta.get_field('image').default:
+        return bool(item.image_variants)
+    return (item.image_variants or {}).get('source') != image_name
+
+
+def ensure_menu_item_variants(item, force=False):
+    """
+    Generate derivatives for a menu item's current photo if they are missing
+    or belong to a previous upload. The shared placeholder image is skipped.
+
+    Returns:
+        bool: True if the item's variants were (re)generated
+    """
+    from restaurant.models import MenuItem
+
+    image_name = item.image.name if item.image else ''
+    default_name = MenuItem._meta.get_field('image').default
+    if not image_name or image_name == default_name:
+        variants = {}
+    elif not force and not variants_are_stale(item):
+        return False
+    else:
+        try:
+            variants = generate_variants(item.image)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not generate image variants for {item.sku} ({image_name}): {e}")
+            return False
+
+    if variants == (item.image_variants or {}):
+        return False
+    item.image_variants = variants
+    # update() rather than save(): no signals, no updated_at bump
+    MenuItem.objects.filter(pk=item.pk).update(image_variants=variants)
+    return True
@@ -0,0 +1,80 @@
+"""
+Streaming readers/writers for menu catalog files (CSV, JSON Lines, JSON)
+"""
+import csv
+import json
+import os
+
+MENU_FIELDS = ('sku', 'name', 'category', 'price', 'description', 'is_active')
+FORMATS = ('csv', 'jsonl', 'json')
+
+_TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def detect_format(path, fmt=None):
+    """Use the explicit format, else infer it from the file extension"""
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in ('jsonl', 'ndjson'):
+        return 'jsonl'
+    if extension in FORMATS:
+        return extension
+    raise ValueError(f'Cannot infer the format of "{path}"; pass --format')
+
+
+def parse_bool(value, default=True):
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in _TRUE_VALUES
+
+
+def read_records(stream, fmt):
+    """
+    Yield (line_number, dict) for each record in the stream.
+
+    CSV and JSON Lines are read incrementally; a JSON document must be an
+    array and is parsed whole, so prefer JSON Lines for large catalogs.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                yield line_number, json.loads(line)
+    elif fmt == 'json':
+        data = json.load(stream)
+        if not isinstance(data, list):
+            raise ValueError('A JSON menu file must contain an array of items')
+        for index, record in enumerate(data, start=1):
+            yield index, record
+    else:
+        raise ValueError(f'Unsupported format "{fmt}"')
+
+
+def write_records(stream, records, fmt):
+    """Write an iterable of dicts keyed by MENU_FIELDS without buffering them"""
+    count = 0
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=MENU_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    elif fmt == 'jsonl':
+        for record in records:
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    elif fmt == 'json':
+        stream.write('[')
+        for record in records:
+            stream.write(('\n' if not count else ',\n') + json.dumps(record, ensure_ascii=False))
+            count += 1
+        stream.write('\n]\n')
+    else:
+        raise ValueError(f'Unsupported format "{fmt}"')
+    return count
@@ -3,6 +3,7 @@ Advanced order management utilities for restaurant system
 """
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import DecimalField, F, Sum
 from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from decimal import Decimal
@@ -11,6 +12,8 @@ import logging
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+CENTS = Decimal('0.01')
+
 
 class OrderValidationError(Exception):
     """Custom exception for order validation errors"""
@@ -34,7 +37,7 @@ class OrderManager:
         }
     
     @classmethod
-    def create_order_with_validation(cls, customer, table_id, items_data, created_by, special_notes=""):
+    def create_order_with_validation(cls, customer, table_id, items_data, created_by, special_notes="", branch=None):
         """
         Create an order with comprehensive validation
         
@@ -44,6 +47,7 @@ class OrderManager:
             items_data: List of dicts with 'item_id', 'quantity', 'special_instructions'
             created_by: User who is creating the order
             special_notes: General order notes
+            branch: Branch owning the table; defaults to the active branch
             
         Returns:
             Order instance
@@ -52,9 +56,11 @@ class OrderManager:
             OrderValidationError: If validation fails
         """
         from restaurant.models import Order, Table
+        from restaurant.sharding import branch_database, current_branch, using_branch
         
+        branch = branch or current_branch()
         try:
-            with transaction.atomic():
+            with using_branch(branch), transaction.atomic(using=branch_database(branch)):
                 # Validate and get table
                 table = cls._validate_table(table_id)
                 
@@ -67,6 +73,7 @@ class OrderManager:
                 
                 # Create order
                 order = Order.objects.create(
+                    branch=table.branch,
                     customer=customer,
                     table=table,
                     notes=special_notes,
@@ -257,22 +264,74 @@ class OrderManager:
         # When order is completed or cancelled, check if table should be available
         if new_status in ['COMPLETED', 'CANCELLED']:
             # Check if table has any other active orders
-            active_orders = Order.objects.filter(
-                table=table,
-                status__in=['PENDING', 'CONFIRMED', 'PREPARING', 'READY', 'SERVED']
-            ).exclude(id=order.id)
+            active_orders = Order.objects.active().filter(table=table).exclude(id=order.id)
             
             if not active_orders.exists():
                 table.status = 'VACANT'
                 table.save(update_fields=['status'])
                 logger.info(f"Table {table.number} set to vacant")
     
+    @classmethod
+    def bulk_recalc_totals(cls, orders, batch_size=500, commit=True):
+        """
+        Recalculate subtotal/total for many orders at once
+        
+        Orders are read in pk chunks; each chunk's line sums come from one
+        grouped SUM(unit_price * qty) query and its changed orders are
+        written back with one bulk_update, so memory stays bounded by
+        batch_size however many orders match.
+        
+        Args:
+            orders: Order queryset to recalculate
+            batch_size: Number of orders read and written per chunk
+            commit: If False, only count the orders that would change
+            
+        Returns:
+            Tuple of (orders checked, orders changed)
+        """
+        from restaurant.models import Order, OrderItem
+        
+        checked = changed = 0
+        last_pk = 0
+        chunk_qs = orders.order_by('pk').only('id', 'subtotal', 'discount', 'tax', 'total')
+        while True:
+            chunk = list(chunk_qs.filter(pk__gt=last_pk)[:batch_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            checked += len(chunk)
+            
+            line_sums = dict(
+                OrderItem.objects.using(orders.db).filter(order_id__in=[order.pk for order in chunk])
+                .order_by()
+                .values_list('order_id')
+                .annotate(subtotal=Sum(
+                    F('unit_price') * F('qty'),
+                    output_field=DecimalField(max_digits=12, decimal_places=2)
+                ))
+            )
+            
+            dirty = []
+            for order in chunk:
+                subtotal = (line_sums.get(order.pk) or Decimal('0.00')).quantize(CENTS)
+                total = subtotal - order.discount + order.tax
+                if subtotal != order.subtotal or total != order.total:
+                    order.subtotal = subtotal
+                    order.total = total
+                    dirty.append(order)
+            
+            changed += len(dirty)
+            if dirty and commit:
+                Order.objects.using(orders.db).bulk_update(dirty, ['subtotal', 'total'])
+        
+        return checked, changed
+    
     @classmethod
     def get_kitchen_queue(cls):
         """Get orders for kitchen display"""
         from restaurant.models import Order
         
-        return Order.objects.filter(
+        return Order.objects.active().filter(
             status__in=['CONFIRMED', 'PREPARING']
         ).select_related('customer', 'table', 'created_by').prefetch_related(
             'items__item__category'
@@ -283,7 +342,7 @@ class OrderManager:
         """Get orders ready for serving"""
         from restaurant.models import Order
         
-        return Order.objects.filter(status='READY').select_related(
+        return Order.objects.active().filter(status='READY').select_related(
             'customer', 'table'
         ).order_by('updated_at')
     
@@ -292,7 +351,7 @@ class OrderManager:
         """Get pending orders that need confirmation"""
         from restaurant.models import Order
         
-        return Order.objects.filter(status='PENDING').select_related(
+        return Order.objects.active().filter(status='PENDING').select_related(
             'customer', 'table', 'created_by'
         ).order_by('created_at')
     
@@ -301,9 +360,8 @@ class OrderManager:
         """Get active orders for a specific table"""
         from restaurant.models import Order
         
-        return Order.objects.filter(
-            table_id=table_id,
-            status__in=['PENDING', 'CONFIRMED', 'PREPARING', 'READY', 'SERVED']
+        return Order.objects.active().filter(
+            table_id=table_id
         ).select_related('customer').prefetch_related('items__item')
     
     @classmethod
@@ -357,8 +415,11 @@ class KitchenManager:
     
     @classmethod
     def get_kitchen_display_data(cls):
-        """Get formatted data for kitchen display"""
-        orders = OrderManager.get_kitchen_queue()
+        """Get formatted data for kitchen display (read from a replica when configured)"""
+        from restaurant.db_router import read_replica
+        
+        with read_replica():
+            orders = list(OrderManager.get_kitchen_queue())
         
         kitchen_data = []
         for order in orders:
@@ -384,7 +445,7 @@ class KitchenManager:
                 'created_at': order.created_at,
                 'time_elapsed': timezone.now() - order.created_at,
                 'items_by_category': items_by_category,
-                'total_items': order.items.count(),
+                'total_items': len(order.items.all()),
                 'notes': order.notes
             })
         
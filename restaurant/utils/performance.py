@@ -0,0 +1,7 @@
+"""
+Performance helpers for order processing
+
+The order batching helpers live in Restaurant_Order.batching so the hotel
+app can use them without depending on this app.
+"""
+from Restaurant_Order.batching import mark_order_dirty, order_batch  # noqa: F401
@@ -0,0 +1,56 @@
+"""
+Per-connection SQLite tuning
+
+When settings.SQLITE_PRAGMAS is set, every new SQLite connection runs the
+listed PRAGMAs (see settings_production.py for the production profile).
+Without the setting, connections keep SQLite's defaults. The lock wait is
+configured with OPTIONS['timeout'] on the database, not with a PRAGMA.
+"""
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Only these PRAGMAs may be configured; values are interpolated into SQL.
+# busy_timeout is deliberately absent: the lock wait comes from the
+# database's OPTIONS['timeout'], which the sqlite3 driver already applies as
+# the busy timeout, and a PRAGMA run afterwards would silently override it.
+# foreign_keys is absent too: Django turns it on for every SQLite connection
+# and relies on it for integrity checks.
+ALLOWED_PRAGMAS = {
+    'journal_mode', 'synchronous', 'mmap_size', 'cache_size',
+    'temp_store', 'wal_autocheckpoint', 'journal_size_limit',
+}
+
+# Recommended values for a single-box deployment with concurrent writers
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',          # readers no longer block the writer
+    'synchronous': 'NORMAL',        # durable at checkpoints; safe with WAL
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,           # negative = KiB, i.e. 64 MB page cache
+    'temp_store': 'MEMORY',
+}
+
+
+def pragma_statements(pragmas):
+    """Validate a {name: value} mapping and return the PRAGMA statements"""
+    statements = []
+    for name, value in pragmas.items():
+        if name not in ALLOWED_PRAGMAS:
+            raise ValueError(f"Unsupported SQLite PRAGMA '{name}'")
+        if not isinstance(value, int) and not str(value).isalnum():
+            raise ValueError(f"Invalid value {value!r} for SQLite PRAGMA '{name}'")
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """connection_created receiver applying settings.SQLITE_PRAGMAS"""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for sql in pragma_statements(pragmas):
+            cursor.execute(sql)
+    logger.debug(f"Applied {len(pragmas)} SQLite PRAGMAs to '{connection.alias}'")
@@ -3,15 +3,17 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate
 from django.contrib import messages
 from django.db import models, connection
-from django.db.models import Count, Sum, Prefetch
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from django.http import JsonResponse, HttpResponse
 from django.core.serializers.json import DjangoJSONEncoder
 from decimal import Decimal
 import json
 
 from .models import MenuCategory, MenuItem, Order, OrderItem, Table, Customer
+from .utils.dashboard import get_dashboard
 from .forms import CustomUserCreationForm
+from .search import search_menu_items
+from .db_router import read_replica
 
 def home(request):
     """Homepage view"""
@@ -33,6 +35,7 @@ def menu_list(request):
     """Legacy menu list view - kept for backward compatibility"""
     return redirect('restaurant:menu')
 
+@read_replica()
 def modern_menu(request):
     """Modern menu view with enhanced UI"""
     # Debug: Print all categories and items
@@ -60,67 +63,40 @@ def modern_menu(request):
     cart_data = get_cart_data(cart)
     item_count = cart_data['item_count']
     
-    from django.conf import settings
     context = {
         'categories': categories,
         'cart_item_count': item_count,
         'cart_data': json.dumps(cart_data, cls=DjangoJSONEncoder),
-        'MEDIA_URL': settings.MEDIA_URL
     }
     return render(request, 'restaurant/menu_list_clean.html', context)
 
-@login_required
-def dashboard(request):
-    # Get or create customer for the logged-in user
-    from .models import Customer
-    
+@require_GET
+def menu_search(request):
+    """Ranked, prefix-matching menu search for type-ahead (JSON)"""
     try:
-        customer = Customer.objects.get(email=request.user.email)
-    except Customer.DoesNotExist:
-        # Create a new customer if one doesn't exist
-        # Generate a proper name from user fields
-        user_name = ""
-        if hasattr(request.user, 'first_name') and request.user.first_name:
-            user_name += request.user.first_name
-        if hasattr(request.user, 'last_name') and request.user.last_name:
-            if user_name:
-                user_name += " "
-            user_name += request.user.last_name
-        
-        # Fall back to email or username if no name available
-        if not user_name.strip():
-            user_name = request.user.email.split('@')[0] if request.user.email else request.user.username
-        
-        customer = Customer.objects.create(
-            email=request.user.email,
-            name=user_name,
-            phone=getattr(request.user, 'phone', '') or ''
-        )
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
     
-    # Get recent orders for the customer
-    recent_orders = Order.objects.filter(customer=customer).order_by('-created_at')[:5]
-    
-    # Get order statistics
-    total_orders = Order.objects.filter(customer=customer).count()
-    total_spent = Order.objects.filter(
-        customer=customer, 
-        status=Order.Status.COMPLETED
-    ).aggregate(Sum('total'))['total__sum'] or 0
-    
-    # Get favorite categories
-    favorite_categories = MenuCategory.objects.filter(
-        items__order_items__order__customer=customer
-    ).annotate(
-        order_count=Count('items__order_items')
-    ).order_by('-order_count')[:3] if total_orders > 0 else []
-    
-    context = {
-        'recent_orders': recent_orders,
-        'total_orders': total_orders,
-        'total_spent': total_spent,
-        'favorite_categories': favorite_categories,
-    }
-    return render(request, 'restaurant/dashboard.html', context)
+    items = search_menu_items(request.GET.get('q', ''), limit=limit)
+    return JsonResponse({
+        'results': [
+            {
+                'id': item.id,
+                'name': item.name,
+                'sku': item.sku,
+                'price': str(item.price),
+                'category': item.category.name,
+            }
+            for item in items
+        ]
+    })
+
+@login_required
+def dashboard(request):
+    """Customer landing page; widgets are cached per customer (utils.dashboard)"""
+    customer = request.customer or Customer.objects.get_or_create_for_user(request.user)[0]
+    return render(request, 'restaurant/dashboard.html', get_dashboard(customer))
 
 def get_cart_data(cart):
     """Helper function to get cart data with item details"""
@@ -275,13 +251,7 @@ def checkout(request):
     
     try:
         # Get or create a customer for the current user
-        customer, created = Customer.objects.get_or_create(
-            email=request.user.email,
-            defaults={
-                'name': f"{request.user.first_name} {request.user.last_name}".strip() or request.user.username,
-                'phone': request.user.phone or ''
-            }
-        )
+        customer = request.customer or Customer.objects.get_or_create_for_user(request.user)[0]
         
         # Get the first available table or create a default one if none exists
         table = Table.objects.filter(status='VACANT').first()
@@ -328,24 +298,22 @@ def checkout(request):
         return redirect('restaurant:menu')
 
 @login_required
+@read_replica()
 def order_history(request):
     """Display the user's order history"""
-    from .models import Customer, Order, OrderItem
+    from .utils.archive import customer_order_history
     
-    try:
-        customer = Customer.objects.get(email=request.user.email)
-        orders = Order.objects.filter(customer=customer).select_related('table').prefetch_related(
-            Prefetch('items', queryset=OrderItem.objects.select_related('item'))
-        ).order_by('-created_at')
-        
-        context = {
-            'orders': orders,
-            'active_tab': 'orders'
-        }
-        return render(request, 'restaurant/order_history.html', context)
-    except Customer.DoesNotExist:
+    customer = request.customer
+    if not customer:
         messages.error(request, 'Customer profile not found.')
         return redirect('restaurant:menu')
+    
+    # Read through to archived orders so old history stays visible
+    context = {
+        'orders': customer_order_history(customer),
+        'active_tab': 'orders'
+    }
+    return render(request, 'restaurant/order_history.html', context)
 
 def register(request):
     if request.user.is_authenticated:
@@ -0,0 +1,128 @@
+"""
+REST API views for the restaurant app
+"""
+from rest_framework import permissions, viewsets
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from .models import Customer, MenuItem, Order, OrderItem, Table
+from .serializers import (
+    CustomerSerializer, MenuItemSerializer, OrderItemSerializer,
+    OrderSerializer, TableSerializer,
+)
+
+
+class EagerLoadingMixin:
+    """
+    Apply the serializer's setup_eager_loading() hook to the view queryset.
+
+    Serializers that read related objects declare the select/prefetch they
+    need in a `setup_eager_loading(queryset)` classmethod; any viewset using
+    this mixin applies it automatically, so list endpoints stay at a
+    constant number of queries however many rows they return.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        setup = getattr(serializer_class, 'setup_eager_loading', None)
+        if setup is not None:
+            queryset = setup(queryset)
+        return queryset
+
+    def update(self, request, *args, **kwargs):
+        # DRF drops the instance's prefetch cache after saving, which would
+        # serialize nested rows one query each; re-read the saved row
+        # through the eager-loading queryset instead.
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        instance = self.get_queryset().get(pk=serializer.instance.pk)
+        return Response(self.get_serializer(instance).data)
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Cursor pagination over (created_at, id).
+
+    Pages seek from the last seen created_at via the created_at index
+    instead of counting past OFFSET rows, so deep pages cost the same as
+    the first one on a growing table.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class IsStaffOrReadOnly(permissions.BasePermission):
+    """Allow reads to anyone, writes to staff only."""
+
+    def has_permission(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+class IsStaffOrAuthenticatedReadOnly(permissions.BasePermission):
+    """Allow reads to authenticated users, writes to staff only."""
+
+    def has_permission(self, request, view):
+        if not (request.user and request.user.is_authenticated):
+            return False
+        return request.method in permissions.SAFE_METHODS or request.user.is_staff
+
+
+class CustomerViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+    """Customers; staff only."""
+    queryset = Customer.objects.all()
+    serializer_class = CustomerSerializer
+    pagination_class = CreatedAtCursorPagination
+    permission_classes = [permissions.IsAdminUser]
+
+
+class MenuItemViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+    """Menu items; readable by anyone, managed by staff."""
+    queryset = MenuItem.objects.all()
+    serializer_class = MenuItemSerializer
+    pagination_class = CreatedAtCursorPagination
+    permission_classes = [IsStaffOrReadOnly]
+
+
+class TableViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+    """Tables; readable by anyone, managed by staff."""
+    queryset = Table.objects.all()
+    serializer_class = TableSerializer
+    pagination_class = CreatedAtCursorPagination
+    permission_classes = [IsStaffOrReadOnly]
+
+
+class CustomerScopedMixin:
+    """Limit non-staff users to rows belonging to their own customer profile."""
+    customer_lookup = 'customer__user'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if not user.is_staff:
+            queryset = queryset.filter(**{self.customer_lookup: user})
+        return queryset
+
+
+class OrderViewSet(CustomerScopedMixin, EagerLoadingMixin, viewsets.ModelViewSet):
+    """Orders with nested items; customers see their own, staff manage all."""
+    queryset = Order.objects.all()
+    serializer_class = OrderSerializer
+    pagination_class = CreatedAtCursorPagination
+    permission_classes = [IsStaffOrAuthenticatedReadOnly]
+
+
+class OrderItemViewSet(CustomerScopedMixin, EagerLoadingMixin, viewsets.ModelViewSet):
+    """Individual order lines; customers see their own, staff manage all."""
+    queryset = OrderItem.objects.all()
+    serializer_class = OrderItemSerializer
+    pagination_class = CreatedAtCursorPagination
+    permission_classes = [IsStaffOrAuthenticatedReadOnly]
+    customer_lookup = 'order__customer__user'
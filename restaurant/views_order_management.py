@@ -2,33 +2,42 @@
 Enhanced order management views
 """
 from django.shortcuts import render, redirect, get_object_or_404
+from django.core.paginator import EmptyPage, Paginator
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods, require_POST
+from django.db.models import Count, Max, Q
+from django.views.decorators.http import condition, require_http_methods, require_POST
 from django.views.decorators.csrf import csrf_exempt
 import json
 import logging
 
 from restaurant.models import Order, Table, Customer, MenuItem, MenuCategory
+from restaurant.db_router import read_replica
+from restaurant.search import menu_prefix_index
 from restaurant.utils.order_manager import OrderManager, KitchenManager, OrderValidationError
 
 logger = logging.getLogger(__name__)
 
+MENU_PAGE_SIZE = 50
+MAX_MENU_PAGE_SIZE = 200
+
+
+def _create_order_context():
+    """
+    Context for the order-entry page. Only the tables are rendered
+    server-side; the menu is fetched per category by the page itself.
+    """
+    return {
+        'available_tables': Table.objects.filter(status='VACANT'),
+    }
+
 
 @login_required
 def create_order_view(request):
     """Enhanced order creation view"""
     if request.method == 'GET':
-        # Get available tables and menu items
-        available_tables = Table.objects.filter(status='VACANT')
-        categories = MenuCategory.objects.filter(is_active=True).prefetch_related('items')
-        
-        context = {
-            'available_tables': available_tables,
-            'categories': categories,
-        }
-        return render(request, 'restaurant/create_order.html', context)
+        return render(request, 'restaurant/create_order.html', _create_order_context())
     
     elif request.method == 'POST':
         try:
@@ -79,14 +88,7 @@ def create_order_view(request):
             messages.error(request, "Failed to create order. Please try again.")
         
         # Return to form with errors
-        available_tables = Table.objects.filter(status='VACANT')
-        categories = MenuCategory.objects.filter(is_active=True).prefetch_related('items')
-        
-        context = {
-            'available_tables': available_tables,
-            'categories': categories,
-        }
-        return render(request, 'restaurant/create_order.html', context)
+        return render(request, 'restaurant/create_order.html', _create_order_context())
 
 
 @login_required
@@ -261,6 +263,112 @@ def api_kitchen_queue(request):
         })
 
 
+def _menu_categories_etag(request):
+    """Changes whenever an active category or any item is added, edited or removed"""
+    categories = MenuCategory.objects.filter(is_active=True).aggregate(
+        count=Count('id'), updated=Max('updated_at')
+    )
+    items = MenuItem.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return 'menu-categories-{}-{}-{}-{}'.format(
+        categories['count'], categories['updated'] and categories['updated'].timestamp(),
+        items['count'], items['updated'] and items['updated'].timestamp(),
+    )
+
+
+def _menu_page_params(request):
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    try:
+        page_size = min(max(int(request.GET.get('page_size', MENU_PAGE_SIZE)), 1), MAX_MENU_PAGE_SIZE)
+    except ValueError:
+        page_size = MENU_PAGE_SIZE
+    return page, page_size
+
+
+def _menu_category_items_etag(request, category_id):
+    """
+    Changes whenever the category or any of its items changes; varies by page.
+    Missing or inactive categories get no ETag, so the view answers 404
+    instead of a stale 304.
+    """
+    category = MenuCategory.objects.filter(id=category_id, is_active=True).annotate(
+        item_count=Count('items'), items_updated=Max('items__updated_at')
+    ).values('updated_at', 'item_count', 'items_updated').first()
+    if category is None:
+        return None
+    page, page_size = _menu_page_params(request)
+    return 'menu-category-{}-{}-{}-{}-{}-{}'.format(
+        category_id, category['updated_at'].timestamp(), category['item_count'],
+        category['items_updated'] and category['items_updated'].timestamp(),
+        page, page_size,
+    )
+
+
+@login_required
+@require_http_methods(["GET"])
+@read_replica()
+@condition(etag_func=_menu_categories_etag)
+def api_menu_categories(request):
+    """API endpoint listing active categories with their active item counts"""
+    categories = MenuCategory.objects.filter(is_active=True).annotate(
+        item_count=Count('items', filter=Q(items__is_active=True))
+    ).values('id', 'name', 'item_count')
+    
+    response = JsonResponse({
+        'success': True,
+        'categories': list(categories)
+    })
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@require_http_methods(["GET"])
+@read_replica()
+@condition(etag_func=_menu_category_items_etag)
+def api_menu_category_items(request, category_id):
+    """API endpoint returning one page of a category's active items"""
+    category = get_object_or_404(MenuCategory, id=category_id, is_active=True)
+    page, page_size = _menu_page_params(request)
+    
+    items = MenuItem.objects.filter(category=category, is_active=True).values(
+        'id', 'name', 'sku', 'price', 'description'
+    ).order_by('name', 'id')
+    paginator = Paginator(items, page_size)
+    try:
+        page_obj = paginator.page(page)
+    except EmptyPage:
+        page_obj = paginator.page(paginator.num_pages)
+    
+    response = JsonResponse({
+        'success': True,
+        'category': {'id': category.id, 'name': category.name},
+        'items': [dict(item, price=str(item['price'])) for item in page_obj],
+        'page': page_obj.number,
+        'num_pages': paginator.num_pages,
+        'has_next': page_obj.has_next(),
+    })
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@require_http_methods(["GET"])
+def api_menu_autocomplete(request):
+    """API endpoint for POS type-ahead over item names and SKUs (no DB hits)"""
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    
+    return JsonResponse({
+        'success': True,
+        'results': menu_prefix_index.lookup(request.GET.get('q', ''), limit=limit)
+    })
+
+
 @login_required
 @require_http_methods(["GET"])
 def api_order_status(request, order_id):